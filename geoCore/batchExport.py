@@ -0,0 +1,405 @@
+""" This module contains the headless batch export of drilling profiles
+
+    Usage (from the directory containing the plugin directory):
+
+        python -m geoCore.batchExport corings.csv corings_data.csv -o out --format svg
+        python -m geoCore.batchExport corings.gpkg data.csv -o out --group-by loc_id
+        python -m geoCore.batchExport corings.csv corings_data.csv -o out --workers 0
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import math
+import multiprocessing
+import os
+import re
+import sys
+from collections import namedtuple
+from types import SimpleNamespace
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from qgis.core import Qgis, QgsApplication, QgsExpression, QgsFeatureRequest, QgsVectorLayer
+from qgis.PyQt.QtWidgets import QGraphicsScene
+
+from .csvLayerData import CsvLayerData
+from .drillingPosition import drillingPositions
+from .geoCoreConfig import Config
+from .layerDataIndex import LayerDataIndex
+from .profileBuilder import ProfileBuilder
+from .profilePainter import ProfilePainter
+from .sceneExport import exportScene, isTiledFormat
+from .transect import SORT_KEYS, sortPositions
+
+FORMATS = ("svg", "pdf", "png", "jpg", "tif")
+DIRECTIONS = tuple(SORT_KEYS)
+# maximum number of jobs a worker process gets at once
+SHARD_SIZE = 16
+# maximum number of IDs looked up with an expression, the drilling
+# positions of more IDs are filtered while reading all of them
+MAX_FILTER_IDS = 1000
+
+# An export job: the drilling profiles with the given IDs are drawn
+# into the file <name>.<format>. Several IDs form a transect.
+ExportJob = namedtuple('ExportJob', ['name', 'ids'])
+
+# Everything a process needs to set up a BatchExporter
+ExportSettings = namedtuple('ExportSettings', ['boreholes', 'data', 'outDir', 'fileFormat',
+    'configDir', 'direction', 'xFac', 'yFac', 'delimiter'])
+
+# Where and how a BatchExporter draws the profiles: the output directory,
+# the file format, the drawing order of transects, the scaling factors
+# and the size of the view (width, height)
+ExportOptions = namedtuple('ExportOptions', ['outDir', 'fileFormat', 'direction', 'xFac', 'yFac',
+    'viewSize'], defaults=("svg", "ns", None, None, (1000, 700)))
+
+def loadLayer(source, name, delimiter=";"):
+    """Load a vector layer from a file. CSV files are read with the
+    delimited text provider (without geometry), any other source with OGR."""
+    if Path(source).suffix.upper() == ".CSV":
+        uri = "{}?delimiter={}&detectTypes=yes&geomType=none".format(
+            Path(source).resolve().as_uri(), delimiter)
+        layer = QgsVectorLayer(uri, name, "delimitedtext")
+    else:
+        layer = QgsVectorLayer(source, name, "ogr")
+    if not layer.isValid():
+        raise IOError("Failed to load {}".format(source))
+    return layer
+
+def loadLayerData(source, config, delimiter=";"):
+    """Get the layer data. CSV files are read directly with CsvLayerData,
+    any other source is loaded as layer and read with LayerDataIndex."""
+    if Path(source).suffix.upper() == ".CSV":
+        if not os.path.isfile(source):
+            raise IOError("Failed to load {}".format(source))
+        return CsvLayerData.forFile(source, config.settings, delimiter)
+    return LayerDataIndex.forLayer(loadLayer(source, Path(source).stem, delimiter))
+
+def createExporter(settings):
+    """Load the layers and the configuration and create the BatchExporter"""
+    config = Config(BatchExporter.showMessage, settings.configDir)
+    boreholes = loadLayer(settings.boreholes, Path(settings.boreholes).stem, settings.delimiter)
+    layerData = loadLayerData(settings.data, config, settings.delimiter)
+    options = ExportOptions(settings.outDir, settings.fileFormat, settings.direction,
+        settings.xFac, settings.yFac)
+    return BatchExporter(boreholes, layerData, options, config)
+
+def fileStem(name):
+    """Make a file name (without suffix) of an ID or a group"""
+    return re.sub(r"[^\w.-]+", "_", str(name)).strip("._") or "_"
+
+class BatchExporter:
+    """BatchExporter draws drilling profiles without the dialog.
+    The profiles are built with ProfileBuilder, painted with ProfilePainter
+    into an offscreen scene and exported to one file per job."""
+
+    def __init__(self, boreholes, layerData, options, config=None):
+        """boreholes is the vector layer of the drilling positions (Stammdaten),
+        layerData the layer data (Schichtdaten, LayerDataIndex or CsvLayerData)
+        and options the ExportOptions"""
+        self.boreholes = boreholes
+        self.layerData = layerData
+        self.options = options
+        self.config = config if config is not None else Config(self.showMessage)
+        self._builder = None
+        self._features = {} # ID -> drilling position of the prepared jobs
+
+    def jobs(self, ids=None, groupBy=None, groups=None, transect=False):
+        """Get the export jobs. Without further arguments there is one job
+        per drilling profile. The profiles may be restricted to the given IDs.
+        groupBy (attribute of the boreholes) yields one transect per value,
+        optionally restricted to the given groups. transect yields a single
+        transect of all profiles."""
+        wanted = None if ids is None else {str(i) for i in ids}
+        wantedGroups = None if groups is None else {str(g) for g in groups}
+        request = QgsFeatureRequest()
+        request.setFlags(QgsFeatureRequest.NoGeometry)
+        request.setSubsetOfAttributes(["id"] if groupBy is None else ["id", groupBy],
+            self.boreholes.fields())
+
+        grouped = {}
+        for f in self.boreholes.getFeatures(request):
+            profileId = f.attribute("id")
+            if wanted is not None and str(profileId) not in wanted:
+                continue
+            if groupBy is not None:
+                group = f.attribute(groupBy)
+                if wantedGroups is not None and str(group) not in wantedGroups:
+                    continue
+                key = "{}_{}".format(groupBy, group)
+            elif transect:
+                key = "transect"
+            else:
+                key = profileId
+            grouped.setdefault(key, []).append(profileId)
+
+        # the names are unique, as files must not be overwritten by other jobs
+        jobs = []
+        names = set()
+        for k, v in grouped.items():
+            name = fileStem(k)
+            n = 1
+            while name.lower() in names:
+                n = n + 1
+                name = "{}_{}".format(fileStem(k), n)
+            names.add(name.lower())
+            jobs.append(ExportJob(name, v))
+        return jobs
+
+    def prepare(self, jobs, save=True):
+        """Read the drilling positions and build the profiles of all jobs at
+        once, i.e. with few requests for the layer data and one update of
+        the profile cache. With save=False the profiles built are kept for
+        takeNewProfiles() instead of being written to the cache."""
+        positions = self._readPositions([i for job in jobs for i in job.ids])
+        self._features = {str(p.id): p for p in positions}
+        self._getBuilder().buildProfiles(list(self._features.values()), save=save)
+
+    def export(self, job):
+        """Draw the job's profiles and export them. Returns the file name."""
+        features = self._getSortedFeatures(job.ids)
+        otbps = self._getBuilder().getProfilesAndConnectors(features)
+
+        fileName = os.path.join(self.options.outDir, "{}.{}".format(job.name,
+            self.options.fileFormat))
+        scene = QGraphicsScene()
+        painter = ProfilePainter(scene, *self.options.viewSize)
+        # tiled formats construct the profiles piece by piece
+        painter.setLazy(isTiledFormat(fileName))
+        painter.applyScale(self.options.xFac, self.options.yFac)
+        painter.paint(otbps, len(otbps) == 1)
+        exportScene(scene, fileName, painter)
+        # the profiles may be drawn again by another job
+        for o in otbps:
+            o.removeItems(scene)
+        scene.clear()
+        return fileName
+
+    @property
+    def diagnostics(self):
+        """The problems found in the layer data of the jobs exported"""
+        return self._getBuilder().diagnostics
+
+    def takeNewProfiles(self):
+        """Get the profiles built but not written to the profile cache as
+        list of (ID, columns, problems) and forget them"""
+        cache = self._getBuilder().profileCache()
+        return [] if cache is None else cache.takePending()
+
+    def merge(self, report, profiles):
+        """Add the problems (a report of Diagnostics) and the profiles
+        (see takeNewProfiles()) of a worker process. The profiles are
+        written to the profile cache by saveCache()."""
+        self.diagnostics.merge(report)
+        cache = self._getBuilder().profileCache()
+        if cache is not None:
+            for profileId, columns, problems in profiles:
+                cache.add(profileId, columns, problems)
+
+    def saveCache(self):
+        """Write the profiles added to the profile cache"""
+        cache = self._getBuilder().profileCache()
+        if cache is not None:
+            cache.save()
+
+    def _getBuilder(self):
+        """Get the builder shared by all jobs"""
+        if self._builder is None:
+            self._builder = ProfileBuilder(self.boreholes.name(), self.showMessage,
+                layerData=self.layerData, config=self.config)
+        return self._builder
+
+    def _getSortedFeatures(self, ids):
+        """Get the drilling positions in drawing order"""
+        features = [self._features.get(str(i)) for i in ids]
+        if None in features:
+            features = self._readPositions(ids)
+        return sortPositions(features, self.options.direction)
+
+    def _readPositions(self, ids):
+        """Read the drilling positions of the given IDs. Few IDs are
+        looked up with an expression, i.e. a worker's shard does not
+        read all positions of the layer."""
+        ids = list(dict.fromkeys(ids))
+        if len(ids) == 0:
+            return []
+        request = None
+        if len(ids) <= MAX_FILTER_IDS:
+            column = QgsExpression.quotedColumnRef("ID")
+            values = ", ".join([QgsExpression.quotedValue(i) for i in ids])
+            request = QgsFeatureRequest(QgsExpression("{} IN ({})".format(column, values)))
+        wanted = {str(i) for i in ids}
+        return [p for p in drillingPositions(self.boreholes, self.config.settings, request)
+            if str(p.id) in wanted]
+
+    def exportAll(self, jobs, save=True):
+        """Export the jobs one after another. Returns the file names,
+        None for jobs which failed. save is passed to prepare()."""
+        self.prepare(jobs, save)
+        fileNames = []
+        for job in jobs:
+            try:
+                fileNames.append(self.export(job))
+            except IOError as e:
+                self.showMessage("Error", "{}: {}".format(job.name, e), Qgis.Critical)
+                fileNames.append(None)
+        return fileNames
+
+    @staticmethod
+    def showMessage(title, message, level=Qgis.Info):
+        """Print a message to stderr"""
+        if level != Qgis.Info:
+            print("{}: {}".format(title, message), file=sys.stderr)
+
+# the worker process' application and exporter
+_worker = SimpleNamespace(app=None, exporter=None)
+
+def _initWorker(settings):
+    """Set up QGIS and the exporter in a worker process"""
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    _worker.app = QgsApplication([], True)
+    _worker.app.initQgis()
+    _worker.exporter = createExporter(settings)
+
+def _exportShard(jobs):
+    """Export some jobs in a worker process. Returns the file names, the
+    report of the problems found by the worker so far and the profiles
+    built for the jobs. The workers do not write the profile cache, as
+    they would overwrite each other's file."""
+    exporter = _worker.exporter
+    fileNames = exporter.exportAll(jobs, save=False)
+    return fileNames, exporter.diagnostics.report(), exporter.takeNewProfiles()
+
+def exportParallel(settings, jobs, workers=None, progress=None, isCanceled=None,
+        exporter=None):
+    """Export the jobs in a pool of worker processes (by default one per CPU).
+    Every worker has its own QgsApplication, layers and offscreen scenes.
+    The jobs are handed out in shards. progress(done, total) is called
+    whenever a shard is finished. If isCanceled() returns True the
+    remaining shards are dropped. A shard which fails (e.g. as a worker
+    could not be set up) is reported, the others are exported anyway.
+    The workers' problems in the layer data and the profiles they built
+    are merged into exporter (the BatchExporter of this process), if
+    given, which writes its profile cache once at the end. Returns the
+    file names in the order of the jobs, None for jobs which failed or
+    were canceled."""
+    workers = workers or os.cpu_count() or 1
+    size = max(1, min(SHARD_SIZE, math.ceil(len(jobs) / (workers * 4))))
+    results = [None] * len(jobs)
+    done = 0
+
+    context = multiprocessing.get_context("spawn") # Qt must not be forked
+    with ProcessPoolExecutor(workers, mp_context=context,
+            initializer=_initWorker, initargs=(settings,)) as executor:
+        futures = {executor.submit(_exportShard, jobs[i:i + size]): i
+            for i in range(0, len(jobs), size)}
+        try:
+            for future in as_completed(futures):
+                start = futures[future]
+                shard = jobs[start:start + size]
+                try:
+                    fileNames, report, profiles = future.result()
+                except Exception as e: # pylint: disable=broad-except
+                    # any error of the worker, the shard's results are left None
+                    BatchExporter.showMessage("Error", "Failed to export {}: {}".format(
+                        ", ".join(job.name for job in shard), e), Qgis.Critical)
+                    fileNames, report, profiles = [None] * len(shard), [], []
+                if exporter is not None:
+                    exporter.merge(report, profiles)
+                results[start:start + len(fileNames)] = fileNames
+                done = done + len(shard)
+                if progress is not None:
+                    progress(done, len(jobs))
+                if isCanceled is not None and isCanceled():
+                    break
+        finally:
+            for future in futures:
+                future.cancel()
+            if exporter is not None:
+                exporter.saveCache()
+    return results
+
+def _printProgress(done, total):
+    """Print the progress to stderr"""
+    print("{}/{} exported".format(done, total), file=sys.stderr)
+
+def _parseArgs(argv):
+    """Parse the command line"""
+    parser = argparse.ArgumentParser(prog="python -m geoCore.batchExport",
+        description="Export drilling profiles without QGIS' user interface.")
+    parser.add_argument("boreholes", help="drilling positions (CSV or any OGR source)")
+    parser.add_argument("data", help="layer data of the drillings (CSV or any OGR source)")
+    parser.add_argument("-o", "--out", default=".", help="output directory")
+    parser.add_argument("-f", "--format", choices=FORMATS, default="svg")
+    parser.add_argument("-c", "--config", default=None,
+        help="directory containing config.yml and geoCore/geoCore.yml")
+    parser.add_argument("--ids", nargs="+", default=None, help="IDs of the drillings to export")
+    parser.add_argument("--group-by", default=None,
+        help="attribute of the drilling positions, one transect per value")
+    parser.add_argument("--groups", nargs="+", default=None, help="values of --group-by to export")
+    parser.add_argument("--transect", action="store_true",
+        help="draw all drillings as one transect")
+    parser.add_argument("--direction", choices=DIRECTIONS, default="ns",
+        help="drawing order of a transect")
+    parser.add_argument("--xfac", type=float, default=None, help="scaling factor in x-dimension")
+    parser.add_argument("--yfac", type=float, default=None, help="scaling factor in y-dimension")
+    parser.add_argument("--delimiter", default=";", help="delimiter of CSV files")
+    parser.add_argument("-j", "--workers", type=int, default=1,
+        help="number of worker processes (0: one per CPU)")
+    parser.add_argument("--report", default=None,
+        help="CSV file receiving the problems found in the layer data")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Run the batch export with a QgsApplication without GUI"""
+    args = _parseArgs(argv)
+    settings = ExportSettings(args.boreholes, args.data, args.out, args.format,
+        args.config, args.direction, args.xfac, args.yfac, args.delimiter)
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    app = QgsApplication([], True)
+    app.initQgis()
+    try:
+        os.makedirs(args.out, exist_ok=True)
+        exporter = createExporter(settings)
+        jobs = exporter.jobs(args.ids, args.group_by, args.groups, args.transect)
+        if args.workers == 1:
+            fileNames = exporter.exportAll(jobs)
+        else:
+            fileNames = exportParallel(settings, jobs, args.workers, _printProgress,
+                exporter=exporter)
+        if args.report is not None:
+            exporter.diagnostics.writeCsv(args.report)
+    except IOError as e:
+        print(e, file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        # the pending shards were canceled, the running ones are finished
+        print("canceled", file=sys.stderr)
+        return 130
+    finally:
+        app.exitQgis()
+
+    for fileName in fileNames:
+        if fileName is not None:
+            print(fileName)
+    return 0 if None not in fileNames else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
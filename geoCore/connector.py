@@ -27,6 +27,8 @@ class Connector(Otbp):
     drilling profiles.
     This class contains all relevant data for drawing"""
 
+    __slots__ = ('x1', 'y1', 'x2', 'y2', 'xOffset', '_line')
+
     def __init__(self):
         """Initialize the connector"""
         super().__init__()
@@ -35,6 +37,7 @@ class Connector(Otbp):
         self.x2 = 0.0
         self.y2 = 0.0 # in cm
         self.xOffset = 0.0
+        self._line = None
 
     def partsHeights(self):
         """Return the height of each connector"""
@@ -42,9 +45,18 @@ class Connector(Otbp):
 
     def paint(self, scene):
         """Paint connector onto scene"""
+        self._line = self._addItem(scene.addLine(*self._getLine()))
+
+    def relayout(self):
+        """Update the line's geometry"""
+        if self.isPainted():
+            self._line.setLine(*self._getLine())
+
+    def _getLine(self):
+        """Get the scaled start and end point of the line"""
         # convert from cm to mm
         # direction of y-axis it top down, i.e. point (0,0) is in the upper left
-        scene.addLine((self.x1 * self._xFac + self.xOffset) * 10,
+        return ((self.x1 * self._xFac + self.xOffset) * 10,
             self.y1 * self._yFac * -10,
             self.x2 * self._xFac * 10,
             self.y2 * self._yFac * -10)
@@ -0,0 +1,228 @@
+""" This module contains the class CsvLayerData
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import csv
+import mmap
+import os
+import threading
+
+from qgis.PyQt.QtCore import QUrl, QUrlQuery
+
+def _numericColumns(settings):
+    """Get the names of the columns converted to numbers"""
+    return frozenset(settings[k] for k in ("layerNo", "group", "depthFrom", "depthTo"))
+
+def _isSupported(query):
+    """Return True if the reader interprets the file like QGIS does with
+    the options of the delimited text layer's URI, i.e. a decimal point,
+    no skipped lines, a header line, double quotes and untrimmed fields"""
+    def option(name):
+        return query.queryItemValue(name, QUrl.FullyDecoded).lower()
+    return (option("decimalPoint") in ("", ".")
+        and option("skipLines") in ("", "0")
+        and option("useHeader") not in ("no", "false", "0")
+        and option("quote") in ("", '"')
+        and option("escape") in ("", '"')
+        and option("trimFields") not in ("yes", "true", "1"))
+
+class CsvLayerData:
+    """CsvLayerData reads the layer data (Schichtdaten) directly from a
+    delimited text file shaped like example_data/corings_data.csv. The file
+    is memory-mapped and scanned once for the byte ranges of each drilling
+    profile's rows. Only the rows of the requested profiles are parsed.
+    The numeric columns named in config.yml are converted to numbers."""
+
+    _files = {} # (file name, delimiter, ID column, numeric columns) -> CsvLayerData
+
+    @classmethod
+    def forFile(cls, fileName, settings, delimiter=";", idColumn="ID"):
+        """Get the reader of the given file. settings are the
+        contents of config.yml"""
+        fileName = os.path.abspath(fileName)
+        key = (fileName, delimiter, idColumn.upper(), _numericColumns(settings))
+        data = cls._files.get(key)
+        if data is None:
+            data = CsvLayerData(fileName, settings, delimiter, idColumn)
+            cls._files[key] = data
+        return data
+
+    @classmethod
+    def forLayer(cls, layer, settings):
+        """Get the reader of the file of a delimited text layer or None
+        if the layer is not read from a delimited file, is filtered or uses
+        options the reader does not support (e.g. a decimal comma)"""
+        if layer.providerType() != "delimitedtext" or len(layer.subsetString()) > 0:
+            return None
+        url = QUrl(layer.source())
+        query = QUrlQuery(url)
+        if not _isSupported(query):
+            return None # left to QGIS
+        fileType = query.queryItemValue("type") or "csv"
+        if fileType == "csv":
+            delimiter = query.queryItemValue("delimiter", QUrl.FullyDecoded) or ","
+        elif fileType == "tsv":
+            delimiter = "\t"
+        else:
+            return None # regular expressions are left to QGIS
+        if len(delimiter) != 1 or not os.path.isfile(url.toLocalFile()):
+            return None
+        return cls.forFile(url.toLocalFile(), settings, delimiter)
+
+    def __init__(self, fileName, settings, delimiter, idColumn="ID"):
+        """Initialize the reader. The file is scanned on first access.
+        The rows belong to the drilling profile named in the column idColumn
+        (case insensitive, by default the first column)."""
+        self._fileName = fileName
+        self._delimiter = delimiter
+        self._idColumn = idColumn.upper()
+        self._numeric = _numericColumns(settings)
+        self._lock = threading.Lock()
+        self._stamp = None # (mtime, size) of the scanned file
+        self._map = None
+        self._names = []
+        self._spans = {} # ID -> list of (start, end) byte ranges of its rows
+        self._rows = {} # ID -> list of dictionaries containing the layers' attributes
+
+    def layerAttributes(self, profileIds, _source=None):
+        """Get the layers' attributes of the given drilling profiles.
+        Returns a dictionary mapping the profile's ID (as string) to a list
+        of dictionaries containing the layers' attributes. The source of
+        LayerDataIndex.layerAttributes is not needed, as the file may be
+        read from any thread."""
+        with self._lock:
+            self._update()
+            result = {}
+            for i in profileIds:
+                rows = self._rows.get(str(i))
+                if rows is None:
+                    rows = []
+                    for start, end in self._spans.get(str(i), []):
+                        rows.extend(self._parse(start, end))
+                    self._rows[str(i)] = rows
+                result[str(i)] = rows
+            return result
+
+    def cacheKey(self):
+        """Describe the file's contents for the ProfileCache"""
+        stat = os.stat(self._fileName)
+        return "csv|{}|{}|{}|{}|{}".format(self._fileName, self._delimiter, self._idColumn,
+            stat.st_mtime_ns, stat.st_size)
+
+    def featureSource(self):
+        """The reader itself may be used in a background thread"""
+        return self
+
+    def invalidate(self):
+        """Drop the index, the file is scanned again on next access"""
+        with self._lock:
+            self._close()
+
+    def _update(self):
+        """Scan the file if it was not scanned yet or was changed"""
+        stat = os.stat(self._fileName)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        if stamp != self._stamp:
+            self._close()
+            self._scan()
+            self._stamp = stamp
+
+    def _close(self):
+        """Unmap the file"""
+        if self._map is not None:
+            self._map.close()
+        self._map = None
+        self._stamp = None
+        self._spans = {}
+        self._rows = {}
+
+    def _scan(self):
+        """Map the file and index the byte ranges of the rows by ID.
+        Quoted fields must not contain line breaks."""
+        # the mapping stays valid after the file is closed
+        with open(self._fileName, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                self._names = []
+                return
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._map = mm
+
+        pos = 3 if mm[:3] == b'\xef\xbb\xbf' else 0 # skip the BOM
+        end = self._lineEnd(pos)
+        self._names = self._split(mm[pos:end])
+        try:
+            idIndex = [n.upper() for n in self._names].index(self._idColumn)
+        except ValueError:
+            idIndex = 0
+        delimiter = self._delimiter.encode('utf-8')
+
+        pos = end + 1
+        size = len(mm)
+        while pos < size:
+            end = self._lineEnd(pos)
+            line = mm[pos:end]
+            if b'"' in line:
+                fields = self._split(line)
+                profileId = fields[idIndex] if idIndex < len(fields) else ""
+            else:
+                fields = line.split(delimiter, idIndex + 1)
+                profileId = fields[idIndex].decode('utf-8') if idIndex < len(fields) else ""
+            profileId = profileId.strip()
+            if len(profileId) > 0:
+                spans = self._spans.setdefault(profileId, [])
+                if len(spans) > 0 and spans[-1][1] + 1 == pos:
+                    spans[-1] = (spans[-1][0], end) # rows of a profile are usually adjacent
+                else:
+                    spans.append((pos, end))
+            pos = end + 1
+
+    def _lineEnd(self, pos):
+        """Return the position of the end of the line starting at pos"""
+        end = self._map.find(b'\n', pos)
+        return len(self._map) if end == -1 else end
+
+    def _split(self, line):
+        """Split a line of the file into its fields"""
+        text = line.decode('utf-8').rstrip('\r')
+        return next(csv.reader([text], delimiter=self._delimiter), [])
+
+    def _parse(self, start, end):
+        """Parse the rows in the given byte range"""
+        lines = self._map[start:end].decode('utf-8').splitlines()
+        rows = []
+        for fields in csv.reader(lines, delimiter=self._delimiter):
+            if len(fields) > 0:
+                rows.append({n: self._value(n, v) for n, v in zip(self._names, fields)})
+        return rows
+
+    def _value(self, name, value):
+        """Convert a field. Empty fields are None (like NULL in QGIS)."""
+        value = value.strip()
+        if len(value) == 0:
+            return None
+        if name in self._numeric:
+            try:
+                return int(value)
+            except ValueError:
+                try:
+                    return float(value)
+                except ValueError:
+                    return value
+        return value
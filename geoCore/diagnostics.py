@@ -0,0 +1,124 @@
+""" This module contains the class Diagnostics
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import csv
+import threading
+from collections import namedtuple
+from qgis.core import Qgis
+
+# kinds of problems in the layer data
+MISSING_MAIN_GROUP = "Missing main group in petrography"
+MISSING_KEY = "Key not found in config"
+
+# number of keys per kind listed in the summary
+SUMMARY_KEYS = 5
+
+# A problem found in a layer: its kind, the offending value and the message level
+Diagnostic = namedtuple('Diagnostic', ['kind', 'key', 'level'])
+
+# A line of the report: the problem, the number of layers
+# and the IDs of the drilling profiles affected
+ReportEntry = namedtuple('ReportEntry', ['kind', 'key', 'level', 'count', 'profiles'])
+
+class Diagnostics:
+    """Diagnostics collects the problems found while building profiles.
+    Problems are counted by kind and key instead of being shown one by one,
+    so the message bar only shows a summary. The full report is available
+    as list of ReportEntry or as CSV file for checking the data."""
+
+    def __init__(self):
+        """Initialize an empty collection"""
+        self._lock = threading.Lock()
+        self._entries = {} # (kind, key) -> [level, {profile ID -> number of layers}]
+        self._count = 0
+
+    def add(self, diagnostic, profileId=None):
+        """Count a problem in a layer of the given drilling profile"""
+        with self._lock:
+            entry = self._entries.setdefault((diagnostic.kind, diagnostic.key),
+                [diagnostic.level, {}])
+            entry[0] = max(entry[0], diagnostic.level)
+            profileId = str(profileId)
+            entry[1][profileId] = entry[1].get(profileId, 0) + 1
+            self._count = self._count + 1
+
+    def merge(self, report):
+        """Add the entries of another report, e.g. of a worker process.
+        Profiles already counted are replaced, not counted twice."""
+        with self._lock:
+            for e in report:
+                entry = self._entries.setdefault((e.kind, e.key), [e.level, {}])
+                entry[0] = max(entry[0], e.level)
+                for profileId, count in e.profiles.items():
+                    self._count = self._count + count - entry[1].get(profileId, 0)
+                    entry[1][profileId] = count
+
+    def count(self):
+        """Get the number of problems counted"""
+        return self._count
+
+    def clear(self):
+        """Remove all problems"""
+        with self._lock:
+            self._entries = {}
+            self._count = 0
+
+    def report(self):
+        """Get the problems as list of ReportEntry ordered by
+        kind and descending number of layers"""
+        with self._lock:
+            entries = [ReportEntry(kind, key, level, sum(profiles.values()), dict(profiles))
+                for (kind, key), (level, profiles) in self._entries.items()]
+        return sorted(entries, key=lambda e: (e.kind, -e.count, str(e.key)))
+
+    def summary(self):
+        """Get the summary message as (title, message, level)
+        or None if there are no problems"""
+        report = self.report()
+        if len(report) == 0:
+            return None
+
+        level = max(e.level for e in report)
+        profiles = {p for e in report for p in e.profiles}
+        parts = []
+        for kind in sorted({e.kind for e in report}):
+            entries = [e for e in report if e.kind == kind]
+            keys = ", ".join(['""' if e.key == "" else str(e.key) for e in entries[:SUMMARY_KEYS]])
+            if len(entries) > SUMMARY_KEYS:
+                keys = "{} and {} more".format(keys, len(entries) - SUMMARY_KEYS)
+            parts.append("{} ({}x): {}".format(kind, sum(e.count for e in entries), keys))
+        message = "{} problems in the layers of {} drilling profiles. {}".format(
+            self.count(), len(profiles), "; ".join(parts))
+        return ("Warning" if level >= Qgis.Warning else "Info", message, level)
+
+    def writeCsv(self, fileName, delimiter=";"):
+        """Write the report to a CSV file"""
+        with open(fileName, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f, delimiter=delimiter)
+            writer.writerow(["kind", "key", "level", "count", "profiles"])
+            for e in self.report():
+                writer.writerow([e.kind, "" if e.key is None else e.key, _levelName(e.level),
+                    e.count, ",".join(e.profiles)])
+
+def _levelName(level):
+    """Get the name of a message level"""
+    names = {Qgis.Info: "Info", Qgis.Warning: "Warning", Qgis.Critical: "Critical"}
+    return names.get(level, str(level))
@@ -0,0 +1,69 @@
+""" This module contains the drilling positions (Stammdaten) needed to draw the profiles
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from collections import namedtuple
+from qgis.core import QgsFeatureRequest
+
+# The ID and the coordinates (columns xCoord, yCoord and zCoord of config.yml)
+# of a drilling position. The chainage is set for positions projected onto
+# a section line (see SectionLine).
+DrillingPosition = namedtuple('DrillingPosition', ['id', 'x', 'y', 'z', 'chainage'],
+    defaults=(None,))
+
+def positionRequest(layer, settings, request=None):
+    """Restrict the request (by default all features) to the ID and the
+    coordinates of the drilling positions. settings are the contents of
+    config.yml"""
+    if request is None:
+        request = QgsFeatureRequest()
+    request.setFlags(request.flags() | QgsFeatureRequest.NoGeometry)
+    request.setSubsetOfAttributes(_fieldNames(settings), layer.fields())
+    return request
+
+def drillingPositions(layer, settings, request=None):
+    """Get the drilling positions of the layer's features (optionally
+    restricted by request). Only the ID and the coordinates are read.
+    Raises KeyError if one of the columns does not exist."""
+    request = positionRequest(layer, settings, request)
+    fields = layer.fields()
+    i, x, y, z = (_fieldIndex(layer, fields, name) for name in _fieldNames(settings))
+    positions = []
+    for f in layer.getFeatures(request):
+        a = f.attributes()
+        positions.append(DrillingPosition(a[i], a[x], a[y], a[z]))
+    return positions
+
+def selectedDrillingPositions(layer, settings):
+    """Get the drilling positions of the layer's selected features"""
+    request = QgsFeatureRequest()
+    request.setFilterFids(layer.selectedFeatureIds())
+    return drillingPositions(layer, settings, request)
+
+def _fieldIndex(layer, fields, name):
+    """Get the index of the column of the given name"""
+    index = fields.lookupField(name)
+    if index < 0:
+        raise KeyError("Column {} not found in layer {}.".format(name, layer.name()))
+    return index
+
+def _fieldNames(settings):
+    """Get the names of the columns of the ID and the coordinates"""
+    return ["id", settings["xCoord"], settings["yCoord"], settings["zCoord"]]
@@ -20,14 +20,17 @@
 """
 
 from math import fabs, trunc
-from qgis.PyQt.QtGui import QBrush, QColor, QPen
 from .orientation import Orientation
 from .otbp import Otbp
+from .paintResources import PaintResources
 
 class Gauge(Otbp):
     """Gauge represents the gauge on the left or bottom of the drawing.
     This class contains all relevant data for drawing"""
 
+    __slots__ = ('_x', '_y', '_min', '_max', '_stepWidth', '_width',
+        '_orientation', '_rects', '_description')
+
     def __init__(self, x, y, minV, maxV, orientation):
         """Initialize the connector"""
         super().__init__()
@@ -38,6 +41,9 @@ class Gauge(Otbp):
         self._stepWidth = (maxV - minV) / 5
         self._width = 0.5
         self._orientation = orientation
+        # graphics items added to the scene
+        self._rects = []
+        self._description = None
 
         self._adjustMinMax(minV, maxV)
 
@@ -50,10 +56,31 @@ class Gauge(Otbp):
 
     def paint(self, scene):
         """Paint the guage onto the scene"""
+        self._paintDescription(scene)
+
+        pen, bBrush, wBrush = self._getPenAndBrush()
+        self._rects = [self._addItem(scene.addRect(0, 0, 0, 0, pen, brush))
+            for brush in (bBrush, wBrush, bBrush, wBrush, bBrush)]
+        self.relayout()
+
+    def relayout(self):
+        """Update the geometry of the gauge"""
+        if not self.isPainted():
+            return
         if self._orientation == Orientation.VERTICAL:
-            self._paintVertical(scene)
+            self._placeVertical()
         else:
-            self._paintHorizontal(scene)
+            self._placeHorizontal()
+
+    def _paintDescription(self, scene):
+        """Paint the min and max value of the gauge"""
+        minText = self._addItem(scene.addText("{:.2f} m".format(float(self._min) / 100)))
+        minText.adjustSize()
+        minLine = self._addItem(scene.addLine(0, 0, 0, 0))
+        maxText = self._addItem(scene.addText("{:.2f} m".format(float(self._max) / 100)))
+        maxText.adjustSize()
+        maxLine = self._addItem(scene.addLine(0, 0, 0, 0))
+        self._description = (minText, minLine, maxText, maxLine)
 
     def _adjustMinMax(self, minV, maxV):
         """Adjust the min and max value for a nice gauge"""
@@ -100,79 +127,67 @@ class Gauge(Otbp):
                 self._stepWidth = (trunc(self._stepWidth / mult) + 1) * mult
             self._max = self._min + 5 * self._stepWidth
 
-    def _paintHorizontal(self, scene):
-        """Paint the horizontal gauge"""
+    def _placeHorizontal(self):
+        """Place the horizontal gauge"""
         w = fabs(self._max - self._min) * self._xFac * 10
         x = self._x * self._xFac * 10
         y = (-self._y * self._yFac) * 10 + 70
 
-        self._paintHorizontalDescription(scene, x, y, w)
+        self._placeHorizontalDescription(x, y, w)
 
-        pen, bBrush, wBrush = self._getPenAndBrush()
         sw = self._stepWidth * self._xFac * 10
-        scene.addRect(x, y, sw, self._width * 10, pen, bBrush)
-        scene.addRect(x + sw, y, sw, self._width * 10, pen, wBrush)
-        scene.addRect(x + 2 * sw, y, sw, self._width * 10, pen, bBrush)
-        scene.addRect(x + 3 * sw, y, sw, self._width * 10, pen, wBrush)
-        scene.addRect(x + 4 * sw, y, sw, self._width * 10, pen, bBrush)
-
-    def _paintHorizontalDescription(self, scene, x, y, w):
-        """Paint the description of the horizontal gauge"""
+        for i, r in enumerate(self._rects):
+            r.setRect(x + i * sw, y, sw, self._width * 10)
+
+    def _placeHorizontalDescription(self, x, y, w):
+        """Place the description of the horizontal gauge"""
+        minText, minLine, maxText, maxLine = self._description
+
         # left
         y = y + (self._width + 1) * 10
-        scene.addLine(x, y, x, y + 20)
-        n = scene.addText("{:.2f} m".format(float(self._min) / 100))
-        n.adjustSize()
-        n.setX(x - n.boundingRect().width() / 2)
-        n.setY(y + 20 + 1)
+        minLine.setLine(x, y, x, y + 20)
+        minText.setX(x - minText.boundingRect().width() / 2)
+        minText.setY(y + 20 + 1)
 
         # right
         x = x + w
-        scene.addLine(x, y, x, y + 20)
-        n = scene.addText("{:.2f} m".format(float(self._max) / 100))
-        n.adjustSize()
-        n.setX(x - n.boundingRect().width() / 2)
-        n.setY(y + 20 + 1)
-
-    def _paintVertical(self, scene):
-        """Pain the vertial gauge"""
+        maxLine.setLine(x, y, x, y + 20)
+        maxText.setX(x - maxText.boundingRect().width() / 2)
+        maxText.setY(y + 20 + 1)
+
+    def _placeVertical(self):
+        """Place the vertial gauge"""
         h = -fabs(self._max - self._min) * self._yFac * 10
         x = self._x * self._xFac * 10 - 80
         y = -self._y * self._yFac * 10
 
-        self._paintVerticalDescription(scene, x, y, h)
+        self._placeVerticalDescription(x, y, h)
 
-        pen, bBrush, wBrush = self._getPenAndBrush()
         sw = -self._stepWidth * self._yFac * 10
-        scene.addRect(x, y, self._width * 10, sw, pen, bBrush)
-        scene.addRect(x, y + 1 * sw, self._width * 10, sw, pen, wBrush)
-        scene.addRect(x, y + 2 * sw, self._width * 10, sw, pen, bBrush)
-        scene.addRect(x, y + 3 * sw, self._width * 10, sw, pen, wBrush)
-        scene.addRect(x, y + 4 * sw, self._width * 10, sw, pen, bBrush)
-
-    def _paintVerticalDescription(self, scene, x, y, h):
-        """Paint the description of the vertical gauge"""
+        for i, r in enumerate(self._rects):
+            r.setRect(x, y + i * sw, self._width * 10, sw)
+
+    def _placeVerticalDescription(self, x, y, h):
+        """Place the description of the vertical gauge"""
+        minText, minLine, maxText, maxLine = self._description
+
         # top
         x = x - 10
         y = y + h
-        n = scene.addText("{:.2f} m".format(float(self._max) / 100))
-        n.adjustSize()
-        xLeft = x - n.textWidth()
-        n.setX(xLeft)
-        n.setY(y)
-        scene.addLine(xLeft, y, x, y)
+        xLeft = x - maxText.textWidth()
+        maxText.setX(xLeft)
+        maxText.setY(y)
+        maxLine.setLine(xLeft, y, x, y)
 
         # bottom
         y = y - h
-        n = scene.addText("{:.2f} m".format(float(self._min) / 100))
-        n.adjustSize()
-        n.setX(xLeft)
-        n.setY(y - n.boundingRect().height() - 2)
-        scene.addLine(xLeft, y, x, y)
+        minText.setX(xLeft)
+        minText.setY(y - minText.boundingRect().height() - 2)
+        minLine.setLine(xLeft, y, x, y)
 
     def _getPenAndBrush(self):
         """Get the pen and brush"""
-        pen = QPen()
-        blackBrush = QBrush(QColor("black"))
-        whiteBrush = QBrush(QColor("white"))
+        pen = PaintResources.pen()
+        blackBrush = PaintResources.brush("black")
+        whiteBrush = PaintResources.brush("white")
         return pen, blackBrush, whiteBrush
@@ -19,27 +19,82 @@
     along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+import hashlib
 import os
 import yaml
 
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
 class Config:
     """Class providing configuration data for plugin. The callback function
-    showMessage(title, message) is used to show error messages."""
+    showMessage(title, message) is used to show error messages.
+    The parsed YML files are shared by all instances and are only read
+    again if a file's modification time or size changes."""
+
+    # file name -> ((mtime, size), contents)
+    _cache = {}
 
-    def __init__(self, showMessage):
+    def __init__(self, showMessage, configDir=None):
+        """The configuration is read from configDir (config.yml and
+        geoCore/geoCore.yml). By default the plugin's config directory is used."""
         self.showMessage = showMessage
         self.myDir = os.path.dirname(__file__)
+        if configDir is None:
+            configDir = os.path.join(self.myDir, "config")
+
+        self.geoCoreDir = os.path.join(configDir, "geoCore")
+        self._fileNames = [os.path.join(configDir, "config.yml"),
+            os.path.join(self.geoCoreDir, "geoCore.yml")]
+        self._fingerprint = None
+
+        self.settings = self._readConfig(self._fileNames[0])
+        self.geoCore = self._readConfig(self._fileNames[1])
 
-        self.settings = self._readConfig(os.path.join(self.myDir, "config", "config.yml"))
-        self.geoCore = self._readConfig(os.path.join(self.myDir, "config/geoCore", "geoCore.yml"))
+        # lookup tables of geoCore.yml
+        geoCore = self.geoCore or {}
+        self.boxes = geoCore.get('boxes') or {}
+        self.colors = geoCore.get('colors') or {}
+        self.descriptions = geoCore.get('descriptions') or {}
+        self.facies = geoCore.get('facies') or {}
+
+    def texturePath(self, texture):
+        """Return the path of a texture given relative to geoCore.yml"""
+        if not isinstance(texture, str) or len(texture) == 0:
+            return None
+        return os.path.join(self.geoCoreDir, texture)
+
+    def fingerprint(self):
+        """Return a hash of the configuration files' contents"""
+        if self._fingerprint is None:
+            h = hashlib.sha1(self.geoCoreDir.encode('utf-8'))
+            for fileName in self._fileNames:
+                try:
+                    with open(fileName, 'rb') as f:
+                        h.update(f.read())
+                except OSError:
+                    pass
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
 
     def _readConfig(self, fileName):
         """Return a YML file's contents.
         The file is assumed to be encoded in utf-8"""
         try:
+            stat = os.stat(fileName)
+            stamp = (stat.st_mtime_ns, stat.st_size)
+            cached = Config._cache.get(fileName)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+
             with open(fileName, 'r', encoding='utf-8') as f:
-                return yaml.safe_load(f)
+                contents = yaml.load(f, Loader=SafeLoader)
+            Config._cache[fileName] = (stamp, contents)
+            return contents
         except yaml.parser.ParserError as pe:
             self.showMessage("Error", "Failed to parse YML: {0}".format(pe))
         except FileNotFoundError:
             self.showMessage("Error", "File {0} was not found.".format(fileName))
+        return None
@@ -0,0 +1,171 @@
+""" This module contains the class LayerDataIndex
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import os
+import threading
+from qgis.core import QgsExpression, QgsFeatureRequest, QgsProviderRegistry, QgsVectorLayerFeatureSource
+
+# maximum number of IDs per "ID" IN (...) request
+CHUNK_SIZE = 500
+
+class LayerDataIndex:
+    """LayerDataIndex keeps the layer data (Schichtdaten) of a data layer
+    in memory. The rows are indexed by the ID of the drilling profile and
+    are loaded on demand. There is one index per data layer for the whole
+    QGIS session. Edits of the layer invalidate the affected IDs only.
+    The rows may be loaded in a background thread (see ProfileBuildTask)
+    while the layer's signals are handled in the main thread, so both
+    hold a lock."""
+
+    _indices = {}
+
+    @classmethod
+    def forLayer(cls, layer):
+        """Get the index of the given data layer"""
+        index = cls._indices.get(layer.id())
+        if index is None:
+            index = LayerDataIndex(layer)
+            cls._indices[layer.id()] = index
+        return index
+
+    def __init__(self, layer):
+        """Initialize the index and connect to the layer's signals"""
+        self._layer = layer
+        self._lock = threading.Lock()
+        self._rows = {} # ID -> list of dictionaries containing the layers' attributes
+        self._fids = {} # ID -> list of feature IDs
+        self._ids = {} # feature ID -> ID
+        self._updateFields()
+
+        layer.featureAdded.connect(self._featureAdded)
+        layer.featureDeleted.connect(self._featureDeleted)
+        layer.attributeValueChanged.connect(self._attributeValueChanged)
+        layer.dataChanged.connect(self.invalidate)
+        layer.updatedFields.connect(self._updateFields)
+        layer.willBeDeleted.connect(self._release)
+
+    def layerAttributes(self, profileIds, source=None):
+        """Get the layers' attributes of the given drilling profiles.
+        Returns a dictionary mapping the profile's ID (as string) to a list
+        of dictionaries containing the layers' attributes. IDs which are not
+        indexed yet are fetched from the data provider in one go. In a
+        background thread pass the featureSource() to fetch them from."""
+        with self._lock:
+            missing = [i for i in profileIds if str(i) not in self._rows]
+            if len(missing) > 0:
+                self._load(missing, source if source is not None else self._layer)
+            return {str(i): self._rows[str(i)] for i in profileIds}
+
+    def cacheKey(self):
+        """Describe the layer's contents for the ProfileCache. Returns None
+        if changes can not be detected, i.e. the layer is not read from a
+        file (e.g. from a database) or has unsaved edits."""
+        layer = self._layer
+        if layer.isModified():
+            return None
+        path = QgsProviderRegistry.instance().decodeUri(layer.providerType(), layer.source()).get('path')
+        if not path or not os.path.isfile(path):
+            return None
+        stamps = []
+        # attributes of shapefiles are stored in the .dbf, recent changes of a GeoPackage in the -wal
+        for fileName in (path, os.path.splitext(path)[0] + ".dbf", path + "-wal"):
+            if os.path.isfile(fileName):
+                stat = os.stat(fileName)
+                stamps.append("{}:{}".format(stat.st_mtime_ns, stat.st_size))
+        return "{}|{}|{}|{}".format(layer.providerType(), layer.source(),
+            layer.subsetString(), "|".join(stamps))
+
+    def featureSource(self):
+        """Get a snapshot of the layer's features which may be used in a
+        background thread. Call it from the main thread."""
+        return QgsVectorLayerFeatureSource(self._layer)
+
+    def invalidate(self):
+        """Drop all indexed rows"""
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        """Drop all indexed rows (holding the lock)"""
+        self._rows = {}
+        self._fids = {}
+        self._ids = {}
+
+    def _load(self, profileIds, source):
+        """Fetch the layer data of the given drilling profiles (holding
+        the lock). The features are requested in chunks of "ID" IN (...)
+        expressions."""
+        for i in profileIds:
+            self._rows[str(i)] = []
+            self._fids[str(i)] = []
+
+        column = QgsExpression.quotedColumnRef("ID")
+        for i in range(0, len(profileIds), CHUNK_SIZE):
+            values = ", ".join([QgsExpression.quotedValue(v) for v in profileIds[i:i + CHUNK_SIZE]])
+            qfr = QgsFeatureRequest(QgsExpression("{} IN ({})".format(column, values)))
+            # we may want to sort the features by "schichtnr"
+            for sd in source.getFeatures(qfr):
+                profileId = str(sd.attributes()[self._idIndex])
+                self._rows.setdefault(profileId, []).append(dict(zip(self._names, sd.attributes())))
+                self._fids.setdefault(profileId, []).append(sd.id())
+                self._ids[sd.id()] = profileId
+
+    def _invalidateId(self, profileId):
+        """Drop the indexed rows of the given drilling profile (holding the lock)"""
+        self._rows.pop(profileId, None)
+        for fid in self._fids.pop(profileId, []):
+            self._ids.pop(fid, None)
+
+    def _featureAdded(self, fid):
+        """A feature was added to the layer"""
+        feature = self._layer.getFeature(fid)
+        if feature.isValid():
+            with self._lock:
+                self._invalidateId(str(feature.attributes()[self._idIndex]))
+
+    def _featureDeleted(self, fid):
+        """A feature was deleted from the layer"""
+        with self._lock:
+            profileId = self._ids.get(fid)
+            if profileId is not None:
+                self._invalidateId(profileId)
+
+    def _attributeValueChanged(self, fid, idx, value):
+        """An attribute of a feature was changed"""
+        with self._lock:
+            profileId = self._ids.get(fid)
+            if profileId is not None:
+                self._invalidateId(profileId)
+            if idx == self._idIndex:
+                # the feature now belongs to another drilling profile
+                self._invalidateId(str(value))
+
+    def _updateFields(self):
+        """The layer's fields were changed"""
+        fields = self._layer.fields()
+        with self._lock:
+            self._names = [field.name() for field in fields]
+            self._idIndex = fields.lookupField("ID")
+            self._clear()
+
+    def _release(self):
+        """The layer is about to be deleted"""
+        LayerDataIndex._indices.pop(self._layer.id(), None)
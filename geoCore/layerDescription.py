@@ -0,0 +1,151 @@
+""" This module contains the class DescriptionBuilder
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from collections import namedtuple
+from qgis.core import Qgis
+from qgis.PyQt.QtCore import QVariant
+
+from .diagnostics import Diagnostic, MISSING_KEY, MISSING_MAIN_GROUP
+from .petrography import parsePetrography
+
+# The drawing of a layer: main group (name), box width, description
+# (info), colour code and path of the texture
+LayerDescription = namedtuple('LayerDescription', ['name', 'width', 'info', 'color', 'texture'])
+
+# marks a missing entry in the flat lookup tables
+_MISSING = object()
+
+def _isNull(value):
+    """Return True for NULL values (None or QVariant)"""
+    return value is None or isinstance(value, QVariant)
+
+def _flatten(section, key):
+    """Make a lookup table of the given key of all entries of a
+    section of geoCore.yml. Entries without the key are left out."""
+    return {name: entry[key] for name, entry in section.items()
+        if isinstance(entry, dict) and key in entry}
+
+class DescriptionBuilder:
+    """DescriptionBuilder determines the drawing of a layer from its
+    petrography, facies, comment and colour. The lookups in geoCore.yml are
+    flattened into lookup tables once. The result is cached for each
+    combination of petrography, facies and colour; the comment is inserted
+    into the cached description. The problems of a combination's lookups
+    are recorded, so they can be counted for every layer."""
+
+    def __init__(self, config):
+        """Flatten the lookup tables of the configuration"""
+        self._texturePath = config.texturePath
+        self._boxes = set(config.boxes)
+        self._boxWidths = _flatten(config.boxes, 'width')
+        self._boxNames = _flatten(config.boxes, 'longname')
+        self._colors = set(config.colors)
+        self._colorNames = _flatten(config.colors, 'longname')
+        self._colorCodes = _flatten(config.colors, 'code')
+        self._colorTextures = _flatten(config.colors, 'texture')
+        self._descriptions = set(config.descriptions)
+        self._descriptionNames = _flatten(config.descriptions, 'longname')
+        self._descriptionTextures = _flatten(config.descriptions, 'texture')
+        self._facies = config.facies
+        self._cache = {} # (petrography, facies, colour) -> (description, info parts, problems)
+
+    def describe(self, petrography, facies, comment, color):
+        """Get the LayerDescription and the problems (Diagnostic)
+        of the lookups which failed"""
+        key = tuple(None if _isNull(v) else v for v in (petrography, facies, color))
+        cached = self._cache.get(key)
+        if cached is None:
+            cached = self._build(*key)
+            self._cache[key] = cached
+
+        description, (head, tail), problems = cached
+        if not _isNull(comment):
+            # the comment is placed between the main group's and the colour's name
+            description = description._replace(info=", ".join(head + [comment] + tail))
+        return description, problems
+
+    def _build(self, petrography, facies, color):
+        """Determine the description of a combination"""
+        problems = []
+        if isinstance(petrography, str):
+            p = parsePetrography(petrography)
+            gg, kg = p.main, p.codes
+        else:
+            gg, kg = None, ()
+
+        width = self._boxWidths.get(gg, _MISSING)
+        if width is _MISSING:
+            width = 0.1
+            problems.append(Diagnostic(MISSING_MAIN_GROUP, petrography, Qgis.Warning))
+
+        hasColor = color is not None and self._contains(self._colors, color, problems)
+        hasBox = self._contains(self._boxes, gg, problems)
+
+        head = []
+        if facies is not None:
+            head.append(self._lookup(self._facies, facies, problems, errorValue=facies))
+        head.append(self._field(hasBox, self._boxNames, gg, 'longname', problems, errorValue=gg))
+        for k in kg:
+            hasDescription = self._contains(self._descriptions, k, problems)
+            head.append(self._field(hasDescription, self._descriptionNames, k, 'longname',
+                problems, errorValue=k))
+        tail = [self._field(hasColor, self._colorNames, color, 'longname', problems)]
+        head = [i for i in head if i is not None]
+        tail = [i for i in tail if i is not None]
+
+        # the colour's texture takes precedence over the descriptions' textures
+        textures = [self._colorTextures.get(color) if hasColor else None]
+        textures.extend([self._descriptionTextures.get(k) for k in kg])
+        texture = next((t for t in textures if t is not None), None)
+
+        code = self._field(hasColor, self._colorCodes, color, 'code', problems)
+        description = LayerDescription(gg, width, ", ".join(head + tail), code,
+            self._texturePath(texture))
+        return description, (head, tail), tuple(problems)
+
+    @staticmethod
+    def _notFound(key, problems):
+        """Record that a key is missing in the configuration"""
+        problems.append(Diagnostic(MISSING_KEY, key, Qgis.Info))
+
+    def _contains(self, keys, key, problems):
+        """Return True if key is a key of the section of geoCore.yml"""
+        if key in keys:
+            return True
+        self._notFound(key, problems)
+        return False
+
+    def _lookup(self, table, key, problems, errorValue=None):
+        """Look up the key in a section of geoCore.yml"""
+        if key in table:
+            return table[key]
+        self._notFound(key, problems)
+        return errorValue
+
+    def _field(self, hasEntry, table, name, key, problems, errorValue=None):
+        """Look up a key of an entry of geoCore.yml, e.g. its longname"""
+        if not hasEntry:
+            return errorValue
+        value = table.get(name, _MISSING)
+        if value is _MISSING:
+            self._notFound(key, problems)
+            return errorValue
+        return value
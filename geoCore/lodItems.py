@@ -0,0 +1,90 @@
+""" This module contains graphics items with level of detail
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from qgis.PyQt.QtWidgets import (QGraphicsLineItem, QGraphicsRectItem, QGraphicsTextItem,
+    QStyleOptionGraphicsItem)
+
+from .paintResources import PaintResources
+
+# Texts and tick marks are not drawn below this level of detail.
+# At 1.0 one unit of the scene (1 mm of the drawing) is one pixel.
+MIN_LEVEL_OF_DETAIL = 0.35
+
+def _levelOfDetail(painter):
+    """Get the pixels per scene unit of the painter's transformation"""
+    return QStyleOptionGraphicsItem.levelOfDetailFromTransform(painter.worldTransform())
+
+def _isDetailVisible(painter):
+    """Return True if details are readable with the painter's transformation"""
+    return _levelOfDetail(painter) >= MIN_LEVEL_OF_DETAIL
+
+class LodTextItem(QGraphicsTextItem):
+    """Text which is only drawn if the view is zoomed in far enough"""
+
+    def paint(self, painter, option, widget=None):
+        """Paint the text if it is readable"""
+        if _isDetailVisible(painter):
+            super().paint(painter, option, widget)
+
+class LodLineItem(QGraphicsLineItem):
+    """Line (e.g. tick mark) which is only drawn if the
+    view is zoomed in far enough"""
+
+    def paint(self, painter, option, widget=None):
+        """Paint the line if it is distinguishable"""
+        if _isDetailVisible(painter):
+            super().paint(painter, option, widget)
+
+class TextureRectItem(QGraphicsRectItem):
+    """Rectangle filled with a colour and a texture (SVG file). The texture
+    is rasterized for the level of detail it is drawn at, so it is sharp
+    when zoomed in and its tiles are small when zoomed out."""
+
+    def __init__(self, rect, color, texture):
+        """Initialize the rectangle, rect is (x, y, width, height)"""
+        super().__init__(*rect)
+        self._color = color
+        self._texture = texture
+
+    def paint(self, painter, _option, _widget=None):
+        """Paint the rectangle with the texture of the level of detail"""
+        painter.setPen(self.pen())
+        painter.setBrush(PaintResources.brush(self._color, self._texture, _levelOfDetail(painter)))
+        painter.drawRect(self.rect())
+
+def addText(scene, text):
+    """Add a text with level of detail to the scene"""
+    item = LodTextItem(text)
+    scene.addItem(item)
+    return item
+
+def addLine(scene, x1, y1, x2, y2):
+    """Add a line with level of detail to the scene"""
+    item = LodLineItem(x1, y1, x2, y2)
+    scene.addItem(item)
+    return item
+
+def addTextureRect(scene, rect, color, texture):
+    """Add a rectangle (x, y, width, height) filled with a texture to the scene"""
+    item = TextureRectItem(rect, color, texture)
+    item.setPen(PaintResources.pen())
+    scene.addItem(item)
+    return item
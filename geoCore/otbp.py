@@ -25,10 +25,13 @@ class Otbp:
     base class for all objects (e.g. profiles, connectors and gauges)
     that will be painted later on."""
 
+    __slots__ = ('_xFac', '_yFac', '_items')
+
     def __init__(self):
         """Initialize the connector"""
         self._xFac = 1.0
         self._yFac = 1.0
+        self._items = [] # graphics items added to the scene
 
     def setXFac(self, xFac):
         """Set scaling factor for x-position"""
@@ -47,3 +50,22 @@ class Otbp:
 
     def paintDescription(self, scene):
         """Paint the object's description"""
+
+    def relayout(self):
+        """Update the geometry of the painted items,
+        e.g. after the scaling factors were changed"""
+
+    def isPainted(self):
+        """Return True if the object has items in a scene"""
+        return len(self._items) > 0
+
+    def removeItems(self, scene):
+        """Remove the object's items from the scene"""
+        for i in self._items:
+            scene.removeItem(i)
+        self._items = []
+
+    def _addItem(self, item):
+        """Keep a handle to an item added to the scene"""
+        self._items.append(item)
+        return item
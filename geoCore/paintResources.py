@@ -0,0 +1,124 @@
+""" This module contains the class PaintResources
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import math
+from collections import OrderedDict
+from qgis.PyQt.QtCore import QRectF, Qt
+from qgis.PyQt.QtGui import QBrush, QColor, QPainter, QPen, QPixmap, QTransform
+from qgis.PyQt.QtSvg import QSvgRenderer
+
+# width of a texture tile in scene units (mm), the height follows the SVG's aspect ratio
+TEXTURE_TILE_SIZE = 20
+# range of the pixels per scene unit of a rasterized texture tile. The level
+# of detail a texture is drawn at is rounded to a power of 2 within the range.
+MIN_TEXTURE_SCALE = 0.5
+MAX_TEXTURE_SCALE = 16
+# maximum number of rasterized texture tiles kept
+TEXTURE_CACHE_SIZE = 64
+
+def textureScale(levelOfDetail):
+    """Get the pixels per scene unit a texture is rasterized with
+    when it is drawn at the given level of detail"""
+    if levelOfDetail <= 0:
+        return MIN_TEXTURE_SCALE
+    return min(MAX_TEXTURE_SCALE, max(MIN_TEXTURE_SCALE, 2.0 ** round(math.log2(levelOfDetail))))
+
+class PaintResources:
+    """PaintResources provides the pens and brushes used for painting.
+    There are only few distinct colours in geoCore.yml, so the pens
+    and brushes are constructed once and shared by all drawings.
+    Textures (SVG files) are parsed once and rasterized into tiles
+    per colour and zoom level. The least recently used tiles are dropped."""
+
+    _pen = None
+    _brushes = {} # colour code -> brush
+    _renderers = {} # SVG file -> QSvgRenderer (None if invalid)
+    _textureBrushes = OrderedDict() # (colour code, SVG file, texture scale) -> brush
+
+    @classmethod
+    def pen(cls):
+        """Get the default pen"""
+        if cls._pen is None:
+            cls._pen = QPen()
+        return cls._pen
+
+    @classmethod
+    def brush(cls, color, texture=None, levelOfDetail=1.0):
+        """Get the brush of the given colour code. If texture (path to an
+        SVG file) is given the brush is filled with the texture on top,
+        rasterized for the level of detail (pixels per scene unit) it is
+        drawn at (see TextureRectItem)."""
+        if texture:
+            brush = cls._textureBrush(color, texture, textureScale(levelOfDetail))
+            if brush is not None:
+                return brush
+
+        brush = cls._brushes.get(color)
+        if brush is None:
+            brush = QBrush(QColor(color))
+            cls._brushes[color] = brush
+        return brush
+
+    @classmethod
+    def _textureBrush(cls, color, texture, scale):
+        """Get the brush with the texture tile rasterized with scale
+        pixels per scene unit"""
+        key = (color, texture, scale)
+        brush = cls._textureBrushes.get(key)
+        if brush is not None:
+            cls._textureBrushes.move_to_end(key)
+            return brush
+
+        renderer = cls._renderer(texture)
+        if renderer is None:
+            return None
+
+        # the tile has the aspect ratio of the SVG's view box, so the texture is not stretched
+        viewBox = renderer.viewBoxF()
+        aspect = 1.0
+        if viewBox.width() > 0 and viewBox.height() > 0:
+            aspect = viewBox.height() / viewBox.width()
+        width = max(1, round(TEXTURE_TILE_SIZE * scale))
+        height = max(1, round(TEXTURE_TILE_SIZE * aspect * scale))
+        pixmap = QPixmap(width, height)
+        if color:
+            pixmap.fill(QColor(color))
+        else:
+            pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        renderer.render(painter, QRectF(0, 0, width, height))
+        painter.end()
+
+        brush = QBrush(pixmap)
+        # one tile is TEXTURE_TILE_SIZE scene units wide
+        brush.setTransform(QTransform.fromScale(1 / scale, 1 / scale))
+        cls._textureBrushes[key] = brush
+        if len(cls._textureBrushes) > TEXTURE_CACHE_SIZE:
+            cls._textureBrushes.popitem(last=False)
+        return brush
+
+    @classmethod
+    def _renderer(cls, texture):
+        """Get the parsed SVG file"""
+        if texture not in cls._renderers:
+            renderer = QSvgRenderer(texture)
+            cls._renderers[texture] = renderer if renderer.isValid() else None
+        return cls._renderers[texture]
@@ -33,14 +33,18 @@ from qgis.PyQt import uic
 from qgis.PyQt import QtWidgets
 from qgis.PyQt.QtWidgets import QAction, QActionGroup, QMenu
 from qgis.PyQt.QtWidgets import QFileDialog, QMessageBox
-from qgis.PyQt.QtGui import QPainter, QImage, QColor
-from qgis.PyQt.QtSvg import QSvgGenerator
-from qgis.PyQt.QtCore import QRectF, QEvent
-from qgis.core import Qgis, QgsMessageLog
+from qgis.PyQt.QtCore import QEvent
+from qgis.core import Qgis, QgsApplication, QgsMessageLog
 
+from .drillingPosition import selectedDrillingPositions
+from .profileBuildTask import ProfileBuildTask
 from .profileBuilder import ProfileBuilder
 from .profilePainter import ProfilePainter
+from .sceneExport import exportScene
+from .transect import SORT_KEYS
 from .scale_dialog import ScaleDialog
+from .section_dialog import SectionDialog
+from .sectionLine import SectionLine
 
 # This loads your .ui file so that PyQt can populate your plugin
 # with the elements from Qt Designer
@@ -65,6 +69,16 @@ class PetroProfileDialog(QtWidgets.QDialog, FORM_CLASS):
         self._setupGeoDirectionActions()
         self._xFac = None
         self._yFac = None
+        self._builder = None
+        self._painter = None
+        self._otbps = []
+        self._task = None # ProfileBuildTask running in the background
+        self._features = [] # features to be drawn when the task is finished
+        self._selection = None # drilling positions of the selection, read once
+        self._directionAction = self._nsAction # action of the current direction
+        self._section = None # SectionLine the profiles are projected onto
+        self._sectionLayer = None # line layer and buffer chosen last
+        self._sectionBuffer = None
 
     def _setupScene(self):
         """Set up a new scene"""
@@ -72,6 +86,8 @@ class PetroProfileDialog(QtWidgets.QDialog, FORM_CLASS):
         self.view = self.findChild(QtWidgets.QGraphicsView, "graphicsView")
         self.view.setScene(self.scene)
         self.view.viewport().installEventFilter(self)
+        self.view.horizontalScrollBar().valueChanged.connect(self._updateVisibleProfiles)
+        self.view.verticalScrollBar().valueChanged.connect(self._updateVisibleProfiles)
 
     def _setupGeoDirectionActions(self):
         """Set up actions for geo-directions"""
@@ -95,6 +111,11 @@ class PetroProfileDialog(QtWidgets.QDialog, FORM_CLASS):
         self._ewAction.setEnabled(True)
         self._ewAction.setCheckable(True)
 
+        self._sectionAction = QAction("Section line...", self)
+        self._sectionAction.triggered.connect(self.drawProfilesAlongSection)
+        self._sectionAction.setEnabled(True)
+        self._sectionAction.setCheckable(True)
+
     def _getActions(self):
         """Get actions that are displayed in the context menu"""
         actions = []
@@ -109,6 +130,12 @@ class PetroProfileDialog(QtWidgets.QDialog, FORM_CLASS):
         exportAction.setEnabled(True)
         actions.append(exportAction)
 
+        diagnosticsAction = QAction("Save diagnostics...", self)
+        diagnosticsAction.triggered.connect(self._saveDiagnostics)
+        diagnosticsAction.setEnabled(self._builder is not None
+            and self._builder.diagnostics.count() > 0)
+        actions.append(diagnosticsAction)
+
         sep = QAction("", self)
         sep.setSeparator(True)
         actions.append(sep)
@@ -127,6 +154,9 @@ class PetroProfileDialog(QtWidgets.QDialog, FORM_CLASS):
         group.addAction(self._ewAction)
         actions.append(self._ewAction)
 
+        group.addAction(self._sectionAction)
+        actions.append(self._sectionAction)
+
         sepAbout = QAction("", self)
         sepAbout.setSeparator(True)
         actions.append(sepAbout)
@@ -154,6 +184,7 @@ class PetroProfileDialog(QtWidgets.QDialog, FORM_CLASS):
     def showEvent(self, e):
         """Override showEvent"""
         super().showEvent(e)
+        self._resetProfiles()
         self.drawProfilesNorthSouth()
 
     def wheelEvent(self, e):
@@ -167,6 +198,22 @@ class PetroProfileDialog(QtWidgets.QDialog, FORM_CLASS):
         else:
             s = 0.85
         self.view.scale(s, s)
+        self._updateVisibleProfiles()
+
+    def resizeEvent(self, e):
+        """Override resizeEvent"""
+        super().resizeEvent(e)
+        self._updateVisibleProfiles()
+
+    def _updateVisibleProfiles(self):
+        """Construct the items of the profiles in the visible area
+        and drop the items of profiles far out of view"""
+        if self._painter is None:
+            return
+        visible = self.view.mapToScene(self.view.viewport().rect()).boundingRect()
+        self._painter.materialize(visible)
+        margin = max(visible.width(), visible.height())
+        self._painter.evict(visible.adjusted(-margin, -margin, margin, margin))
 
     def eventFilter(self, obj, e):
         """Filter wheel event"""
@@ -183,14 +230,19 @@ class PetroProfileDialog(QtWidgets.QDialog, FORM_CLASS):
         if result:
             self._xFac = dlg.xFac()
             self._yFac = dlg.yFac()
-            if self._nsAction.isChecked():
-                self.drawProfilesNorthSouth()
-            elif self._snAction.isChecked():
-                self.drawProfilesSouthNorth()
-            elif self._weAction.isChecked():
-                self.drawProfilesWestEast()
-            elif self._ewAction.isChecked():
-                self.drawProfilesEastWest()
+            self._rescaleProfiles()
+
+    def _rescaleProfiles(self):
+        """Apply the scaling factors to the painted profiles.
+        The existing items are moved and resized only."""
+        if self._painter is None:
+            return
+        self._painter.setViewSize(self.view.width(), self.view.height())
+        self._painter.applyScale(self._xFac, self._yFac)
+        self._painter.relayout(self._otbps)
+        self.view.resetTransform()
+        self.view.setSceneRect(self.scene.itemsBoundingRect())
+        self._updateVisibleProfiles()
 
     def _exportToFile(self):
         """Export drawing to file"""
@@ -200,62 +252,41 @@ class PetroProfileDialog(QtWidgets.QDialog, FORM_CLASS):
 
         self._exportWithPainter(name)
 
-    def _svgPaintDevice(self, name, sourceRect, targetRect):
-        """Get QSvgGenerator as paint device"""
-        generator = QSvgGenerator()
-        generator.setDescription("This SVG was generated with the geoCore "
-            "plugin of QGIS, written by T-Systems on site services GmbH")
-        generator.setTitle("geoCore")
-        generator.setSize(sourceRect.size().toSize())
-        generator.setViewBox(targetRect)
-        generator.setFileName(name)
-        return generator
-
-    def _imgPaintDevice(self, sourceRect):
-        """Get QImage as paint device"""
-        img = QImage(sourceRect.width(), sourceRect.height(),
-            QImage.Format_ARGB32)
-        img.fill(QColor("transparent"))
-        return img
-
-    def _getSourceAndTargetRect(self):
-        """Returns the source and target rect for export"""
-        self.scene.clearSelection()
-        margin = 5
-        sourceRect = self.scene.itemsBoundingRect()
-        sourceRect.adjust(-margin, -margin, margin, margin)
-        targetRect = QRectF(0, 0, sourceRect.width(), sourceRect.height())
-        return sourceRect, targetRect
-
     def _exportWithPainter(self, name):
         """Export as image file"""
         try:
-            sourceRect, targetRect = self._getSourceAndTargetRect()
-
-            pd = None
-            if Path(name).suffix.upper() == ".SVG":
-                pd = self._svgPaintDevice(name, sourceRect, targetRect)
-            else:
-                pd = self._imgPaintDevice(sourceRect)
-
-            painter = QPainter()
-            painter.begin(pd)
-            painter.setRenderHint(QPainter.Antialiasing)
-            self.scene.render(painter, targetRect, sourceRect)
-            painter.end()
-            if hasattr(pd, 'save') and callable(pd.save):
-                pd.save(name)
+            self.scene.clearSelection()
+            exportScene(self.scene, name, self._painter)
             QgsMessageLog.logMessage("exported to {}".format(name),
                 level=Qgis.Info)
         except IOError:
             self.showMessage("Error", "Failed to export to {}".format(name),
                 Qgis.Critical)
+        self._updateVisibleProfiles()
+
+    def _saveDiagnostics(self):
+        """Save the problems found in the layer data to a CSV file"""
+        home = str(Path.home())
+        name = QFileDialog.getSaveFileName(self, "Save diagnostics", home, "CSV (*.csv)")
+        if (name is None) or (len(name[0]) == 0):
+            return
+
+        filename = name[0]
+        if len(Path(filename).suffix) == 0:
+            filename = filename + ".csv"
+        try:
+            self._builder.diagnostics.writeCsv(filename)
+            QgsMessageLog.logMessage("diagnostics saved to {}".format(filename),
+                level=Qgis.Info)
+        except IOError:
+            self.showMessage("Error", "Failed to save diagnostics to {}".format(filename),
+                Qgis.Critical)
 
     def _getFilename(self):
         """Get file name via file dialog"""
         home = str(Path.home())
         name = QFileDialog.getSaveFileName(self, "Export to file", home,
-            "Vector graphics (*.svg);;Images (*.png *.jpg)")
+            "Vector graphics (*.svg *.pdf);;Images (*.png *.jpg);;Tiled TIFF (*.tif *.tiff)")
 
         if (name is None) or (len(name[0]) == 0):
             return None
@@ -265,6 +296,8 @@ class PetroProfileDialog(QtWidgets.QDialog, FORM_CLASS):
         if len(suffix) == 0:
             if "svg" in name[1]:
                 filename = filename + ".svg"
+            elif "tif" in name[1]:
+                filename = filename + ".tif"
             else:
                 filename = filename + ".png"
 
@@ -272,45 +305,166 @@ class PetroProfileDialog(QtWidgets.QDialog, FORM_CLASS):
 
     def drawProfilesNorthSouth(self):
         """Draw profiles in direction from north to south"""
-        self._nsAction.setChecked(True)
-        crit = lambda f: -f.attribute('ycoord') # north -> south
+        self._setDirection(self._nsAction)
+        crit = SORT_KEYS["ns"] # north -> south
         self._drawProfiles(crit)
 
     def drawProfilesSouthNorth(self):
         """Draw profiles in direction from south to north"""
-        self._snAction.setChecked(True)
-        crit = lambda f: f.attribute('ycoord') # south -> north
+        self._setDirection(self._snAction)
+        crit = SORT_KEYS["sn"] # south -> north
         self._drawProfiles(crit)
 
     def drawProfilesWestEast(self):
         """Draw profiles in direction from west to east"""
-        self._weAction.setChecked(True)
-        crit = lambda f: f.attribute('xcoord') # west -> east
+        self._setDirection(self._weAction)
+        crit = SORT_KEYS["we"] # west -> east
         self._drawProfiles(crit)
 
     def drawProfilesEastWest(self):
         """Draw profiles in direction from east to west"""
-        self._ewAction.setChecked(True)
-        crit = lambda f: -f.attribute('xcoord') # east -> west
+        self._setDirection(self._ewAction)
+        crit = SORT_KEYS["ew"] # east -> west
         self._drawProfiles(crit)
 
-    def _drawProfiles(self, sortCrit):
-        """Draw the selected drilling profiles"""
+    def drawProfilesAlongSection(self):
+        """Draw the drilling positions within a buffer of a section line.
+        The line is the selected (or first) feature of a line layer."""
+        dlg = SectionDialog(self._sectionLayer, self._sectionBuffer, self)
+        dlg.show()
+        result = dlg.exec_() # Run the dialog event loop
+        section = None
+        if result and dlg.layer() is not None:
+            section = SectionLine.fromLayer(dlg.layer(), dlg.bufferDistance(),
+                self.iface.activeLayer())
+            if section is None:
+                self.showMessage("Info", "Layer {} contains no line.".format(dlg.layer().name()),
+                    Qgis.Info)
+        if section is None:
+            # keep the current drawing
+            if self._section is None:
+                self._directionAction.setChecked(True)
+            return
+
+        self._sectionLayer = dlg.layer()
+        self._sectionBuffer = dlg.bufferDistance()
+        self._section = section
+        self._drawProfiles(None)
+
+    def _setDirection(self, action):
+        """Check the action of the direction and leave the section line"""
+        action.setChecked(True)
+        self._directionAction = action
+        self._section = None
+
+    def _resetProfiles(self):
+        """Drop the profiles built for the previous selection"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
         self.scene.clear()
-        features = self._getSortedDrillingPositions(sortCrit)
-        builder = ProfileBuilder(self.iface.activeLayer().name(),
-            self.showMessage)
-        pac = builder.getProfilesAndConnectors(features)
-        painter = ProfilePainter(self.scene, self.view.width(), self.view.height())
-        painter.applyScale(self._xFac, self._yFac)
-        painter.paint(pac, len(pac) == 1)
+        self._builder = None
+        self._painter = None
+        self._otbps = []
+        self._selection = None
+
+    def _drawProfiles(self, sortCrit):
+        """Draw the selected drilling profiles (sortCrit None: the drilling
+        profiles along the section line).
+        The profiles are built once per selection in the background. Changing
+        the direction only re-arranges and reconnects the profiles already built."""
+        if self._builder is None:
+            self._builder = ProfileBuilder(self.iface.activeLayer().name(),
+                self.showMessage)
+
+        try:
+            self._features = self._getSortedDrillingPositions(sortCrit)
+        except KeyError as e:
+            self.showMessage("Error", str(e.args[0]), Qgis.Critical)
+            return
+        if self._task is not None:
+            # the running task builds the profiles, they are arranged afterwards
+            return
+
+        missing = self._builder.missingFeatures(self._features)
+        source = None
+        if len(self._features) > 1 and len(missing) > 0:
+            source = self._builder.dataSource()
+        if source is None:
+            # nothing to build (or the data layer is missing, which is reported then)
+            self._arrangeProfiles()
+            return
+
+        task = ProfileBuildTask(self._builder, self._features, source)
+        task.profilesBuilt.connect(lambda profiles: self._paintPreview(task, profiles))
+        task.message.connect(self.showMessage)
+        task.taskCompleted.connect(lambda: self._buildFinished(task, True))
+        task.taskTerminated.connect(lambda: self._buildFinished(task, False))
+        self._task = task
+        QgsApplication.taskManager().addTask(task)
+
+    def _paintPreview(self, task, profiles):
+        """Paint a chunk of profiles built in the background"""
+        if task is not self._task:
+            return # the task was replaced
+
+        firstChunk = self._painter is None
+        if firstChunk:
+            self._setupPainter()
+        self._painter.paintPreview(profiles)
+        if firstChunk:
+            self.view.resetTransform()
+        self.view.setSceneRect(self.scene.itemsBoundingRect())
+        self._updateVisibleProfiles()
+
+    def _buildFinished(self, task, completed):
+        """The profiles were built in the background"""
+        if task is not self._task:
+            return # the task was replaced
+        self._task = None
+        if not completed:
+            # canceled by the user: draw the profiles built so far
+            missing = {id(f) for f in self._builder.missingFeatures(self._features)}
+            self._features = [f for f in self._features if id(f) not in missing]
+        self._arrangeProfiles()
+
+    def _setupPainter(self):
+        """Create the painter of the scene and pass on the view's settings"""
+        if self._painter is None:
+            self._painter = ProfilePainter(self.scene, self.view.width(), self.view.height())
+            self._painter.setLazy(True)
+        self._painter.setViewSize(self.view.width(), self.view.height())
+        self._painter.applyScale(self._xFac, self._yFac)
+
+    def _arrangeProfiles(self):
+        """Arrange, connect and paint the profiles of the features"""
+        otbps = self._builder.getProfilesAndConnectors(self._features)
+
+        # connectors and gauges of the previous direction are obsolete,
+        # so are the profiles no longer selected
+        self._setupPainter()
+        keep = {id(o) for o in otbps}
+        for o in self._otbps:
+            if id(o) not in keep:
+                self._painter.remove(o)
+
+        self._otbps = otbps
+        self._painter.paint(self._otbps, len(self._otbps) == 1)
         self.view.resetTransform()
         self.view.setSceneRect(self.scene.itemsBoundingRect())
+        self._updateVisibleProfiles()
 
     def _getSortedDrillingPositions(self, crit):
-        """Sort profiles using given criterium"""
-        features = self.iface.activeLayer().selectedFeatures()
-        return sorted(features, key=crit)
+        """Sort the selected drilling positions using given criterium.
+        Only the ID and the coordinates of the features are read, once per
+        selection, i.e. changing the direction only sorts them again.
+        Without criterium get the positions along the section line."""
+        if crit is None:
+            return self._section.positions(self.iface.activeLayer(), self._builder.config.settings)
+        if self._selection is None:
+            self._selection = selectedDrillingPositions(self.iface.activeLayer(),
+                self._builder.config.settings)
+        return sorted(self._selection, key=crit)
 
     def _aboutPlugin(self):
         """Show the about dialog"""
@@ -0,0 +1,86 @@
+""" This module contains the parser of the petrography codes
+
+    A petrography code consists of the main group (Großgruppe) followed by
+    the descriptions (Kleingruppe) in parentheses. Descriptions may be
+    qualified by nested descriptions, e.g. S(u4, h, lam) or U(fs(u1)).
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+
+# number of distinct petrography codes whose parse results are kept
+PARSE_CACHE_SIZE = 65536
+
+# A description and the descriptions qualifying it, e.g. fs(u1)
+Component = namedtuple('Component', ['code', 'components'])
+
+# The parsed petrography: the main group, the descriptions (tree of
+# Components) and the codes of all descriptions in order of appearance
+Petrography = namedtuple('Petrography', ['main', 'components', 'codes'])
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parsePetrography(text):
+    """Parse a petrography code. Petrography codes repeat heavily,
+    so the results are memoized. Unbalanced parentheses are tolerated."""
+    pos = 0
+    while pos < len(text) and text[pos] not in "(,":
+        pos = pos + 1
+    main = text[:pos].strip()
+
+    components = ()
+    if pos < len(text) and text[pos] == "(":
+        components, pos = _parseComponents(text, pos + 1)
+    return Petrography(main, components, tuple(_codes(components)))
+
+def _parseComponents(text, pos):
+    """Parse the comma separated descriptions up to the closing parenthesis.
+    Returns the descriptions and the position after the parenthesis."""
+    components = []
+    code = []
+    nested = ()
+    while pos < len(text):
+        c = text[pos]
+        pos = pos + 1
+        if c == "(":
+            nested, pos = _parseComponents(text, pos)
+        elif c in ",)":
+            _addComponent(components, "".join(code), nested)
+            code = []
+            nested = ()
+            if c == ")":
+                return tuple(components), pos
+        else:
+            code.append(c)
+    _addComponent(components, "".join(code), nested)
+    return tuple(components), pos
+
+def _addComponent(components, code, nested):
+    """Add a description unless it is empty"""
+    code = code.strip()
+    if len(code) > 0 or len(nested) > 0:
+        components.append(Component(code, nested))
+
+def _codes(components):
+    """Get the codes of the descriptions depth first"""
+    for c in components:
+        if len(c.code) > 0:
+            yield c.code
+        yield from _codes(c.components)
@@ -19,13 +19,17 @@
     along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-from functools import reduce
+from . import lodItems
 from .otbp import Otbp
+from .profileColumns import ProfileColumns
 
 class Profile(Otbp):
     """Profile represents a petrographic drilling profile.
     This class contains all relevant data for drawing"""
 
+    __slots__ = ('x', 'y', 'margin', 'name', 'columns', '_boxes',
+        '_nameItem', '_legend', '_leftDescription')
+
     def __init__(self, name):
         """Initialize the profile"""
         super().__init__()
@@ -33,21 +37,35 @@ class Profile(Otbp):
         self.y = 0.0 # in cm
         self.margin = 1 # margin for description
         self.name = name
-        self.boxes = []
+        self.columns = ProfileColumns()
+        self._boxes = None
+        # graphics items added to the scene
+        self._nameItem = None
+        self._legend = []
+        self._leftDescription = None
+
+    @property
+    def boxes(self):
+        """The profile's boxes. They are created from
+        the columns when they are needed for painting."""
+        if self._boxes is None:
+            self._boxes = self.columns.toBoxes(self.y, self._yFac)
+        return self._boxes
 
     def height(self):
         """Return the height of the profile"""
-        return reduce(lambda x, y: x + y, [b.height for b in self.boxes])
+        return self.columns.height()
 
     def partsHeights(self):
         """Return the height of each box"""
-        return [b.height for b in self.boxes]
+        return self.columns.partsHeights()
 
     def setYFac(self, yFac):
         """Set scaling factor for y-dimension"""
         super().setYFac(yFac)
-        for b in self.boxes:
-            b.setYFac(yFac)
+        if self._boxes is not None:
+            for b in self._boxes:
+                b.setYFac(yFac)
 
     def paint(self, scene):
         """Paint boxes onto scene"""
@@ -56,16 +74,65 @@ class Profile(Otbp):
         for b in self.boxes:
             b.paint(scene, self.x * self._xFac)
 
+    def relayout(self):
+        """Update the geometry of the painted items"""
+        if not self.isPainted():
+            return
+        if self._nameItem is not None:
+            self._placeName()
+        self._placeLegend()
+        for b in self.boxes:
+            b.relayout(self.x * self._xFac)
+        if self._leftDescription is not None:
+            self._placeLeftDescription()
+            xpos = self._rightDescriptionX()
+            for b in self.boxes:
+                b.relayoutDescription(xpos)
+
+    def extent(self, withDescription):
+        """Return the estimated extent (x, y, width, height) of the
+        painted profile in scene coordinates (mm), i.e. the boxes, the
+        name above, the legend below and optionally the description"""
+        left = self.x * self._xFac * 10
+        right = (self.x * self._xFac + self.columns.maxWidth(default=0) + self.margin) * 10
+        top = -self.y * self._yFac * 10 - 30 # name
+        bottom = -(self.y - self.height()) * self._yFac * 10 + 60 # legend
+        if withDescription:
+            left = left - 120 # height above sea level
+            right = right + 300 # depths and info
+        return left, top, right - left, bottom - top
+
+    def removeItems(self, scene):
+        """Remove the profile's items from the scene"""
+        super().removeItems(scene)
+        if self._boxes is not None:
+            for b in self._boxes:
+                b.removeItems(scene)
+        self._nameItem = None
+        self._legend = []
+        self._leftDescription = None
+
     def _paintLegend(self, scene):
         """Paint legend explaining the width of the individual
         layers/boxes below the profile"""
+        self._legend = []
+        for b in self.boxes:
+            line = self._addItem(lodItems.addLine(scene, 0, 0, 0, 0))
+            n = self._addItem(lodItems.addText(scene, b.name))
+            n.adjustSize()
+            self._legend.append((line, n))
+        self._placeLegend()
+
+    def _placeLegend(self):
+        """Place the legend below the profile"""
+        if len(self._legend) == 0:
+            return
+
         yBottom = self.y - self.height()
         yPos = (yBottom * self._yFac - self.margin) * -10 # cm to mm
-        for b in self.boxes:
+        for b, (line, n) in zip(self.boxes, self._legend):
             xPos = (self.x * self._xFac + b.width) * 10
-            scene.addLine(xPos, yPos, xPos, yPos + 20)
-            n = scene.addText(b.name)
-            n.adjustSize()
+            line.setLine(xPos, yPos, xPos, yPos + 20)
             n.setX(xPos - n.boundingRect().width() / 2)
             n.setY(yPos + 20 + self.margin)
 
@@ -85,47 +152,61 @@ class Profile(Otbp):
 
     def _paintName(self, scene):
         """Paint the profile's name"""
-        if len(self.boxes) == 0:
+        if len(self.columns) == 0:
             return
 
-        n = scene.addText("{}".format(self.name)) # name might be an int
-        n.adjustSize()
+        self._nameItem = self._addItem(scene.addText("{}".format(self.name))) # name might be an int
+        self._nameItem.adjustSize()
+        self._placeName()
+
+    def _placeName(self):
+        """Place the profile's name above the profile"""
+        n = self._nameItem
         n.setX(self.x * self._xFac * 10) # cm to mm
         n.setY(-self.y * self._yFac * 10 - n.boundingRect().height())
 
     def _paintLeftDescription(self, scene):
         """Paint left column of the description"""
-        if len(self.boxes) == 0:
+        if len(self.columns) == 0:
             return
 
-        yTop = self.y
-        top = scene.addText("{:.2f} m".format(float(yTop) / 100))
+        top = self._addItem(lodItems.addText(scene, "{:.2f} m".format(float(self.y) / 100)))
         top.adjustSize()
+        topLine = self._addItem(lodItems.addLine(scene, 0, 0, 0, 0))
+
+        bottom = self._addItem(lodItems.addText(scene, "{:.2f} m".format(float(self.y - self.height()) / 100)))
+        bottom.adjustSize()
+        bottomLine = self._addItem(lodItems.addLine(scene, 0, 0, 0, 0))
+
+        self._leftDescription = (top, topLine, bottom, bottomLine)
+        self._placeLeftDescription()
+
+    def _placeLeftDescription(self):
+        """Place left column of the description"""
+        top, topLine, bottom, bottomLine = self._leftDescription
+
+        yTop = self.y
         xpos = (self.x * self._xFac * 10) - top.textWidth() - (self.margin * 10) # cm to mm
         ypos = -yTop * self._yFac * 10 # cm to mm
         top.setX(xpos)
         top.setY(ypos - 2)
-        scene.addLine(xpos, ypos, 10 * (self.x * self._xFac - self.margin), ypos)
+        topLine.setLine(xpos, ypos, 10 * (self.x * self._xFac - self.margin), ypos)
 
         yBottom = self.y - self.height()
-        bottom = scene.addText("{:.2f} m".format(float(yBottom) / 100))
-        bottom.adjustSize()
         xpos = (self.x * self._xFac * 10) - bottom.textWidth() - (self.margin * 10) # cm to mm
         ypos = -yBottom * self._yFac * 10 - (bottom.boundingRect().height() - 2) # cm to mm
         bottom.setX(xpos)
         bottom.setY(ypos)
         ypos = -yBottom * self._yFac * 10
-        scene.addLine(xpos, ypos, 10 * (self.x * self._xFac - self.margin), ypos)
+        bottomLine.setLine(xpos, ypos, 10 * (self.x * self._xFac - self.margin), ypos)
 
     def _paintRightDescription(self, scene):
         """Paint the right column of the description."""
-        # x-position on the right
-        w = max(self.boxes, key=lambda b: b.width)
-        if w is not None:
-            w = w.width
-        else:
-            w = 20
-        xpos = self.x * self._xFac + w + self.margin
-
+        xpos = self._rightDescriptionX()
         for b in self.boxes:
             b.paintDescription(scene, xpos)
+
+    def _rightDescriptionX(self):
+        """Get the x-position of the right column of the description"""
+        w = self.columns.maxWidth(default=20)
+        return self.x * self._xFac + w + self.margin
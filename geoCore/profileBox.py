@@ -19,13 +19,18 @@
     along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-from qgis.PyQt.QtGui import QBrush, QColor, QPen
+from . import lodItems
+from .paintResources import PaintResources
 #from qgis.core import Qgis, QgsMessageLog
 
 class ProfileBox:
     """ProfileBox represents one layer of a petrographic drilling profile.
     This class contains all relevant data for drawing"""
 
+    __slots__ = ('layer', 'group', 'y', '_yFac', 'width', 'height', 'depth',
+        'name', 'info', 'color', 'texture', 'isFirst', 'isLast',
+        '_items', '_rect', '_depthMark', '_topDepthMark', '_infoText')
+
     def __init__(self, layer):
         """Initialize the box"""
         self.layer = layer
@@ -41,6 +46,12 @@ class ProfileBox:
         self.texture = ''
         self.isFirst = layer == 1
         self.isLast = False
+        # graphics items added to the scene
+        self._items = []
+        self._rect = None
+        self._depthMark = None
+        self._topDepthMark = None
+        self._infoText = None
 
     def setYFac(self, yFac):
         """Set scaling factor for y-dimension"""
@@ -48,45 +59,84 @@ class ProfileBox:
 
     def paint(self, scene, xpos):
         """Paint box onto scene"""
-        pen, brush = self._getPenAndBrush()
         x, y, w, h = self._getPosAndDims(xpos)
-        scene.addRect(x, y, w, h, pen, brush)
+        if self.texture:
+            # the texture is rasterized for the zoom level it is drawn at
+            rect = lodItems.addTextureRect(scene, (x, y, w, h), self.color, self.texture)
+        else:
+            pen, brush = self._getPenAndBrush()
+            rect = scene.addRect(x, y, w, h, pen, brush)
+        self._rect = self._addItem(rect)
 
     def paintDescription(self, scene, xpos):
         """Paint description"""
-        width = self._paintDepthMark(scene, xpos)
+        self._depthMark = self._addDepthMark(scene, float(self.depth))
         if self.isFirst:
-            self._paintTopDepthMark(scene, xpos)
-        self._paintInfo(scene, xpos, width)
+            self._topDepthMark = self._addDepthMark(scene, float(self.depth - self.height))
+        self._infoText = self._addItem(lodItems.addText(scene, self.info))
+        self._infoText.setTextWidth(200)
+        self.relayoutDescription(xpos)
+
+    def relayout(self, xpos):
+        """Update the geometry of the box"""
+        if self._rect is not None:
+            self._rect.setRect(*self._getPosAndDims(xpos))
+
+    def relayoutDescription(self, xpos):
+        """Update the position of the description"""
+        if self._depthMark is None:
+            return
+        width = self._placeDepthMark(xpos)
+        if self._topDepthMark is not None:
+            self._placeTopDepthMark(xpos)
+        self._placeInfo(xpos, width)
+
+    def removeItems(self, scene):
+        """Remove the box's items from the scene"""
+        for i in self._items:
+            scene.removeItem(i)
+        self._items = []
+        self._rect = None
+        self._depthMark = None
+        self._topDepthMark = None
+        self._infoText = None
+
+    def _addItem(self, item):
+        """Keep a handle to an item added to the scene"""
+        self._items.append(item)
+        return item
+
+    def _addDepthMark(self, scene, depth):
+        """Add the text and line of a depth mark"""
+        d = self._addItem(lodItems.addText(scene, "{:.2f} cm".format(depth)))
+        d.adjustSize()
+        line = self._addItem(lodItems.addLine(scene, 0, 0, 0, 0))
+        return d, line
 
-    def _paintTopDepthMark(self, scene, xpos):
-        """Paint depth at the top of the layer"""
+    def _placeTopDepthMark(self, xpos):
+        """Place depth at the top of the layer"""
         x, y, _, _ = self._getPosAndDims(xpos)
-        d = scene.addText("{:.2f} cm".format(float(self.depth - self.height)))
-        d.adjustSize()
+        d, line = self._topDepthMark
         d.setX(x)
         d.setY(y - (d.boundingRect().height() - 2))
 
-        scene.addLine(x, y, x + d.boundingRect().width(), y)
+        line.setLine(x, y, x + d.boundingRect().width(), y)
 
-    def _paintDepthMark(self, scene, xpos):
-        """Paint depth at the bottom of the layer box"""
+    def _placeDepthMark(self, xpos):
+        """Place depth at the bottom of the layer box"""
         x, y, _, h = self._getPosAndDims(xpos)
-        d = scene.addText("{:.2f} cm".format(float(self.depth)))
-        d.adjustSize()
+        d, line = self._depthMark
         d.setX(x)
         d.setY(y + h - (d.boundingRect().height() - 2))
 
-        scene.addLine(x, y + h, x + d.boundingRect().width(), y + h)
+        line.setLine(x, y + h, x + d.boundingRect().width(), y + h)
         return d.boundingRect().width()
 
-    def _paintInfo(self, scene, xpos, xoffset):
-        """Paint the info text"""
+    def _placeInfo(self, xpos, xoffset):
+        """Place the info text"""
         x, y, _, _ = self._getPosAndDims(xpos)
-        t = scene.addText(self.info)
-        t.setX(x + xoffset)
-        t.setY(y)
-        t.setTextWidth(200)
+        self._infoText.setX(x + xoffset)
+        self._infoText.setY(y)
 
     def _getPosAndDims(self, xpos):
         """Scales the position (x, y) as well as width and height"""
@@ -99,7 +149,4 @@ class ProfileBox:
 
     def _getPenAndBrush(self):
         """Get the pen and brush"""
-        col = QColor(self.color)
-        pen = QPen()
-        brush = QBrush(col)
-        return pen, brush
+        return PaintResources.pen(), PaintResources.brush(self.color)
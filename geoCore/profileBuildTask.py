@@ -0,0 +1,80 @@
+""" This module contains the class ProfileBuildTask
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from qgis.core import QgsTask
+from qgis.PyQt.QtCore import pyqtSignal
+
+# number of profiles built before they are handed over for painting
+CHUNK_SIZE = 50
+
+class ProfileBuildTask(QgsTask):
+    """ProfileBuildTask builds the missing profiles of the features in a
+    background thread. Each chunk of built profiles is handed over with the
+    signal profilesBuilt (received in the main thread) so the profiles may
+    be painted while the rest is still loading. Messages of the builder
+    are passed on with the signal message."""
+
+    profilesBuilt = pyqtSignal(list)
+    message = pyqtSignal(str, str, int)
+
+    def __init__(self, builder, features, source):
+        """Initialize the task. Call it from the main thread. features
+        are the drilling positions in drawing order and source is the
+        builder's dataSource()."""
+        super().__init__("Building drilling profiles", QgsTask.CanCancel)
+        self._builder = builder
+        self._source = source
+        missing = {id(f) for f in builder.missingFeatures(features)}
+        positions = builder.getXPositions(features)
+        self._features = [f for f in features if id(f) in missing]
+        self._positions = [x for f, x in zip(features, positions) if id(f) in missing]
+
+    def run(self):
+        """Build the profiles chunk by chunk. The profile cache is
+        written once at the end, also if the task was canceled."""
+        showMessage = self._builder.showMessage
+        self._builder.showMessage = self._showMessage
+        completed = True
+        try:
+            for i in range(0, len(self._features), CHUNK_SIZE):
+                if self.isCanceled():
+                    completed = False
+                    break
+                chunk = self._features[i:i + CHUNK_SIZE]
+                self._builder.buildProfiles(chunk, self._source, save=False)
+
+                profiles = []
+                for f, x in zip(chunk, self._positions[i:i + CHUNK_SIZE]):
+                    p = self._builder.builtProfile(f)
+                    if p is not None:
+                        p.x = x
+                        profiles.append(p)
+                if len(profiles) > 0:
+                    self.profilesBuilt.emit(profiles)
+                self.setProgress(100.0 * (i + len(chunk)) / len(self._features))
+            self._builder.saveCache()
+        finally:
+            self._builder.showMessage = showMessage
+        return completed
+
+    def _showMessage(self, title, message, level):
+        """Pass on a message of the builder to the main thread"""
+        self.message.emit(title, message, int(level))
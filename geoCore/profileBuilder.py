@@ -19,86 +19,96 @@
     along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
 """
 
-import re
-from math import sqrt
 from sys import maxsize
-from qgis.core import Qgis, QgsExpression, QgsFeatureRequest, QgsProject
+import numpy as np
+from qgis.core import Qgis, QgsProject
 # from qgis.core import QgsMessageLog
-from qgis.PyQt.QtCore import QVariant
 
 from .geoCoreConfig import Config
 from .profile import Profile
-from .profileBox import ProfileBox
+from .profileColumns import LayerRow
 from .connector import Connector
 from .orientation import Orientation
 from .gauge import Gauge
+from .csvLayerData import CsvLayerData
+from .layerDataIndex import LayerDataIndex
+from .profileCache import ProfileCache
+from .layerDescription import DescriptionBuilder
+from .diagnostics import Diagnostics
+from .transect import chainage
 
 class ProfileBuilder:
     """This class constructs the drilling profiles"""
 
-    def __init__(self, layerName, showMessage):
+    def __init__(self, layerName, showMessage, layerData=None, config=None):
         """Features are the 'Stammdaten', i.e. data regarding the drilling profiles.
-        config is the configuration element containing metadata to profiles."""
+        The layer data (Schichtdaten) is read from layerData (LayerDataIndex or
+        CsvLayerData) or else from the project's layer named "<layerName>_data".
+        config is the configuration element containing metadata to profiles
+        (by default the plugin's)."""
         self.nameLayerSchichtdaten = "{}_data".format(layerName)
+        self.layerData = layerData
         self.showMessage = showMessage
-        self.petroPattern = re.compile(r"(\w*)\s*(\(.*\))?", re.IGNORECASE)
-        self.config = Config(self.showErrorMessage)
+        self.config = config if config is not None else Config(self.showErrorMessage)
+        self._descriptions = DescriptionBuilder(self.config)
+        self.diagnostics = Diagnostics() # problems found in the layer data
+        self._shownDiagnostics = 0 # number of problems in the summary shown last
+        self._profiles = {} # ID -> profile (None if there is no layer data)
+        self._sourceData = None # layer data of the dataSource()
+        self._sourceCache = None # profile cache of the dataSource()
+
+    def _getLayerData(self):
+        """Get the layer data (Schichtdaten). Delimited text files are
+        read directly, any other layer through its LayerDataIndex."""
+        if self.layerData is not None:
+            return self.layerData
 
-    def _getSchichtdaten(self, profileId):
-        """Get the Schichtdaten corresponding to given drilling profile"""
-        qex = QgsExpression(QgsExpression().createFieldEqualityExpression("ID", profileId))
-        qfr = QgsFeatureRequest(qex)
         layerSchichtdaten = QgsProject().instance().mapLayersByName(self.nameLayerSchichtdaten)
 
         if len(layerSchichtdaten) == 0:
             self.showErrorMessage("Error", "Layer {} not found.".format(self.nameLayerSchichtdaten))
             return None
 
-        # we may want to sort the features by "schichtnr"
-        return layerSchichtdaten[0].getFeatures(qfr)
-
-    def _getLayerAttributes(self, schichtdaten):
-        """Get a list of dictionaries containing the layers' attributes"""
-        result = []
-        for sd in schichtdaten:
-            result.append({field.name(): attr for field, attr in zip(sd.fields(), sd.attributes())})
-        return result
-
-    def _splitPetrographie(self, petro):
-        """Split the given Petrograhie into Großgruppe and Kleingruppe"""
-        if not isinstance(petro, str):
-            return (None, [])
-        m = self.petroPattern.match(petro)
-        gg = m.group(1) # Großgruppe
-        kg = []
-        k = m.group(2) # Kleingruppe
-        if k is not None:
-            # chop off parantheses
-            k = k[1:-1]
-            # and make a list of it
-            kg = [s.strip() for s in k.split(",") if not (s.isspace() or (s == ''))]
-        return (gg, kg)
+        layer = layerSchichtdaten[0]
+        csvLayerData = CsvLayerData.forLayer(layer, self.config.settings)
+        if csvLayerData is not None:
+            return csvLayerData
+        return LayerDataIndex.forLayer(layer)
+
+    def dataSource(self):
+        """Get a snapshot of the layer data for buildProfiles() in a
+        background thread or None if the data layer does not exist.
+        Call it from the main thread."""
+        layerData = self._getLayerData()
+        if layerData is None:
+            return None
+        self._sourceData = layerData
+        self._sourceCache = self._getCache(layerData)
+        return layerData.featureSource()
+
+    def _getCache(self, layerData):
+        """Get the ProfileCache of the layer data and the configuration
+        or None if changes of the layer data can not be detected"""
+        if layerData is None:
+            return None
+        key = layerData.cacheKey()
+        if key is None:
+            return None
+        return ProfileCache.forKey("{}|{}".format(key, self.config.fingerprint()))
 
     def getProfilesAndConnectors(self, features):
-        """Get the drilling profiles and its connectors"""
+        """Get the drilling profiles and its connectors.
+        The features (DrillingPosition) are expected in drawing order. Profiles which were
+        built before are reused, i.e. only their x-position is updated."""
+        self.buildProfiles(features)
+        self.showDiagnostics()
+
         profiles = []
-        if len(features) > 0:
-            x = features[0].attribute(self.config.settings["xCoord"])
-            y = features[0].attribute(self.config.settings["yCoord"])
-            xp = 0
-            for f in features:
-                # The x-position (xp) of the drilling profile is the distance
-                # to the previous coordinate. We start with xp = 0.
-                # The y-position of the profile is the elevation (z-coordinate).
-                distance = sqrt((f.attribute(self.config.settings["xCoord"]) - x)**2
-                            + (f.attribute(self.config.settings["yCoord"]) - y)**2)
-                xp = xp + distance
-                yp = f.attribute(self.config.settings["zCoord"]) * 100 # convert to cm
-
-                profiles.append(self._getProfile(f.attribute("id"), xp * 100, yp))
-
-                x = f.attribute(self.config.settings["xCoord"])
-                y = f.attribute(self.config.settings["yCoord"])
+        for f, xp in zip(features, self.getXPositions(features)):
+            p = self._profiles[str(f.id)]
+            if p is not None:
+                p.x = xp
+            profiles.append(p)
 
         actualProfiles = []
         actualFeatures = []
@@ -114,71 +124,113 @@ class ProfileBuilder:
 
         return actualProfiles + connectors + gauges
 
-    def _getProfile(self, profileId, x, y):
-        """Construct a profile from feature"""
-        schichtdaten = self._getSchichtdaten(profileId)
-        if schichtdaten is None:
+    def missingFeatures(self, features):
+        """Get the features whose profiles were not built yet"""
+        return [f for f in features if str(f.id) not in self._profiles]
+
+    def builtProfile(self, feature):
+        """Get the profile built for the feature (None if there is no layer data)"""
+        return self._profiles.get(str(feature.id))
+
+    def buildProfiles(self, features, source=None, save=True):
+        """Construct the profiles of the features which were not built yet.
+        In a background thread pass the dataSource() to read the layer data.
+        Profiles prepared in earlier sessions are taken from the ProfileCache.
+        Problems in the layer data are counted in diagnostics. If the profiles
+        are built in chunks pass save=False and call saveCache() at the end."""
+        missing = self.missingFeatures(features)
+        if len(missing) == 0:
+            return
+
+        if source is not None:
+            layerData, cache = self._sourceData, self._sourceCache
+        else:
+            layerData = self._getLayerData()
+            cache = self._getCache(layerData)
+
+        if cache is not None:
+            missing = [f for f in missing if not self._buildCachedProfile(f, cache)]
+            if len(missing) == 0:
+                return
+
+        layerAttributes = None
+        if layerData is not None:
+            layerAttributes = layerData.layerAttributes([f.id for f in missing], source)
+        for f in missing:
+            problems = []
+            profile = self._getProfile(f.id, self._getElevation(f), layerAttributes,
+                problems)
+            self._profiles[str(f.id)] = profile
+            for problem in problems:
+                self.diagnostics.add(problem, f.id)
+            if cache is not None:
+                cache.add(str(f.id), profile.columns, problems)
+        if cache is not None and save:
+            cache.save()
+
+    def saveCache(self):
+        """Write the profiles built from the dataSource() to its cache"""
+        if self._sourceCache is not None:
+            self._sourceCache.save()
+
+    def profileCache(self):
+        """Get the ProfileCache of the layer data or None if it is not cached"""
+        return self._getCache(self._getLayerData())
+
+    def _buildCachedProfile(self, feature, cache):
+        """Construct the profile of the feature from the cache.
+        Returns False if the profile is not cached."""
+        columns = cache.columns(str(feature.id))
+        if columns is None:
+            return False
+        profile = Profile(feature.id)
+        profile.y = self._getElevation(feature)
+        profile.columns = columns
+        self._profiles[str(feature.id)] = profile
+        for problem in cache.problems(str(feature.id)):
+            self.diagnostics.add(problem, feature.id)
+        return True
+
+    def _getElevation(self, feature):
+        """The y-position of the profile is the elevation (z-coordinate) in cm"""
+        return feature.z * 100 # convert to cm
+
+    def getXPositions(self, features):
+        """Get the x-positions of the features in cm.
+        The x-position of the drilling profile is the distance
+        to the previous coordinate. We start with 0. Features projected
+        onto a section line are placed at their chainage."""
+        return (chainage(features) * 100).tolist() # convert to cm
+
+    def _getProfile(self, profileId, y, layerAttributes, problems):
+        """Construct a profile from feature. The parameter layerAttributes
+        is the result of layerAttributes() of the layer data. The problems
+        found in the layers (Diagnostic) are appended to problems."""
+        if layerAttributes is None:
             return None
 
         profile = Profile(profileId)
-        profile.x = x
         profile.y = y
 
-        boxes = self.config.geoCore['boxes']
-        colors = self.config.geoCore['colors']
-        descriptions = self.config.geoCore['descriptions']
-        facies = self.config.geoCore['facies']
-        layerAttributes = self._getLayerAttributes(schichtdaten)
+        settings = self.config.settings
+        layerAttributes = layerAttributes.get(str(profileId), [])
         for l in layerAttributes:
-            pb = ProfileBox(l[self.config.settings["layerNo"]])
-            pb.group = l[self.config.settings["group"]]
-            pb.isLast = l[self.config.settings["layerNo"]] == len(layerAttributes)
-            pb.y = y
-            pb.height = l[self.config.settings["depthTo"]]-l[self.config.settings["depthFrom"]]
-            pb.depth = l[self.config.settings["depthTo"]]
-
-            gg, kg = self._splitPetrographie(l[self.config.settings["petrography"]])
-            pb.name = gg
-            try:
-                pb.width = boxes[gg]['width']
-            except KeyError:
-                pb.width = 0.1
-                self.showMessage("Warning", "Missing main group in petrography: {}"
-                    .format(l[self.config.settings["petrography"]]), Qgis.Warning)
-
-            color = self._cfgLookup(colors, l[self.config.settings["color"]])
-            pb.color = self._cfgLookup(color, 'code')
-            pb.texture = self._cfgLookup(color, 'texture', showError=False)
-
-            ggDict = self._cfgLookup(boxes, gg)
-            infoList = []
-            infoList.append(self._cfgLookup(facies, l[self.config.settings["facies"]],
-                errorValue=l[self.config.settings["facies"]]))
-            infoList.append(self._cfgLookup(ggDict, 'longname', errorValue=gg))
-            for k in kg:
-                kgDict = self._cfgLookup(descriptions, k)
-                infoList.append(self._cfgLookup(kgDict, 'longname', errorValue=k))
-            infoList.append(l[self.config.settings["comment"]])
-            infoList.append(self._cfgLookup(color, 'longname'))
-            pb.info = ", ".join([i for i in infoList if (i is not None) and not isinstance(i, QVariant)])
-
-            profile.boxes.append(pb)
-
-            # QgsMessageLog.logMessage("Profile {} - petro: {}({}), width: {}, height: {}, x: {}, y: {}, info: {}"
-            #     .format(profileId, gg, kg, pb.width, pb.height, x, y, pb.info), level=Qgis.Info)
-            y = y - pb.height
+            # layers of the same kind share their description
+            d, layerProblems = self._descriptions.describe(l[settings["petrography"]],
+                l[settings["facies"]], l[settings["comment"]], l[settings["color"]])
+            problems.extend(layerProblems)
 
-        return profile
+            profile.columns.append(LayerRow(l[settings["layerNo"]],
+                l[settings["group"]],
+                l[settings["depthFrom"]],
+                l[settings["depthTo"]],
+                d.width, d.name, d.info, d.color, d.texture))
 
-    def _cfgLookup(self, dictionary, key, showError=True, errorValue=None):
-        """Return key from dictionary. Return None if key not found."""
-        try:
-            if (dictionary is not None) and not isinstance(key, QVariant):
-                return dictionary[key]
-        except KeyError:
-            if showError:
-                self.showMessage("Info", "Key {} not found in config.".format(key), Qgis.Info)
-        return errorValue
+            # QgsMessageLog.logMessage("Profile {} - petro: {}, width: {}, info: {}"
+            #     .format(profileId, d.name, d.width, d.info), level=Qgis.Info)
+
+        profile.columns.finish()
+        return profile
 
     def _connectProfiles(self, profiles, features):
         """Multiple profiles need to be connected in the drawing"""
@@ -187,20 +239,39 @@ class ProfileBuilder:
 
         connectors = []
 
-        i = 1 # we start with the second profile connecting it with the first
         minLen = min(len(profiles), len(features))
+        indices = [self._getProfileIndex(p) for p in profiles[:minLen]]
+        i = 1 # we start with the second profile connecting it with the first
         while i < minLen:
-            cs = self._connectTwoProfiles(profiles[i - 1], profiles[i])
+            cs = self._connectTwoProfiles(profiles[i - 1], profiles[i], indices[i - 1], indices[i])
             for c in cs:
                 connectors.append(c)
             i = i + 1
 
         return connectors
 
-    def _connectTwoProfiles(self, pLeft, pRight):
-        """Get connectors for left and right profile"""
+    def _getProfileIndex(self, profile):
+        """Get the lookup tables needed to connect the profile, i.e.
+        the columns groups, heights and widths as lists, the depth at the
+        top of each box (plus the total depth) and a dictionary mapping
+        each group to the index of its last box."""
+        columns = profile.columns
+        groups = columns.group.tolist()
+        lastIndices = {g: i for i, g in enumerate(groups)}
+        return (groups, columns.heights().tolist(), columns.width.tolist(),
+            columns.prefixDepths().tolist(), lastIndices)
+
+    def _connectTwoProfiles(self, pLeft, pRight, indexLeft, indexRight):
+        """Get connectors for left and right profile.
+        The parameters indexLeft and indexRight are the profiles'
+        lookup tables (see _getProfileIndex)."""
         connectors = []
 
+        groupsLeft, heightsLeft, widthsLeft, _, _ = indexLeft
+        groupsRight, heightsRight, _, _, _ = indexRight
+        if len(groupsLeft) == 0 or len(groupsRight) == 0:
+            return connectors # a profile without layers is not connected
+
         # last group on the left and right
         lgLeft = None
 
@@ -210,64 +281,70 @@ class ProfileBuilder:
 
         l = 0
         r = 0
-        while l < len(pLeft.boxes):
-            if lgLeft != pLeft.boxes[l].group:
+        while l < len(groupsLeft):
+            if lgLeft != groupsLeft[l]:
                 # new connector
                 c = Connector()
                 c.x1 = pLeft.x
                 c.y1 = yLeft
-                c.xOffset = pLeft.boxes[l].width
+                c.xOffset = widthsLeft[l]
 
                 # find the corresponding group on the right side
                 found = False
-                while (r < len(pRight.boxes)) and not found:
-                    if pLeft.boxes[l].group == pRight.boxes[r].group:
+                while (r < len(groupsRight)) and not found:
+                    if groupsLeft[l] == groupsRight[r]:
                         c.x2 = pRight.x
                         c.y2 = yRight
                         found = True
                         connectors.append(c)
-                    yRight = yRight - pRight.boxes[r].height
+                    yRight = yRight - heightsRight[r]
                     r = r + 1
 
-            lgLeft = pLeft.boxes[l].group
-            yLeft = yLeft - pLeft.boxes[l].height
+            lgLeft = groupsLeft[l]
+            yLeft = yLeft - heightsLeft[l]
 
-            if len(pLeft.boxes) != len(pRight.boxes) and r == len(pRight.boxes):
-                # last profile box on the right but not on the left
-                c = Connector()
-                c.x2 = pRight.x
-                c.y2 = pRight.y - pRight.height()
+            if r == len(groupsRight) or l == len(groupsLeft) - 1:
+                connectors.extend(self._connectLastBoxes(pLeft, pRight, indexLeft, indexRight, (l, r)))
 
-                found = False
-                ll = len(pLeft.boxes) - 1
-                while ll >= l and not found:
-                    if pLeft.boxes[ll].group == pRight.boxes[r - 1].group:
-                        c.x1 = pLeft.x
-                        c.y1 = pLeft.y - sum([b.height for b in pLeft.boxes[:ll+1]])
-                        c.xOffset = pLeft.boxes[ll].width
-                        found = True
-                        connectors.append(c)
-                    ll = ll - 1
+            l = l + 1
+
+        return connectors
 
-            if l == len(pLeft.boxes) - 1:
-                # last profile box on the left
+    @staticmethod
+    def _connectLastBoxes(pLeft, pRight, indexLeft, indexRight, position):
+        """Get the connectors of the last boxes of the left or the right
+        profile. position is (l, r), i.e. the box on the left which is
+        connected and the next box on the right (see _connectTwoProfiles)."""
+        connectors = []
+        groupsLeft, _, widthsLeft, depthsLeft, lastIndicesLeft = indexLeft
+        groupsRight, _, _, depthsRight, lastIndicesRight = indexRight
+        l, r = position
+
+        if len(groupsLeft) != len(groupsRight) and r == len(groupsRight):
+            # last profile box on the right but not on the left
+            # connect to the last corresponding group on the left
+            ll = lastIndicesLeft.get(groupsRight[r - 1], -1)
+            if ll >= l:
                 c = Connector()
                 c.x1 = pLeft.x
-                c.y1 = pLeft.y - pLeft.height()
-                c.xOffset = pLeft.boxes[l].width
-
-                # connect to last corresponding group on the right
-                found = False
-                rr = len(pRight.boxes) - 1
-                while (rr >= r - 1) and not found:
-                    if pLeft.boxes[l].group == pRight.boxes[rr].group:
-                        c.x2 = pRight.x
-                        c.y2 = pRight.y - sum([b.height for b in pRight.boxes[:rr+1]])
-                        found = True
-                        connectors.append(c)
-                    rr = rr - 1
+                c.y1 = pLeft.y - depthsLeft[ll + 1]
+                c.xOffset = widthsLeft[ll]
+                c.x2 = pRight.x
+                c.y2 = pRight.y - depthsRight[-1]
+                connectors.append(c)
 
-            l = l + 1
+        if l == len(groupsLeft) - 1:
+            # last profile box on the left
+            # connect to last corresponding group on the right
+            rr = lastIndicesRight.get(groupsLeft[l], -1)
+            if rr >= 0 and rr >= r - 1:
+                c = Connector()
+                c.x1 = pLeft.x
+                c.y1 = pLeft.y - depthsLeft[-1]
+                c.xOffset = widthsLeft[l]
+                c.x2 = pRight.x
+                c.y2 = pRight.y - depthsRight[rr + 1]
+                connectors.append(c)
 
         return connectors
 
@@ -286,16 +363,24 @@ class ProfileBuilder:
 
     def _determineMinMax(self, profiles):
         """Determine the min and max values in x- and y-dimension"""
-        minx = maxsize
-        maxx = 0
-        miny = maxsize
-        maxy = 0
-        for p in profiles:
-            minx = min(minx, p.x)
-            maxx = max(maxx, p.x)
-            miny = min(miny, p.y, p.y - p.height())
-            maxy = max(maxy, p.y, p.y - p.height())
-        return minx, maxx, miny, maxy
+        xs = np.array([p.x for p in profiles], dtype=float)
+        tops = np.array([p.y for p in profiles], dtype=float)
+        bottoms = tops - np.array([p.height() for p in profiles], dtype=float)
+        minx = min(maxsize, xs.min())
+        maxx = max(0, xs.max())
+        miny = min(maxsize, tops.min(), bottoms.min())
+        maxy = max(0, tops.max(), bottoms.max())
+        return float(minx), float(maxx), float(miny), float(maxy)
+
+    def showDiagnostics(self):
+        """Show a summary of the problems in the layer data
+        unless it was shown before"""
+        if self.diagnostics.count() == self._shownDiagnostics:
+            return
+        self._shownDiagnostics = self.diagnostics.count()
+        summary = self.diagnostics.summary()
+        if summary is not None:
+            self.showMessage(*summary)
 
     def showErrorMessage(self, title, message):
         """Display an error message"""
@@ -0,0 +1,332 @@
+""" This module contains the class ProfileCache
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import numpy as np
+
+from qgis.PyQt.QtCore import QStandardPaths
+
+from .profileColumns import LayerRow, ProfileColumns
+from .diagnostics import Diagnostic
+
+MAGIC = b'GCPC'
+VERSION = 4
+# magic, version, number of profiles, rows, problems, strings and bytes of the string table
+HEADER = struct.Struct('<4sIQQQQQ')
+# number of cache files kept, the least recently written are removed
+MAX_CACHE_FILES = 16
+
+# kinds of the layer number and group values
+NONE, INT, FLOAT, STR = 0, 1, 2, 3
+
+PROFILE_DTYPE = np.dtype([('id', '<i8'), ('start', '<i8'), ('count', '<i8')])
+ROW_DTYPE = np.dtype([
+    ('depthFrom', '<f8'), ('depthTo', '<f8'), ('width', '<f8'),
+    ('layer', '<f8'), ('group', '<f8'), # numeric layer number and group
+    ('layerStr', '<i4'), ('groupStr', '<i4'), # layer number and group as string
+    ('color', '<i4'), ('name', '<i4'), ('info', '<i4'), ('texture', '<i4'), # strings (-1: None)
+    ('layerKind', '<i1'), ('groupKind', '<i1')])
+# problems found while building the profiles (strings, -1: None)
+# the key is encoded like the layer number and group to keep its type
+PROBLEM_DTYPE = np.dtype([('profile', '<i4'), ('kind', '<i4'), ('level', '<i4'),
+    ('key', '<f8'), ('keyStr', '<i4'), ('keyKind', '<i1')])
+
+def _align(offset):
+    """Align the offset to 8 bytes"""
+    return (offset + 7) & ~7
+
+class ProfileCache:
+    """ProfileCache stores the prepared columns of profiles on disk, so
+    petrography, configuration lookups and descriptions are not evaluated
+    again in later sessions. A cache file belongs to a key (the data source
+    and the configuration) and holds a string table of interned strings,
+    a profile table, the rows and the problems of the profiles as fixed size
+    records. The file is memory-mapped. New profiles are kept until save()
+    rewrites the file."""
+
+    _caches = {} # file name -> ProfileCache
+
+    @classmethod
+    def forKey(cls, key):
+        """Get the cache of the given key (a string describing the
+        layer data's source and the configuration)"""
+        directory = os.path.join(QStandardPaths.writableLocation(QStandardPaths.CacheLocation), "geoCore")
+        fileName = os.path.join(directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + ".gcc")
+        cache = cls._caches.get(fileName)
+        if cache is None:
+            cache = ProfileCache(fileName)
+            cls._caches[fileName] = cache
+        return cache
+
+    def __init__(self, fileName):
+        """Initialize the cache and map the file if it exists"""
+        self._fileName = fileName
+        self._lock = threading.Lock()
+        self._map = None
+        self._profiles = np.empty(0, dtype=PROFILE_DTYPE)
+        self._rows = np.empty(0, dtype=ROW_DTYPE)
+        self._problems = np.empty(0, dtype=PROBLEM_DTYPE)
+        self._stringOffsets = np.zeros(1, dtype='<u8')
+        self._stringsStart = 0
+        self._strings = {} # index -> decoded string
+        self._index = {} # ID -> index in the profile table
+        self._problemIndex = {} # ID -> indices in the problem table
+        self._pending = {} # ID -> (ProfileColumns, problems) not saved yet
+        self._open()
+
+    def columns(self, profileId):
+        """Get the columns of the given profile or None if not cached"""
+        with self._lock:
+            if profileId in self._pending:
+                return self._pending[profileId][0]
+            i = self._index.get(profileId)
+            if i is None:
+                return None
+            start = int(self._profiles[i]['start'])
+            return self._toColumns(self._rows[start:start + int(self._profiles[i]['count'])])
+
+    def problems(self, profileId):
+        """Get the problems (Diagnostic) found while building the profile"""
+        with self._lock:
+            if profileId in self._pending:
+                return list(self._pending[profileId][1])
+            return [Diagnostic(self._string(kind), self._decode(keyKind, key, keyStr), level)
+                for _, kind, level, key, keyStr, keyKind
+                in self._problems[self._problemIndex.get(profileId, [])].tolist()]
+
+    def add(self, profileId, columns, problems=()):
+        """Add the columns of a profile and the problems (Diagnostic)
+        found while building it. They are written by save()."""
+        with self._lock:
+            self._pending[profileId] = (columns, tuple(problems))
+
+    def takePending(self):
+        """Get the profiles added but not saved as list of (ID, columns,
+        problems) and forget them, e.g. to save them in another process"""
+        with self._lock:
+            pending = [(i, columns, problems) for i, (columns, problems) in self._pending.items()]
+            self._pending = {}
+        return pending
+
+    def save(self):
+        """Write the cache file including the profiles added. Returns
+        False if the file could not be written (e.g. because it is in
+        use by another process); the profiles are kept for the next try."""
+        with self._lock:
+            if len(self._pending) == 0:
+                return True
+            strings = [self._string(i) for i in range(len(self._stringOffsets) - 1)]
+            interned = {s: i for i, s in enumerate(strings)}
+            # the rows of the profiles replaced are left out
+            profiles = []
+            records = []
+            count = 0
+            for i, start, length in self._profiles.tolist():
+                if self._string(i) not in self._pending:
+                    records.append(self._rows[start:start + length])
+                    profiles.append((i, count, length))
+                    count = count + length
+            problems = [tuple(p) for p in self._problems.tolist()
+                if self._string(p[0]) not in self._pending]
+            for profileId, (columns, profileProblems) in self._pending.items():
+                records.append(self._toRecords(columns, strings, interned))
+                i = self._intern(profileId, strings, interned)
+                profiles.append((i, count, len(records[-1])))
+                count = count + len(records[-1])
+                for p in profileProblems:
+                    kind, number, string = self._encode(p.key, strings, interned)
+                    problems.append((i, self._intern(p.kind, strings, interned), int(p.level),
+                        number, string, kind))
+            # copied, as the mapped file is closed for writing
+            rows = np.concatenate(records)
+
+            try:
+                self._write(np.array(profiles, dtype=PROFILE_DTYPE), rows,
+                    np.array(problems, dtype=PROBLEM_DTYPE), strings)
+            except OSError:
+                return False
+            self._pending = {}
+            self._open()
+            self._removeOldFiles()
+            return True
+
+    def _open(self):
+        """Map the cache file. Files of other versions are ignored."""
+        self._close()
+        try:
+            with open(self._fileName, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return # no cache file yet (or empty)
+
+        self._map = mm
+        try:
+            magic, version, nProfiles, nRows, nProblems, nStrings, _ = HEADER.unpack_from(mm, 0)
+            if magic != MAGIC or version != VERSION:
+                self._close()
+                return
+            offset = _align(HEADER.size)
+            self._stringOffsets = np.frombuffer(mm, dtype='<u8', count=nStrings + 1, offset=offset)
+            offset = _align(offset + self._stringOffsets.nbytes)
+            self._profiles = np.frombuffer(mm, dtype=PROFILE_DTYPE, count=nProfiles, offset=offset)
+            offset = _align(offset + self._profiles.nbytes)
+            self._rows = np.frombuffer(mm, dtype=ROW_DTYPE, count=nRows, offset=offset)
+            offset = _align(offset + self._rows.nbytes)
+            self._problems = np.frombuffer(mm, dtype=PROBLEM_DTYPE, count=nProblems, offset=offset)
+            self._stringsStart = _align(offset + self._problems.nbytes)
+        except (struct.error, ValueError):
+            self._close()
+            return
+        self._index = {self._string(int(p)): i for i, p in enumerate(self._profiles['id'])}
+        for i, p in enumerate(self._problems['profile'].tolist()):
+            self._problemIndex.setdefault(self._string(p), []).append(i)
+
+    def _close(self):
+        """Unmap the cache file"""
+        self._profiles = np.empty(0, dtype=PROFILE_DTYPE)
+        self._rows = np.empty(0, dtype=ROW_DTYPE)
+        self._problems = np.empty(0, dtype=PROBLEM_DTYPE)
+        self._stringOffsets = np.zeros(1, dtype='<u8')
+        self._strings = {}
+        self._index = {}
+        self._problemIndex = {}
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass # still referenced, closed when garbage collected
+            self._map = None
+
+    def _write(self, profiles, rows, problems, strings):
+        """Write the cache file. The file is replaced at once."""
+        blob = [s.encode('utf-8') for s in strings]
+        stringOffsets = np.zeros(len(blob) + 1, dtype='<u8')
+        stringOffsets[1:] = np.cumsum([len(b) for b in blob])
+
+        os.makedirs(os.path.dirname(self._fileName), exist_ok=True)
+        tmpName = "{}.{}.tmp".format(self._fileName, os.getpid())
+        with open(tmpName, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(profiles), len(rows), len(problems),
+                len(strings), int(stringOffsets[-1])))
+            for array in (stringOffsets, profiles, rows, problems):
+                f.write(b'\x00' * (_align(f.tell()) - f.tell()))
+                f.write(array.tobytes())
+            f.write(b'\x00' * (_align(f.tell()) - f.tell()))
+            f.write(b''.join(blob))
+
+        self._close() # a mapped file cannot be replaced on all platforms
+        try:
+            os.replace(tmpName, self._fileName)
+        except OSError:
+            os.remove(tmpName)
+            self._open()
+            raise
+
+    def _removeOldFiles(self):
+        """Remove the least recently written cache files"""
+        directory = os.path.dirname(self._fileName)
+        try:
+            files = [os.path.join(directory, n) for n in os.listdir(directory) if n.endswith(".gcc")]
+            files.sort(key=os.path.getmtime, reverse=True)
+            for fileName in files[MAX_CACHE_FILES:]:
+                os.remove(fileName)
+        except OSError:
+            pass # in use, retried next time
+
+    def _string(self, i):
+        """Get a string of the string table"""
+        if i < 0:
+            return None
+        s = self._strings.get(i)
+        if s is None:
+            start = self._stringsStart + int(self._stringOffsets[i])
+            end = self._stringsStart + int(self._stringOffsets[i + 1])
+            s = self._map[start:end].decode('utf-8')
+            self._strings[i] = s
+        return s
+
+    @staticmethod
+    def _intern(s, strings, interned):
+        """Get the index of the string in the string table"""
+        if s is None:
+            return -1
+        i = interned.get(s)
+        if i is None:
+            i = len(strings)
+            strings.append(s)
+            interned[s] = i
+        return i
+
+    def _encode(self, value, strings, interned):
+        """Encode a layer number, group or problem key as (kind, number, string index)"""
+        if isinstance(value, (bool, int, np.integer)):
+            return INT, float(value), -1
+        if isinstance(value, (float, np.floating)):
+            return FLOAT, float(value), -1
+        if isinstance(value, str):
+            return STR, 0.0, self._intern(value, strings, interned)
+        return NONE, 0.0, -1 # e.g. NULL
+
+    def _decode(self, kind, number, string):
+        """Decode a layer number, group or problem key"""
+        if kind == INT:
+            return int(number)
+        if kind == FLOAT:
+            return float(number)
+        if kind == STR:
+            return self._string(string)
+        return None
+
+    def _toRecords(self, columns, strings, interned):
+        """Convert the columns of a profile to rows of the cache file"""
+        records = np.zeros(len(columns), dtype=ROW_DTYPE)
+        records['depthFrom'] = columns.depthFrom
+        records['depthTo'] = columns.depthTo
+        records['width'] = columns.width
+        groups = columns.group.tolist()
+        colorIndex = columns.colorIndex.tolist()
+        for i in range(len(columns)):
+            kind, number, string = self._encode(columns.layers[i], strings, interned)
+            records['layerKind'][i], records['layer'][i], records['layerStr'][i] = kind, number, string
+            kind, number, string = self._encode(groups[i], strings, interned)
+            records['groupKind'][i], records['group'][i], records['groupStr'][i] = kind, number, string
+            records['color'][i] = self._intern(columns.colors[colorIndex[i]], strings, interned)
+            records['name'][i] = self._intern(columns.names[i], strings, interned)
+            records['info'][i] = self._intern(columns.infos[i], strings, interned)
+            records['texture'][i] = self._intern(columns.textures[i], strings, interned)
+        return records
+
+    def _toColumns(self, records):
+        """Convert rows of the cache file to the columns of a profile"""
+        columns = ProfileColumns()
+        for r in records.tolist():
+            depthFrom, depthTo, width, layer, group, layerStr, groupStr, \
+                color, name, info, texture, layerKind, groupKind = r
+            columns.append(LayerRow(self._decode(layerKind, layer, layerStr),
+                self._decode(groupKind, group, groupStr),
+                depthFrom, depthTo, width,
+                self._string(name), self._string(info), self._string(color), self._string(texture)))
+        columns.finish()
+        return columns
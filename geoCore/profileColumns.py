@@ -0,0 +1,141 @@
+""" Module containing the class ProfileColumns
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+from collections import namedtuple
+from numbers import Number
+import numpy as np
+
+from .profileBox import ProfileBox
+
+# A layer of a profile as appended to ProfileColumns
+LayerRow = namedtuple('LayerRow', ['layer', 'group', 'depthFrom', 'depthTo', 'width',
+    'name', 'info', 'color', 'texture'])
+
+class ProfileColumns:
+    """ProfileColumns holds the layers of a profile column by column.
+    Depths, widths, groups and colours are kept in numpy arrays, the
+    texts in lists. ProfileBox objects are only created for painting."""
+
+    __slots__ = ('depthFrom', 'depthTo', 'width', 'group', 'colorIndex', 'colors',
+        'layers', 'names', 'infos', 'textures', '_rows', '_heights', '_prefixDepths')
+
+    def __init__(self):
+        """Initialize empty columns"""
+        self.depthFrom = np.empty(0)
+        self.depthTo = np.empty(0)
+        self.width = np.empty(0)
+        self.group = np.empty(0, dtype=object)
+        self.colorIndex = np.empty(0, dtype=np.int32)
+        self.colors = [] # distinct colour codes, referenced by colorIndex
+        self.layers = []
+        self.names = []
+        self.infos = []
+        self.textures = []
+        self._rows = []
+        self._heights = np.empty(0)
+        self._prefixDepths = np.zeros(1)
+
+    def __len__(self):
+        """Return the number of layers"""
+        return len(self.layers)
+
+    def append(self, row):
+        """Append a layer (LayerRow). Call finish() after the last layer
+        was appended."""
+        if row.color not in self.colors:
+            self.colors.append(row.color)
+        self._rows.append((row.depthFrom, row.depthTo, row.width, row.group,
+            self.colors.index(row.color)))
+        self.layers.append(row.layer)
+        self.names.append(row.name)
+        self.infos.append(row.info)
+        self.textures.append(row.texture)
+
+    def finish(self):
+        """Convert the appended layers into arrays"""
+        if len(self._rows) > 0:
+            depthFrom, depthTo, width, group, colorIndex = zip(*self._rows)
+            self.depthFrom = np.array(depthFrom, dtype=float)
+            self.depthTo = np.array(depthTo, dtype=float)
+            self.width = np.array(width, dtype=float)
+            self.group = self._groupArray(group)
+            self.colorIndex = np.array(colorIndex, dtype=np.int32)
+        self._rows = []
+        self._heights = self.depthTo - self.depthFrom
+        self._prefixDepths = np.concatenate(([0.0], np.cumsum(self._heights)))
+
+    def heights(self):
+        """Return the height of each layer"""
+        return self._heights
+
+    def prefixDepths(self):
+        """Return the depth at the top of each layer relative to the
+        surface followed by the total depth of the profile"""
+        return self._prefixDepths
+
+    def height(self):
+        """Return the height of the profile"""
+        return float(self._prefixDepths[-1])
+
+    def partsHeights(self):
+        """Return the height of each layer as list"""
+        return self._heights.tolist()
+
+    def maxWidth(self, default=20):
+        """Return the width of the widest layer"""
+        if len(self.width) == 0:
+            return default
+        return float(self.width.max())
+
+    def toBoxes(self, y, yFac):
+        """Create the ProfileBox objects of a profile at elevation y"""
+        boxes = []
+        tops = (y - self._prefixDepths[:-1]).tolist()
+        groups = self.group.tolist()
+        heights = self._heights.tolist()
+        depths = self.depthTo.tolist()
+        widths = self.width.tolist()
+        colorIndex = self.colorIndex.tolist()
+        for i, layer in enumerate(self.layers):
+            pb = ProfileBox(layer)
+            pb.group = groups[i]
+            pb.isLast = layer == len(self.layers)
+            pb.y = tops[i]
+            pb.height = heights[i]
+            pb.depth = depths[i]
+            pb.width = widths[i]
+            pb.name = self.names[i]
+            pb.info = self.infos[i]
+            pb.color = self.colors[colorIndex[i]]
+            pb.texture = self.textures[i]
+            pb.setYFac(yFac)
+            boxes.append(pb)
+        return boxes
+
+    @staticmethod
+    def _groupArray(groups):
+        """Keep numeric groups in a numeric array. Anything else is stored
+        as objects so groups compare like the original attribute values."""
+        if all(isinstance(g, Number) and not isinstance(g, bool) for g in groups):
+            return np.array(groups)
+        array = np.empty(len(groups), dtype=object)
+        array[:] = groups
+        return array
@@ -19,8 +19,23 @@
     along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
 """
 
+from bisect import bisect_left, bisect_right
+from qgis.PyQt.QtCore import Qt
+from qgis.PyQt.QtGui import QPen
+from qgis.PyQt.QtWidgets import QGraphicsRectItem
 from .profile import Profile
 
+class ProfileProxyItem(QGraphicsRectItem):
+    """Invisible placeholder covering the extent of a lazily painted
+    profile. The scene's index of these items is used to find the
+    profiles intersecting the visible area."""
+
+    def __init__(self, profile):
+        """Initialize the placeholder of the given profile"""
+        super().__init__()
+        self.profile = profile
+        self.setPen(QPen(Qt.NoPen))
+
 class ProfilePainter:
     """This class is used to construct the graphics items"""
 
@@ -34,6 +49,17 @@ class ProfilePainter:
         self._yFac = 1.0
         self._doAutoScaleX = True
         self._doAutoScaleY = True
+        self._lazy = False
+        self._addDescription = False
+        self._previewScaled = False
+        self._proxies = {} # id(profile) -> ProfileProxyItem
+        self._materialized = {} # id(profile) -> profile with items in the scene
+        self._described = {} # id(profile) -> addDescription it was painted with
+        self._otbpIds = [] # id() of the otbps scaled last
+        self._version = 0 # incremented when other otbps are scaled
+        self._heights = {} # id(otbp) -> (otbp, sorted non-zero heights of its parts)
+        self._autoXFac = (None, None) # (version, view width) -> auto-scaling factor
+        self._autoYFac = (None, None) # (version, view height) -> auto-scaling factor
 
     def applyScale(self, xFac, yFac):
         """Apply scaling factors in x- and y-dimension
@@ -53,11 +79,116 @@ class ProfilePainter:
             self._yFac = yFac
             self._doAutoScaleY = False
 
+    def setViewSize(self, viewWidth, viewHeight):
+        """Set the size of the view used for auto-scaling"""
+        self._viewWidth = viewWidth
+        self._viewHeight = viewHeight
+
+    def setLazy(self, lazy):
+        """Turn lazy painting of profiles on or off. If turned on
+        only a placeholder is added for each profile. The profile's
+        items are constructed by materialize()."""
+        self._lazy = lazy
+
     def paint(self, otbps, addDescription):
         """Construct items.
         The parameter otbps stands for "objects to be painted"
         (i.e. profiles and connectors). Parameter addDescription
-        denotes if a description shall be added."""
+        denotes if a description shall be added. Objects which
+        are painted already are relayouted only (unless the
+        description is added or removed)."""
+        self._addDescription = addDescription
+        self._previewScaled = False
+        self._applyScale(otbps)
+        self._paintOtbps(otbps)
+
+    def paintPreview(self, otbps):
+        """Construct the items of otbps arriving in chunks, e.g. while the
+        profiles are built in the background. The scaling factors are
+        determined with the first chunk and kept for the following ones.
+        Call paint() with all otbps at the end to arrange them finally."""
+        self._addDescription = False
+        if self._previewScaled:
+            for i in otbps:
+                i.setXFac(self._xFac)
+                i.setYFac(self._yFac)
+        else:
+            self._applyScale(otbps)
+            self._previewScaled = True
+        self._paintOtbps(otbps)
+
+    def relayout(self, otbps):
+        """Update the geometry of the already painted items,
+        e.g. after the scaling factors were changed.
+        No items are constructed."""
+        self._applyScale(otbps)
+        for i in otbps:
+            if id(i) in self._proxies:
+                self._placeProxy(i)
+            i.relayout()
+
+    def materialize(self, rect):
+        """Construct the items of the lazily painted profiles
+        intersecting the given rectangle (in scene coordinates)"""
+        for item in self.scene.items(rect):
+            if isinstance(item, ProfileProxyItem) and not item.profile.isPainted():
+                self._paintOtbp(item.profile)
+                self._materialized[id(item.profile)] = item.profile
+
+    def evict(self, rect):
+        """Remove the items of the lazily painted profiles
+        which do not intersect the given rectangle"""
+        for key, p in list(self._materialized.items()):
+            if not self._proxies[key].rect().intersects(rect):
+                self._removeItems(p)
+
+    def remove(self, otbp):
+        """Remove the items and the placeholder of an otbp
+        which is no longer painted"""
+        self._removeItems(otbp)
+        proxy = self._proxies.pop(id(otbp), None)
+        if proxy is not None:
+            self.scene.removeItem(proxy)
+
+    def _paintOtbps(self, otbps):
+        """Construct or relayout the items of the otbps. Profiles painted
+        with(out) description are painted again if that has changed."""
+        for i in otbps:
+            if (isinstance(i, Profile) and i.isPainted()
+                    and self._described.get(id(i)) != self._addDescription):
+                self._removeItems(i)
+            if self._lazy and isinstance(i, Profile):
+                self._placeProxy(i)
+            if i.isPainted():
+                i.relayout()
+            elif not (self._lazy and isinstance(i, Profile)):
+                self._paintOtbp(i)
+
+    def _paintOtbp(self, otbp):
+        """Construct the items of a single otbp"""
+        otbp.paint(self.scene)
+        if self._addDescription:
+            otbp.paintDescription(self.scene)
+        self._described[id(otbp)] = self._addDescription
+
+    def _removeItems(self, otbp):
+        """Remove the items of an otbp, but not its placeholder"""
+        otbp.removeItems(self.scene)
+        self._materialized.pop(id(otbp), None)
+        self._described.pop(id(otbp), None)
+
+    def _placeProxy(self, profile):
+        """Add or move the placeholder of a lazily painted profile"""
+        proxy = self._proxies.get(id(profile))
+        if proxy is None:
+            proxy = ProfileProxyItem(profile)
+            self.scene.addItem(proxy)
+            self._proxies[id(profile)] = proxy
+        proxy.setRect(*profile.extent(self._addDescription))
+
+    def _applyScale(self, otbps):
+        """Determine the scaling factors and pass them on to the otbps"""
+        self._updateVersion(otbps)
         if self._doAutoScaleX:
             self._setAutoXFac(otbps)
         if self._doAutoScaleY:
@@ -65,49 +196,91 @@ class ProfilePainter:
         for i in otbps:
             i.setXFac(self._xFac)
             i.setYFac(self._yFac)
-            i.paint(self.scene)
-            if addDescription:
-                i.paintDescription(self.scene)
+
+    def _updateVersion(self, otbps):
+        """Increment the version if other otbps than before are scaled.
+        The statistics of otbps no longer painted are dropped."""
+        ids = [id(o) for o in otbps]
+        if ids != self._otbpIds:
+            self._otbpIds = ids
+            self._version = self._version + 1
+            current = set(ids)
+            self._heights = {k: v for k, v in self._heights.items() if k in current}
 
     def _setAutoXFac(self, otbps):
-        """Set smart scaling factor for the x-dimension"""
+        """Set smart scaling factor for the x-dimension.
+        The factor is cached for the otbps and the view's width."""
+        key = (self._version, self._viewWidth)
+        if self._autoXFac[0] == key:
+            self._xFac = self._autoXFac[1]
+            return
+
         xPositions = [ p.x for p in otbps if isinstance(p, Profile) ]
 
         if len(xPositions) <= 1:
             return
 
-        diffs = list(map(lambda x, y: x - y, xPositions[1:], xPositions))
+        # profiles at the same position (e.g. projected onto a section line) are ignored
+        diffs = [ x - y for x, y in zip(xPositions[1:], xPositions) if x > y ]
+        if len(diffs) == 0:
+            return
 
         margin = 10
         vw = (self._viewWidth - margin) / 28.35 # pixel to cm
 
         self._xFac = vw / min(diffs)
+        self._autoXFac = (key, self._xFac)
 
     def _setAutoYFac(self, otbps):
-        """Set a smart scaling factor for the y-dimension"""
-        facs = [ self._determineYFac(o) for o in otbps ]
-        facsShrink = [ s for s in facs if s < 1.0 ]
-        facsStretch = [ s for s in facs if s >= 1.0 ]
+        """Set a smart scaling factor for the y-dimension.
+        The factor is cached for the otbps and the view's height."""
+        key = (self._version, self._viewHeight)
+        if self._autoYFac[0] == key:
+            self._yFac = self._autoYFac[1]
+            return
+
+        margin = 10
+        vh = (self._viewHeight - margin) / 28.35 # pixel to cm
+        shrink = None # largest factor < 1.0
+        stretch = None # smallest factor >= 1.0
+        for o in otbps:
+            s = self._determineYFac(o, vh)
+            if s < 1.0:
+                shrink = s if shrink is None else max(shrink, s)
+            else:
+                stretch = s if stretch is None else min(stretch, s)
 
         self._yFac = 1.0
 
-        if (len(facsShrink) > 0) and (len(facsStretch) > 0):
+        if (shrink is not None) and (stretch is not None):
             self._yFac = 1.0
-        elif len(facsShrink) > 0:
-            self._yFac = max(facsShrink)
-        elif len(facsStretch) > 0:
-            self._yFac = min(facsStretch)
+        elif shrink is not None:
+            self._yFac = shrink
+        elif stretch is not None:
+            self._yFac = stretch
+        self._autoYFac = (key, self._yFac)
 
-    def _determineYFac(self, otbp):
-        """Determine a smart scaling factor for the y-dimension"""
-        margin = 10
-        vh = (self._viewHeight - margin) / 28.35 # pixel to cm
-        facsShrink = [ vh / h for h in otbp.partsHeights() if h > vh and h != 0 ]
-        facsStretch = [ vh / h for h in otbp.partsHeights() if h <= vh and h != 0 ]
+    def _determineYFac(self, otbp, vh):
+        """Determine a smart scaling factor for the y-dimension, i.e. the
+        largest factor shrinking the parts higher than the view height vh
+        or else the smallest factor stretching the others. Without a
+        positive view height the otbp is not scaled."""
+        heights = self._sortedHeights(otbp)
+        if vh <= 0 or len(heights) == 0:
+            return 1.0 # the view is too small or there is nothing to scale
 
-        if len(facsShrink) > 0:
-            return max(facsShrink)
-        if len(facsStretch) > 0:
-            return min(facsStretch)
+        # the lowest part higher than vh is shrunk least
+        i = bisect_right(heights, vh)
+        if i < len(heights):
+            return vh / heights[i]
+        # the highest part is stretched least (negative heights yield negative factors)
+        negatives = bisect_left(heights, 0)
+        return vh / heights[negatives - 1 if negatives > 0 else -1]
 
-        return 1.0
+    def _sortedHeights(self, otbp):
+        """Get the sorted non-zero heights of the otbp's parts"""
+        entry = self._heights.get(id(otbp))
+        if entry is None or entry[0] is not otbp:
+            entry = (otbp, sorted(h for h in otbp.partsHeights() if h != 0))
+            self._heights[id(otbp)] = entry
+        return entry[1]
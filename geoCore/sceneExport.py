@@ -0,0 +1,274 @@
+""" This module contains the export of the scene to files
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import math
+import struct
+import zlib
+from pathlib import Path
+
+from qgis.PyQt.QtCore import QMarginsF, QRectF, QSizeF, Qt
+from qgis.PyQt.QtGui import QColor, QImage, QPageLayout, QPageSize, QPainter, QPdfWriter
+from qgis.PyQt.QtSvg import QSvgGenerator
+
+# edge length of a TIFF tile in pixels (must be a multiple of 16)
+TILE_SIZE = 1024
+# number of rows rendered at once for PNG files
+BAND_HEIGHT = 128
+# zlib compression level
+COMPRESSION_LEVEL = 6
+# margin around the drawing in scene units (mm)
+MARGIN = 5
+
+def exportScene(scene, fileName, painter=None):
+    """Export the drawing to the file. The format is determined by the
+    suffix: SVG, PDF, PNG, JPG or TIFF. If the scene's ProfilePainter
+    is given, lazily painted profiles are constructed for the export."""
+    sourceRect = scene.itemsBoundingRect()
+    sourceRect.adjust(-MARGIN, -MARGIN, MARGIN, MARGIN)
+    if isTiledFormat(fileName):
+        exportTiled(scene, sourceRect, fileName, painter)
+        return
+
+    if painter is not None:
+        # lazily painted profiles need to be complete for the export
+        painter.materialize(sourceRect)
+
+    suffix = Path(fileName).suffix.upper()
+    targetRect = QRectF(0, 0, sourceRect.width(), sourceRect.height())
+    if suffix == ".SVG":
+        pd = _svgPaintDevice(fileName, sourceRect, targetRect)
+    elif suffix == ".PDF":
+        pd = _pdfPaintDevice(fileName, sourceRect)
+        targetRect = QRectF() # the whole page
+    else:
+        pd = _imgPaintDevice(sourceRect)
+
+    qp = QPainter()
+    qp.begin(pd)
+    qp.setRenderHint(QPainter.Antialiasing)
+    scene.render(qp, targetRect, sourceRect)
+    qp.end()
+    if isinstance(pd, QImage) and not pd.save(fileName):
+        raise IOError("Failed to write {}".format(fileName))
+
+def _svgPaintDevice(fileName, sourceRect, targetRect):
+    """Get QSvgGenerator as paint device"""
+    generator = QSvgGenerator()
+    generator.setDescription("This SVG was generated with the geoCore "
+        "plugin of QGIS, written by T-Systems on site services GmbH")
+    generator.setTitle("geoCore")
+    generator.setSize(sourceRect.size().toSize())
+    generator.setViewBox(targetRect)
+    generator.setFileName(fileName)
+    return generator
+
+def _pdfPaintDevice(fileName, sourceRect):
+    """Get QPdfWriter as paint device. One unit of the scene is 1 mm."""
+    writer = QPdfWriter(fileName)
+    writer.setTitle("geoCore")
+    writer.setCreator("geoCore plugin of QGIS")
+    pageSize = QPageSize(QSizeF(sourceRect.width(), sourceRect.height()), QPageSize.Millimeter)
+    writer.setPageLayout(QPageLayout(pageSize, QPageLayout.Portrait, QMarginsF(0, 0, 0, 0)))
+    return writer
+
+def _imgPaintDevice(sourceRect):
+    """Get QImage as paint device"""
+    img = QImage(int(math.ceil(sourceRect.width())), int(math.ceil(sourceRect.height())),
+        QImage.Format_ARGB32)
+    img.fill(QColor("transparent"))
+    return img
+
+def isTiledFormat(fileName):
+    """Return True if the file is written with the tiled export"""
+    return Path(fileName).suffix.upper() in (".PNG", ".TIF", ".TIFF")
+
+def exportTiled(scene, sourceRect, fileName, painter=None):
+    """Render the sourceRect of the scene piece by piece into the file
+    (PNG or TIFF). The drawing is never held in memory as a whole.
+    Lazily painted profiles are constructed for each piece and dropped
+    afterwards, if the scene's ProfilePainter is given."""
+    width = int(math.ceil(sourceRect.width()))
+    height = int(math.ceil(sourceRect.height()))
+    if Path(fileName).suffix.upper() == ".PNG":
+        _exportPng(scene, sourceRect, fileName, painter, width, height)
+    else:
+        _exportTiff(scene, sourceRect, fileName, painter, width, height)
+
+def _renderPiece(scene, rect, width, height, painter):
+    """Render the rect of the scene into an RGBA image of the given size
+    and return its pixels row by row"""
+    if painter is not None:
+        painter.materialize(rect)
+
+    img = QImage(width, height, QImage.Format_ARGB32_Premultiplied)
+    img.fill(Qt.transparent)
+    qp = QPainter()
+    qp.begin(img)
+    qp.setRenderHint(QPainter.Antialiasing)
+    scene.render(qp, QRectF(0, 0, width, height), rect)
+    qp.end()
+
+    img = img.convertToFormat(QImage.Format_RGBA8888)
+    bits = img.constBits()
+    bits.setsize(img.bytesPerLine() * height)
+    return bytes(bits), img.bytesPerLine()
+
+def _exportTiff(scene, sourceRect, fileName, painter, width, height):
+    """Write the scene as tiled, deflate compressed RGBA TIFF file"""
+    columns = int(math.ceil(width / TILE_SIZE))
+    rows = int(math.ceil(height / TILE_SIZE))
+    # uncompressed size (upper bound) beyond 4 GB requires BigTIFF
+    bigTiff = columns * rows * TILE_SIZE * TILE_SIZE * 4 >= 2**32
+    with _TiffWriter(fileName, width, height, TILE_SIZE, bigTiff) as tiff:
+        for row in range(rows):
+            y = sourceRect.y() + row * TILE_SIZE
+            for column in range(columns):
+                x = sourceRect.x() + column * TILE_SIZE
+                data, _ = _renderPiece(scene, QRectF(x, y, TILE_SIZE, TILE_SIZE),
+                    TILE_SIZE, TILE_SIZE, painter)
+                tiff.writeTile(data)
+            if painter is not None:
+                painter.evict(QRectF(sourceRect.x(), y, sourceRect.width(), TILE_SIZE))
+
+def _exportPng(scene, sourceRect, fileName, painter, width, height):
+    """Write the scene as RGBA PNG file. The image data is rendered and
+    compressed in bands of BAND_HEIGHT rows."""
+    with open(fileName, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        _writePngChunk(f, b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+
+        compressor = zlib.compressobj(COMPRESSION_LEVEL)
+        for top in range(0, height, BAND_HEIGHT):
+            bandHeight = min(BAND_HEIGHT, height - top)
+            y = sourceRect.y() + top
+            data, bytesPerLine = _renderPiece(scene, QRectF(sourceRect.x(), y, width, bandHeight),
+                width, bandHeight, painter)
+            scanlines = b''.join(b'\x00' + data[r * bytesPerLine:r * bytesPerLine + width * 4]
+                for r in range(bandHeight))
+            _writePngChunk(f, b'IDAT', compressor.compress(scanlines))
+            if painter is not None:
+                painter.evict(QRectF(sourceRect.x(), y, sourceRect.width(), bandHeight))
+
+        _writePngChunk(f, b'IDAT', compressor.flush())
+        _writePngChunk(f, b'IEND', b'')
+
+def _writePngChunk(f, chunkType, data):
+    """Write a chunk of a PNG file"""
+    if chunkType == b'IDAT' and len(data) == 0:
+        return
+    f.write(struct.pack('>I', len(data)))
+    f.write(chunkType)
+    f.write(data)
+    f.write(struct.pack('>I', zlib.crc32(chunkType + data) & 0xffffffff))
+
+class _TiffWriter:
+    """_TiffWriter writes the tiles of an RGBA image to a (Big)TIFF file
+    in the order they are rendered. The image file directory is written
+    after the last tile, as only then the tiles' offsets are known."""
+
+    SHORT = 3
+    LONG = 4
+    LONG8 = 16
+
+    def __init__(self, fileName, width, height, tileSize, bigTiff):
+        """Open the file and write the header"""
+        self._width = width
+        self._height = height
+        self._tileSize = tileSize
+        self._bigTiff = bigTiff
+        self._offsets = []
+        self._byteCounts = []
+        self._file = open(fileName, 'wb')
+        if bigTiff:
+            self._file.write(struct.pack('<2sHHHQ', b'II', 43, 8, 0, 0))
+        else:
+            self._file.write(struct.pack('<2sHI', b'II', 42, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        try:
+            if excType is None:
+                self._writeDirectory()
+        finally:
+            self._file.close()
+
+    def writeTile(self, data):
+        """Compress and write the next tile (rows of RGBA pixels)"""
+        self._align()
+        compressed = zlib.compress(data, COMPRESSION_LEVEL)
+        self._offsets.append(self._file.tell())
+        self._byteCounts.append(len(compressed))
+        self._file.write(compressed)
+
+    def _align(self):
+        """Values in TIFF files start at word boundaries"""
+        if self._file.tell() % 2 == 1:
+            self._file.write(b'\x00')
+
+    def _writeDirectory(self):
+        """Write the image file directory and link it in the header"""
+        offsetType = self.LONG8 if self._bigTiff else self.LONG
+        entries = [
+            (256, self.LONG, [self._width]), # ImageWidth
+            (257, self.LONG, [self._height]), # ImageLength
+            (258, self.SHORT, [8, 8, 8, 8]), # BitsPerSample
+            (259, self.SHORT, [8]), # Compression: deflate
+            (262, self.SHORT, [2]), # PhotometricInterpretation: RGB
+            (277, self.SHORT, [4]), # SamplesPerPixel
+            (284, self.SHORT, [1]), # PlanarConfiguration: chunky
+            (322, self.LONG, [self._tileSize]), # TileWidth
+            (323, self.LONG, [self._tileSize]), # TileLength
+            (324, offsetType, self._offsets), # TileOffsets
+            (325, offsetType, self._byteCounts), # TileByteCounts
+            (338, self.SHORT, [2]), # ExtraSamples: unassociated alpha
+        ]
+
+        inlineSize = 8 if self._bigTiff else 4
+        formats = {self.SHORT: 'H', self.LONG: 'I', self.LONG8: 'Q'}
+        packed = []
+        for tag, fieldType, values in entries:
+            data = struct.pack('<{}{}'.format(len(values), formats[fieldType]), *values)
+            if len(data) > inlineSize:
+                # values which do not fit into the entry are written in front of the directory
+                self._align()
+                offset = self._file.tell()
+                self._file.write(data)
+                data = struct.pack('<Q' if self._bigTiff else '<I', offset)
+            packed.append((tag, fieldType, len(values), data.ljust(inlineSize, b'\x00')))
+
+        self._align()
+        directory = self._file.tell()
+        if self._bigTiff:
+            self._file.write(struct.pack('<Q', len(packed)))
+            for tag, fieldType, count, data in packed:
+                self._file.write(struct.pack('<HHQ', tag, fieldType, count) + data)
+            self._file.write(struct.pack('<Q', 0))
+            self._file.seek(8)
+            self._file.write(struct.pack('<Q', directory))
+        else:
+            self._file.write(struct.pack('<H', len(packed)))
+            for tag, fieldType, count, data in packed:
+                self._file.write(struct.pack('<HHI', tag, fieldType, count) + data)
+            self._file.write(struct.pack('<I', 0))
+            self._file.seek(4)
+            self._file.write(struct.pack('<I', directory))
@@ -0,0 +1,149 @@
+""" This module contains the classes SectionLine and BoreholeIndex
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import math
+import numpy as np
+from qgis.core import (QgsCoordinateTransform, QgsFeatureRequest, QgsGeometry, QgsProject,
+    QgsRectangle, QgsSpatialIndex)
+
+from .drillingPosition import drillingPositions
+from .transect import coordinates, projectOntoLine
+
+# maximum length of the pieces of the line looked up in the spatial index (in buffers)
+PIECE_LENGTH = 4
+# maximum number of pieces per segment of the line
+MAX_PIECES = 1000
+
+class BoreholeIndex:
+    """BoreholeIndex is a spatial index of the drilling positions of a layer.
+    It is built on first use. There is one index per layer for the whole
+    QGIS session. It is rebuilt after the layer's features were changed.
+    The index is built from the features' geometries, whereas the profiles
+    are placed by the columns xCoord and yCoord of config.yml. Both must
+    agree, otherwise positions are missed (see SectionLine.positions)."""
+
+    _indices = {}
+
+    @classmethod
+    def forLayer(cls, layer):
+        """Get the index of the given layer of drilling positions"""
+        index = cls._indices.get(layer.id())
+        if index is None:
+            index = BoreholeIndex(layer)
+            cls._indices[layer.id()] = index
+        return index
+
+    def __init__(self, layer):
+        """Initialize the index and connect to the layer's signals"""
+        self._layer = layer
+        self._index = None
+
+        layer.featureAdded.connect(self.invalidate)
+        layer.featureDeleted.connect(self.invalidate)
+        layer.geometryChanged.connect(self.invalidate)
+        layer.dataChanged.connect(self.invalidate)
+        layer.willBeDeleted.connect(self._release)
+
+    def candidates(self, rectangles):
+        """Get the feature IDs of the drilling positions within the rectangles"""
+        if self._index is None:
+            request = QgsFeatureRequest()
+            request.setNoAttributes()
+            self._index = QgsSpatialIndex(self._layer.getFeatures(request))
+        fids = set()
+        for r in rectangles:
+            fids.update(self._index.intersects(r))
+        return fids
+
+    def invalidate(self, *_args):
+        """Drop the index, it is rebuilt on next use"""
+        self._index = None
+
+    def _release(self):
+        """The layer is about to be deleted"""
+        BoreholeIndex._indices.pop(self._layer.id(), None)
+
+class SectionLine:
+    """SectionLine is a cross section along a line. The drilling positions
+    within the buffer distance of the line are projected onto the line.
+    Their chainage, i.e. the distance along the line, is their x-position
+    in the drawing."""
+
+    def __init__(self, geometry, buffer):
+        """Initialize the section line. geometry is a line (QgsGeometry)
+        in the coordinates of the drilling positions. The parts of a
+        multi-line are joined."""
+        self.buffer = buffer
+        self._vertices = np.array([(v.x(), v.y()) for v in geometry.vertices()], dtype=float)
+
+    @classmethod
+    def fromLayer(cls, lineLayer, buffer, boreholes):
+        """Get the section line of the selected (or else the first) feature
+        of the line layer in the coordinates of the layer boreholes.
+        Returns None if there is no line."""
+        features = lineLayer.selectedFeatures()
+        if len(features) == 0:
+            features = list(lineLayer.getFeatures(QgsFeatureRequest().setLimit(1)))
+        if len(features) == 0 or features[0].geometry().isEmpty():
+            return None
+
+        geometry = QgsGeometry(features[0].geometry())
+        if lineLayer.crs() != boreholes.crs():
+            geometry.transform(QgsCoordinateTransform(lineLayer.crs(), boreholes.crs(),
+                QgsProject.instance()))
+        line = SectionLine(geometry, buffer)
+        return line if len(line._vertices) >= 2 else None
+
+    def positions(self, boreholes, settings):
+        """Get the drilling positions (with chainage) of the layer
+        boreholes within the buffer, ordered by their chainage.
+        settings are the contents of config.yml. The candidates are looked
+        up by their geometries, but the distance to the line and the
+        chainage are computed from the columns xCoord and yCoord. So only
+        positions whose geometry and columns are within the buffer are found."""
+        fids = BoreholeIndex.forLayer(boreholes).candidates(self._rectangles())
+        if len(fids) == 0:
+            return []
+        request = QgsFeatureRequest()
+        request.setFilterFids(list(fids))
+        positions = drillingPositions(boreholes, settings, request)
+
+        xs, ys = coordinates(positions)
+        chainages, distances = projectOntoLine(xs, ys, self._vertices)
+        projected = [p._replace(chainage=c) for p, c, d
+            in zip(positions, chainages.tolist(), distances.tolist()) if d <= self.buffer]
+        return sorted(projected, key=lambda p: p.chainage)
+
+    def _rectangles(self):
+        """Get the rectangles covering the buffer. Long segments are split
+        into pieces, so few positions far from the line are looked up."""
+        rectangles = []
+        for (x1, y1), (x2, y2) in zip(self._vertices[:-1].tolist(), self._vertices[1:].tolist()):
+            length = math.hypot(x2 - x1, y2 - y1)
+            pieces = 1
+            if self.buffer > 0:
+                pieces = min(MAX_PIECES, max(1, math.ceil(length / (PIECE_LENGTH * self.buffer))))
+            for i in range(pieces):
+                xa, ya = x1 + (x2 - x1) * i / pieces, y1 + (y2 - y1) * i / pieces
+                xb, yb = x1 + (x2 - x1) * (i + 1) / pieces, y1 + (y2 - y1) * (i + 1) / pieces
+                rectangles.append(QgsRectangle(min(xa, xb) - self.buffer, min(ya, yb) - self.buffer,
+                    max(xa, xb) + self.buffer, max(ya, yb) + self.buffer))
+        return rectangles
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+import os
+
+from qgis.PyQt import uic
+from qgis.PyQt import QtWidgets
+from qgis.core import QgsMapLayerProxyModel
+
+# This loads your .ui file so that PyQt can populate your plugin
+# with the elements from Qt Designer
+FORM_CLASS, _ = uic.loadUiType(os.path.join(
+     os.path.dirname(__file__), 'section_dialog_base.ui'))
+
+class SectionDialog(QtWidgets.QDialog, FORM_CLASS):
+    """Dialog to choose the section line and the buffer distance"""
+
+    def __init__(self, lineLayer, buffer, parent=None):
+        """Constructor."""
+        super(SectionDialog, self).__init__(parent)
+        # Set up the user interface from Designer through FORM_CLASS.
+        self.setupUi(self)
+        self._initControls(lineLayer, buffer)
+
+    def _initControls(self, lineLayer, buffer):
+        """Initialize the controls"""
+        self.lineLayer.setFilters(QgsMapLayerProxyModel.LineLayer)
+        if lineLayer is not None:
+            self.lineLayer.setLayer(lineLayer)
+        if buffer is not None:
+            self.buffer.setValue(buffer)
+
+    def layer(self):
+        """Get the layer of the section line"""
+        return self.lineLayer.currentLayer()
+
+    def bufferDistance(self):
+        """Get the buffer distance"""
+        return self.buffer.value()
@@ -0,0 +1,86 @@
+""" This module contains the geometry of transects, i.e. the order of the
+    drilling positions and their distances along the transect
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import numpy as np
+
+# number of distances (points x segments) computed at once by projectOntoLine
+PROJECTION_BLOCK_SIZE = 1 << 20
+
+# sort keys of the drawing directions (DrillingPosition)
+SORT_KEYS = {
+    "ns": lambda p: -p.y, # north -> south
+    "sn": lambda p: p.y, # south -> north
+    "we": lambda p: p.x, # west -> east
+    "ew": lambda p: -p.x, # east -> west
+}
+
+def sortPositions(positions, direction):
+    """Sort the drilling positions in the given direction (ns, sn, we or ew)"""
+    return sorted(positions, key=SORT_KEYS[direction])
+
+def coordinates(positions):
+    """Get the x- and y-coordinates of the drilling positions as arrays"""
+    xs = np.array([p.x for p in positions], dtype=float)
+    ys = np.array([p.y for p in positions], dtype=float)
+    return xs, ys
+
+def chainage(positions):
+    """Get the distances along the transect (in map units) of the drilling
+    positions in drawing order. Positions projected onto a section line
+    keep their chainage. Otherwise it is the cumulative distance between
+    neighbouring positions and the first position is at 0."""
+    if len(positions) > 0 and all(p.chainage is not None for p in positions):
+        return np.array([p.chainage for p in positions], dtype=float)
+
+    xs, ys = coordinates(positions)
+    distances = np.zeros(len(positions))
+    if len(positions) > 1:
+        np.cumsum(np.hypot(np.diff(xs), np.diff(ys)), out=distances[1:])
+    return distances
+
+def projectOntoLine(xs, ys, vertices):
+    """Project points onto a polyline given by its vertices (n x 2).
+    Returns the chainage of the nearest point on the line (the distance
+    along the line from its first vertex) and the distance to the line
+    of each point as arrays."""
+    vertices = np.asarray(vertices, dtype=float)
+    xs = np.asarray(xs, dtype=float)
+    ys = np.asarray(ys, dtype=float)
+    starts = vertices[:-1]
+    directions = vertices[1:] - starts
+    lengths = np.hypot(directions[:, 0], directions[:, 1])
+    offsets = np.concatenate(([0.0], np.cumsum(lengths)[:-1]))
+    squares = np.where(lengths > 0, lengths**2, 1.0) # degenerate segments are points
+
+    chainages = np.empty(len(xs))
+    distances = np.empty(len(xs))
+    step = max(1, PROJECTION_BLOCK_SIZE // max(1, len(starts)))
+    for i in range(0, len(xs), step):
+        dx = xs[i:i + step, None] - starts[:, 0]
+        dy = ys[i:i + step, None] - starts[:, 1]
+        t = np.clip((dx * directions[:, 0] + dy * directions[:, 1]) / squares, 0.0, 1.0)
+        d = np.hypot(dx - t * directions[:, 0], dy - t * directions[:, 1])
+        nearest = np.argmin(d, axis=1)
+        rows = np.arange(len(nearest))
+        chainages[i:i + step] = offsets[nearest] + t[rows, nearest] * lengths[nearest]
+        distances[i:i + step] = d[rows, nearest]
+    return chainages, distances
@@ -0,0 +1,77 @@
+""" This module contains a benchmark of reading the layer data (Schichtdaten)
+    with "ID" IN (...) requests compared with one request per drilling profile.
+    Run it with: python test/benchmark_layerData.py
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import contextlib
+import time
+
+import qgisStubs
+qgisStubs.install()
+
+# pylint: disable=wrong-import-position,wrong-import-order
+from geoCore.layerDataIndex import LayerDataIndex
+from test_layerDataIndex import FIELDS, FakeExpression, FakeRequest, FakeSource, patchQgis
+
+def perProfile(source, profileIds):
+    """Read the layer data as before, i.e. one request per drilling profile"""
+    result = {}
+    for i in profileIds:
+        request = FakeRequest(FakeExpression(FakeExpression.createFieldEqualityExpression("ID", i)))
+        result[str(i)] = [dict(zip(FIELDS, f.attributes())) for f in source.getFeatures(request)]
+    return result
+
+def batched(source, profileIds):
+    """Read the layer data with LayerDataIndex"""
+    return LayerDataIndex(source).layerAttributes(profileIds)
+
+def _measure(name, function, source, profileIds):
+    """Print the time and the number of round trips of a reader"""
+    source.roundTrips = 0
+    start = time.perf_counter()
+    result = function(source, profileIds)
+    elapsed = time.perf_counter() - start
+    print("{:<28} {:10.1f} ms {:8} requests".format(name, elapsed * 1000, source.roundTrips))
+    return result
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark of reading the layer data")
+    parser.add_argument("-n", "--profiles", type=int, default=1000)
+    parser.add_argument("-l", "--layers", type=int, default=10, help="layers per profile")
+    parser.add_argument("--latency", type=float, default=0.001,
+        help="time of a round trip to the data provider in seconds")
+    args = parser.parse_args()
+
+    source = FakeSource(args.profiles, args.layers, args.latency)
+    profileIds = [str(p) for p in range(args.profiles)]
+    print("{} drilling profiles of {} layers, round trip {} ms".format(args.profiles,
+        args.layers, args.latency * 1000))
+    with contextlib.ExitStack() as stack:
+        patchQgis(stack.callback)
+        old = _measure("one request per profile", perProfile, source, profileIds)
+        new = _measure("\"ID\" IN (...) requests", batched, source, profileIds)
+    if old != new:
+        raise AssertionError("The layer data differs")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+""" This module contains a benchmark of the memory taken by the objects to
+    be painted with __slots__ compared with a __dict__ per instance.
+    Run it with: python test/benchmark_memory.py
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import platform
+import tracemalloc
+
+import qgisStubs
+qgisStubs.install()
+
+# pylint: disable=wrong-import-position,wrong-import-order
+from geoCore.connector import Connector
+from geoCore.gauge import Gauge
+from geoCore.orientation import Orientation
+from geoCore.profileBox import ProfileBox
+
+def _slotNames(cls):
+    """Get the names of the slots of a class and its bases"""
+    return [name for c in cls.__mro__ for name in c.__dict__.get('__slots__', ())]
+
+def _copy(obj, cls):
+    """Make an instance of cls with the attributes of obj. The attribute
+    values are shared, so only the object itself takes memory."""
+    copy = object.__new__(cls)
+    for name in _slotNames(type(obj)):
+        if hasattr(obj, name):
+            setattr(copy, name, getattr(obj, name))
+    return copy
+
+def _unslotted(cls):
+    """Make a class keeping its attributes in a __dict__ like the objects
+    to be painted did before they declared __slots__. Each class gets its
+    own, so the instances share the keys of their dictionaries."""
+    return type("Unslotted" + cls.__name__, (), {})
+
+def _compare(count, factory):
+    """Get the bytes per object of the object itself with __slots__ and
+    with a __dict__ and of the object including its attribute values"""
+    sample = factory()
+    unslotted = _unslotted(type(sample))
+    slottedObject = _allocated(count, lambda: _copy(sample, type(sample)))
+    unslottedObject = _allocated(count, lambda: _copy(sample, unslotted))
+    total = _allocated(count, factory)
+    # the attribute values are the same with and without __slots__
+    return slottedObject, unslottedObject, total, total - slottedObject + unslottedObject
+
+def _allocated(count, function):
+    """Get the bytes allocated per object by function (called count times)"""
+    objects = [None] * count
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for i in range(count):
+        objects[i] = function()
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return allocated / count
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark of the memory per object")
+    parser.add_argument("-n", "--objects", type=int, default=100000)
+    args = parser.parse_args()
+
+    factories = (
+        ("ProfileBox", lambda: ProfileBox(3)),
+        ("Connector", Connector),
+        ("Gauge", lambda: Gauge(0.0, 0.0, -500.0, 1200.0, Orientation.VERTICAL)),
+    )
+    print("{} objects each, Python {}".format(args.objects, platform.python_version()))
+    print("{:<12} {:>12} {:>12} {:>14} {:>14}".format("bytes", "object", "object",
+        "total", "total"))
+    print("{:<12} {:>12} {:>12} {:>14} {:>14}".format("", "__slots__", "__dict__",
+        "__slots__", "__dict__"))
+    for name, factory in factories:
+        print("{:<12} {:>12.0f} {:>12.0f} {:>14.0f} {:>14.0f}".format(name,
+            *_compare(args.objects, factory)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+""" This module contains a benchmark of parsing the petrography codes of a
+    synthetic corpus of layers. Run it with: python test/benchmark_petrography.py
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import random
+import timeit
+
+import qgisStubs
+qgisStubs.install()
+
+# pylint: disable=wrong-import-position,wrong-import-order
+from geoCore.petrography import parsePetrography
+from test_petrography import randomCode, referenceSplit
+
+def _measure(name, function, repeat):
+    """Print the best time of the function"""
+    best = min(timeit.repeat(function, number=1, repeat=repeat))
+    print("{:<36} {:10.1f} ms".format(name, best * 1000))
+    return best
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark of parsing petrography codes")
+    parser.add_argument("-n", "--rows", type=int, default=1000000)
+    parser.add_argument("-d", "--distinct", type=int, default=1500,
+        help="number of distinct petrography codes")
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rnd = random.Random(4711)
+    codes = list({randomCode(rnd) for _ in range(args.distinct * 4)})[:args.distinct]
+    corpus = [rnd.choice(codes) for _ in range(args.rows)]
+    uncached = parsePetrography.__wrapped__
+
+    def parseCached():
+        parsePetrography.cache_clear()
+        for c in corpus:
+            parsePetrography(c)
+
+    print("{} layers, {} distinct petrography codes".format(len(corpus), len(codes)))
+    old = _measure("regular expression and split", lambda: [referenceSplit(c) for c in corpus],
+        args.repeat)
+    _measure("parser without cache", lambda: [uncached(c) for c in corpus], args.repeat)
+    new = _measure("parser with cache", parseCached, args.repeat)
+    print("speed-up: {:.1f}x".format(old / new))
+
+if __name__ == '__main__':
+    main()
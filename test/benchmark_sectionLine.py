@@ -0,0 +1,93 @@
+""" This module contains a benchmark of looking up the drilling positions along
+    a section line in a synthetic set of points. Run it with: python test/benchmark_sectionLine.py
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+import argparse
+import contextlib
+import random
+import timeit
+
+import qgisStubs
+qgisStubs.install()
+
+# pylint: disable=wrong-import-position,wrong-import-order,protected-access
+from geoCore.drillingPosition import drillingPositions
+from geoCore.sectionLine import BoreholeIndex, SectionLine
+from geoCore.transect import coordinates, projectOntoLine
+from test_sectionLine import SETTINGS, FakeGeometry, FakeLayer, FakeRequest, patchQgis
+
+def _measure(name, function, repeat):
+    """Print the best time of the function"""
+    best = min(timeit.repeat(function, number=1, repeat=repeat))
+    print("{:<36} {:10.1f} ms".format(name, best * 1000))
+    return best
+
+def projectAll(layer, line):
+    """Project all drilling positions onto the line, i.e. without index"""
+    positions = drillingPositions(layer, SETTINGS, FakeRequest())
+    xs, ys = coordinates(positions)
+    chainages, distances = projectOntoLine(xs, ys, line._vertices)
+    projected = [p._replace(chainage=c) for p, c, d
+        in zip(positions, chainages.tolist(), distances.tolist()) if d <= line.buffer]
+    return sorted(projected, key=lambda p: p.chainage)
+
+def buildIndex(layer):
+    """Build the spatial index of the layer"""
+    index = BoreholeIndex.forLayer(layer)
+    index.invalidate()
+    index.candidates([])
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark of the section line")
+    parser.add_argument("-n", "--positions", type=int, default=1000000)
+    parser.add_argument("-v", "--vertices", type=int, default=10,
+        help="number of vertices of the section line")
+    parser.add_argument("-b", "--buffer", type=float, default=50.0)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rnd = random.Random(4711)
+    size = 100000.0
+    layer = FakeLayer([(i, rnd.uniform(0, size), rnd.uniform(0, size))
+        for i in range(args.positions)])
+    vertices = [(size * i / (args.vertices - 1), rnd.uniform(0.2 * size, 0.8 * size))
+        for i in range(args.vertices)]
+    line = SectionLine(FakeGeometry(vertices), args.buffer)
+
+    with contextlib.ExitStack() as stack:
+        patchQgis(stack.callback)
+        print("{} drilling positions, section line of {} vertices, buffer {}".format(
+            args.positions, args.vertices, args.buffer))
+        old = _measure("projection of all positions", lambda: projectAll(layer, line),
+            args.repeat)
+        _measure("build spatial index (fake grid)", lambda: buildIndex(layer), 1)
+        new = _measure("rectangle query and projection", lambda: line.positions(layer, SETTINGS),
+            args.repeat)
+        _measure("  of which rectangle query",
+            lambda: BoreholeIndex.forLayer(layer).candidates(line._rectangles()), args.repeat)
+        found = line.positions(layer, SETTINGS)
+        if found != projectAll(layer, line):
+            raise AssertionError("The positions differ")
+        print("{} positions found, speed-up: {:.1f}x".format(len(found), old / new))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+""" This module contains a benchmark of the transect's geometry on many
+    drilling positions. Run it with: python test/benchmark_transect.py
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import random
+import timeit
+
+import qgisStubs
+qgisStubs.install()
+
+# pylint: disable=wrong-import-position,wrong-import-order
+from geoCore.transect import chainage, coordinates, projectOntoLine, sortPositions
+from test_transect import randomPositions, referenceChainage
+
+def _measure(name, function, repeat):
+    """Print the best time of the function"""
+    best = min(timeit.repeat(function, number=1, repeat=repeat))
+    print("{:<36} {:10.1f} ms".format(name, best * 1000))
+    return best
+
+def main():
+    """Run the benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark of the transect's geometry")
+    parser.add_argument("-n", "--positions", type=int, default=100000)
+    parser.add_argument("-v", "--vertices", type=int, default=50,
+        help="number of vertices of the section line")
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rnd = random.Random(4711)
+    positions = sortPositions(randomPositions(rnd, args.positions), "ns")
+    vertices = [(rnd.uniform(3e5, 4e5), rnd.uniform(5e6, 6e6)) for _ in range(args.vertices)]
+    xs, ys = coordinates(positions)
+
+    print("{} drilling positions, section line of {} vertices".format(args.positions, args.vertices))
+    old = _measure("chainage, point to point loop", lambda: referenceChainage(positions), args.repeat)
+    new = _measure("chainage", lambda: chainage(positions), args.repeat)
+    _measure("  of which coordinates()", lambda: coordinates(positions), args.repeat)
+    _measure("projectOntoLine", lambda: projectOntoLine(xs, ys, vertices), args.repeat)
+    print("speed-up of chainage: {:.1f}x".format(old / new))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+""" This module contains stand-ins for the qgis modules, so the parts of
+    geoCore which do not need QGIS can be tested without it
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import importlib.util
+import os
+import sys
+import types
+
+MODULES = ('qgis', 'qgis.core', 'qgis.PyQt', 'qgis.PyQt.QtCore', 'qgis.PyQt.QtGui',
+    'qgis.PyQt.QtWidgets', 'qgis.PyQt.QtSvg')
+
+class _Anything:
+    """Stands in for any class, function or constant of QGIS"""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return _Anything()
+
+    def __call__(self, *args, **kwargs):
+        return _Anything()
+
+class _Module(types.ModuleType):
+    """A module providing _Anything for every name"""
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return _Anything
+
+class Qgis:
+    """The message levels"""
+    Info = 0
+    Warning = 1
+    Critical = 2
+    Success = 3
+
+class QVariant:
+    """NULL values of QGIS"""
+
+def install():
+    """Put the geoCore package on the path and use the stand-ins
+    unless QGIS is available"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if root not in sys.path:
+        sys.path.insert(0, root)
+    if 'qgis' in sys.modules or importlib.util.find_spec('qgis') is not None:
+        return
+    for name in MODULES:
+        sys.modules[name] = _Module(name)
+    sys.modules['qgis.core'].Qgis = Qgis
+    sys.modules['qgis.PyQt.QtCore'].QVariant = QVariant
@@ -0,0 +1,91 @@
+""" This module contains the tests of the reader of delimited layer data files
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import qgisStubs
+qgisStubs.install()
+
+# pylint: disable=wrong-import-position,wrong-import-order,protected-access
+from geoCore.csvLayerData import CsvLayerData
+
+SETTINGS = {"layerNo": "schichtnr", "group": "gruppierung", "depthFrom": "tiefe von",
+    "depthTo": "tiefe bis"}
+
+ROWS = "\ufeff" + """ID;schichtnr;gruppierung;tiefe von;tiefe bis;petrographie
+B1;1;1;0;1.5;S(u4)
+B1;2;2;1.5;3;"U; fs"
+B2;1;1;0;2;G
+"""
+
+class CsvLayerDataTest(unittest.TestCase):
+    """Test CsvLayerData"""
+
+    def setUp(self):
+        """Write the layer data to a temporary file"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.fileName = os.path.join(directory, "data.csv")
+        with open(self.fileName, 'w', encoding='utf-8', newline='') as f:
+            f.write(ROWS)
+        self.addCleanup(CsvLayerData._files.clear)
+
+    def testLayerAttributes(self):
+        """The rows are read by ID and the numeric columns converted"""
+        data = CsvLayerData.forFile(self.fileName, SETTINGS)
+        attributes = data.layerAttributes(["B1", "B3"])
+        self.assertEqual([r["tiefe bis"] for r in attributes["B1"]], [1.5, 3])
+        self.assertEqual(attributes["B1"][1]["petrographie"], "U; fs")
+        self.assertEqual(attributes["B1"][0]["schichtnr"], 1)
+        self.assertEqual(attributes["B3"], [])
+        data.invalidate()
+
+    def testSettingsInKey(self):
+        """Readers of the same file with other settings are distinct"""
+        data = CsvLayerData.forFile(self.fileName, SETTINGS)
+        self.assertIs(CsvLayerData.forFile(self.fileName, dict(SETTINGS)), data)
+        other = CsvLayerData.forFile(self.fileName, dict(SETTINGS, group="petrographie"))
+        self.assertIsNot(other, data)
+        self.assertEqual(other.layerAttributes(["B2"])["B2"][0]["gruppierung"], "1")
+        self.assertIsNot(CsvLayerData.forFile(self.fileName, SETTINGS, idColumn="petrographie"),
+            data)
+        for d in CsvLayerData._files.values():
+            d.invalidate()
+
+    def testIdColumn(self):
+        """The rows are indexed by the given column"""
+        data = CsvLayerData.forFile(self.fileName, SETTINGS, idColumn="Petrographie")
+        self.assertEqual([r["ID"] for r in data.layerAttributes(["G"])["G"]], ["B2"])
+        data.invalidate()
+
+    def testEmptyFile(self):
+        """An empty file has no rows"""
+        with open(self.fileName, 'w', encoding='utf-8'):
+            pass
+        data = CsvLayerData.forFile(self.fileName, SETTINGS)
+        self.assertEqual(data.layerAttributes(["B1"]), {"B1": []})
+
+if __name__ == '__main__':
+    unittest.main()
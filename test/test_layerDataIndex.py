@@ -0,0 +1,210 @@
+""" This module contains the tests of the index of the layer data
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+import threading
+import time
+import unittest
+from unittest import mock
+
+import qgisStubs
+qgisStubs.install()
+
+# pylint: disable=wrong-import-position,wrong-import-order,protected-access,unused-argument
+from geoCore import layerDataIndex
+from geoCore.layerDataIndex import LayerDataIndex
+
+FIELDS = ("ID", "schichtnr", "gg", "tiefe_von", "tiefe_bis", "farbe")
+
+class FakeExpression:
+    """The filter of a request: "ID" = value or "ID" IN (values)"""
+
+    def __init__(self, text=""):
+        self.values = set()
+        if " IN (" in text:
+            self.values = set(text[text.index(" IN (") + 5:-1].split(", "))
+        elif " = " in text:
+            self.values = {text.split(" = ", 1)[1]}
+
+    @staticmethod
+    def quotedColumnRef(name):
+        """Quote a column name"""
+        return '"{}"'.format(name)
+
+    @staticmethod
+    def quotedValue(value):
+        """Quote a value (the fake compares strings)"""
+        return str(value)
+
+    @staticmethod
+    def createFieldEqualityExpression(name, value):
+        """Make an expression comparing a column with a value"""
+        return '"{}" = {}'.format(name, value)
+
+class FakeRequest:
+    """A request filtering by an expression"""
+
+    def __init__(self, expression):
+        self.expression = expression
+
+class FakeFeature:
+    """A feature of the data layer"""
+
+    def __init__(self, fid, attributes):
+        self._fid = fid
+        self._attributes = attributes
+
+    def id(self):
+        """The feature ID"""
+        return self._fid
+
+    def attributes(self):
+        """The attribute values"""
+        return self._attributes
+
+class FakeField:
+    """A field of the data layer"""
+
+    def __init__(self, name):
+        self._name = name
+
+    def name(self):
+        """The field's name"""
+        return self._name
+
+class FakeFields(list):
+    """The fields of the data layer"""
+
+    def lookupField(self, name):
+        """The index of the field of the given name"""
+        return [f.name() for f in self].index(name)
+
+class FakeSignal:
+    """A signal nobody emits"""
+
+    def connect(self, slot):
+        """Ignore the slot"""
+
+class FakeSource:
+    """A data provider without index: every request evaluates the filter
+    on all features and costs a round trip of the given latency. profiles
+    have the IDs "0", "1", ... and consist of the given number of layers."""
+
+    featureAdded = featureDeleted = attributeValueChanged = FakeSignal()
+    dataChanged = updatedFields = willBeDeleted = FakeSignal()
+
+    def __init__(self, profiles, layers, latency=0.0):
+        self.latency = latency
+        self.roundTrips = 0
+        self.features = []
+        for p in range(profiles):
+            for l in range(layers):
+                self.features.append(FakeFeature(len(self.features),
+                    [str(p), l + 1, "S", l * 10, (l + 1) * 10, "gr"]))
+
+    def fields(self):
+        """The fields of the data layer"""
+        return FakeFields([FakeField(n) for n in FIELDS])
+
+    def id(self):
+        """The layer ID"""
+        return "data"
+
+    def getFeatures(self, request):
+        """Get the features matching the request's filter"""
+        self.roundTrips = self.roundTrips + 1
+        time.sleep(self.latency)
+        values = request.expression.values
+        return (f for f in self.features if f.attributes()[0] in values)
+
+def patchQgis(addCleanup):
+    """Use the fakes of QGIS. The patches are undone by the functions
+    passed to addCleanup."""
+    for name, fake in (("QgsExpression", FakeExpression), ("QgsFeatureRequest", FakeRequest)):
+        patcher = mock.patch.object(layerDataIndex, name, fake)
+        patcher.start()
+        addCleanup(patcher.stop)
+
+class PausingSource(FakeSource):
+    """A data provider pausing after the first feature of a request until
+    it is resumed, e.g. to edit the layer while it is read"""
+
+    def __init__(self, profiles, layers):
+        super().__init__(profiles, layers)
+        self.paused = threading.Event()
+        self.resumed = threading.Event()
+
+    def getFeatures(self, request):
+        """Get the features and pause after the first one"""
+        for n, f in enumerate(super().getFeatures(request)):
+            if n == 1:
+                self.paused.set()
+                self.resumed.wait(5)
+            yield f
+
+class LayerDataIndexTest(unittest.TestCase):
+    """Test LayerDataIndex"""
+
+    def setUp(self):
+        """Use the fakes of QGIS"""
+        patchQgis(self.addCleanup)
+
+    def testLayerAttributes(self):
+        """The layers of the profiles are read in chunks of IDs"""
+        source = FakeSource(3, 2)
+        with mock.patch.object(layerDataIndex, "CHUNK_SIZE", 2):
+            attributes = LayerDataIndex(source).layerAttributes(["2", 0, "7"])
+        self.assertEqual(list(attributes), ["2", "0", "7"])
+        self.assertEqual([r["schichtnr"] for r in attributes["2"]], [1, 2])
+        self.assertEqual(attributes["0"][0]["ID"], "0")
+        self.assertEqual(attributes["7"], [])
+        self.assertEqual(source.roundTrips, 2)
+
+    def testIndexed(self):
+        """Profiles read before are not requested again"""
+        source = FakeSource(3, 2)
+        index = LayerDataIndex(source)
+        index.layerAttributes(["1"])
+        self.assertEqual(len(index.layerAttributes(["1"])["1"]), 2)
+        self.assertEqual(source.roundTrips, 1)
+
+    def testEditWhileLoading(self):
+        """An edit of the layer while its data is read in a background
+        thread is handled after the data was read, so the profile is read
+        again afterwards instead of keeping part of its layers"""
+        source = PausingSource(2, 3)
+        index = LayerDataIndex(source)
+        loader = threading.Thread(target=index.layerAttributes, args=(["1"], source))
+        loader.start()
+        self.assertTrue(source.paused.wait(5))
+        edit = threading.Thread(target=index._featureDeleted, args=(3,))
+        edit.start()
+        time.sleep(0.05) # the edit waits for the loader
+        source.resumed.set()
+        loader.join(5)
+        edit.join(5)
+        self.assertNotIn("1", index._rows)
+        self.assertNotIn(3, index._ids)
+        del source.features[3]
+        self.assertEqual([r["schichtnr"] for r in index.layerAttributes(["1"])["1"]], [2, 3])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+""" This module contains the tests of the zoom levels of the texture tiles
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+import unittest
+
+import qgisStubs
+qgisStubs.install()
+
+# pylint: disable=wrong-import-position,wrong-import-order
+from geoCore.paintResources import MAX_TEXTURE_SCALE, MIN_TEXTURE_SCALE, textureScale
+
+class TextureScaleTest(unittest.TestCase):
+    """Test textureScale"""
+
+    def testPowersOfTwo(self):
+        """The level of detail is rounded to the nearest power of 2"""
+        self.assertEqual(textureScale(1.0), 1.0)
+        self.assertEqual(textureScale(1.3), 1.0)
+        self.assertEqual(textureScale(1.5), 2.0)
+        self.assertEqual(textureScale(3.0), 4.0)
+        self.assertEqual(textureScale(0.7), 0.5)
+
+    def testRange(self):
+        """Far zoomed views share the tiles of the ends of the range"""
+        self.assertEqual(textureScale(0.01), MIN_TEXTURE_SCALE)
+        self.assertEqual(textureScale(0.0), MIN_TEXTURE_SCALE)
+        self.assertEqual(textureScale(1000.0), MAX_TEXTURE_SCALE)
+
+    def testFewBuckets(self):
+        """Zooming in small steps uses few distinct tiles"""
+        scales = {textureScale(1.1 ** i) for i in range(-60, 60)}
+        self.assertEqual(len(scales), 6)
+
+if __name__ == '__main__':
+    unittest.main()
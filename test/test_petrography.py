@@ -0,0 +1,126 @@
+""" This module contains the tests of the parser of the petrography codes
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import random
+import re
+import unittest
+
+import qgisStubs
+qgisStubs.install()
+
+# pylint: disable=wrong-import-position,wrong-import-order
+from geoCore.petrography import Component, parsePetrography
+
+MAIN_GROUPS = ("S", "U", "T", "G", "Mu", "fS", "H")
+DESCRIPTIONS = ("u4", "h", "lam", "fs", "ms", "u1", "t2", "g", "kalk")
+
+PATTERN = re.compile(r"(\w*)\s*(\(.*\))?", re.IGNORECASE)
+
+def referenceSplit(petrography):
+    """Split the main group and the descriptions with the regular
+    expression used before (which does not support nesting)"""
+    m = PATTERN.match(petrography)
+    kg = []
+    k = m.group(2)
+    if k is not None:
+        kg = [s.strip() for s in k[1:-1].split(",") if not (s.isspace() or s == '')]
+    return m.group(1), kg
+
+def randomCode(rnd):
+    """Make a petrography code without nested descriptions"""
+    main = rnd.choice(MAIN_GROUPS)
+    if rnd.random() < 0.2:
+        return main
+    descriptions = [rnd.choice(DESCRIPTIONS) for _ in range(rnd.randint(1, 4))]
+    return "{}{}({})".format(main, rnd.choice(("", " ")),
+        rnd.choice((",", ", ")).join(descriptions))
+
+class ParsePetrographyTest(unittest.TestCase):
+    """Test parsePetrography"""
+
+    def setUp(self):
+        """Start with an empty cache"""
+        parsePetrography.cache_clear()
+
+    def testSameAsReference(self):
+        """Codes without nesting are split like before"""
+        rnd = random.Random(4711)
+        for _ in range(2000):
+            code = randomCode(rnd)
+            p = parsePetrography(code)
+            self.assertEqual((p.main, list(p.codes)), referenceSplit(code), code)
+
+    def testMainGroupOnly(self):
+        """A code without descriptions"""
+        p = parsePetrography("S")
+        self.assertEqual(p.main, "S")
+        self.assertEqual(p.components, ())
+        self.assertEqual(p.codes, ())
+
+    def testDescriptions(self):
+        """The descriptions are stripped"""
+        p = parsePetrography("S(u4, h, lam)")
+        self.assertEqual(p.main, "S")
+        self.assertEqual(p.codes, ("u4", "h", "lam"))
+
+    def testSpaceBeforeParenthesis(self):
+        """A space between main group and descriptions is allowed"""
+        self.assertEqual(parsePetrography("S (u4)"), parsePetrography("S(u4)"))
+
+    def testNesting(self):
+        """Nested descriptions qualify the description before them"""
+        p = parsePetrography("U(fs(u1))")
+        self.assertEqual(p.main, "U")
+        self.assertEqual(p.components, (Component("fs", (Component("u1", ()),)),))
+        self.assertEqual(p.codes, ("fs", "u1"))
+
+    def testDeepNesting(self):
+        """The codes are listed depth first"""
+        p = parsePetrography("G(fs(u1, h(k)), ms)")
+        self.assertEqual(p.codes, ("fs", "u1", "h", "k", "ms"))
+
+    def testUnbalancedParentheses(self):
+        """Missing or surplus closing parentheses are tolerated"""
+        self.assertEqual(parsePetrography("S(u4").codes, ("u4",))
+        self.assertEqual(parsePetrography("U(fs(u1").codes, ("fs", "u1"))
+        self.assertEqual(parsePetrography("S(u4))").codes, ("u4",))
+
+    def testEmptyItems(self):
+        """Empty descriptions are left out"""
+        self.assertEqual(parsePetrography("S(,u4,, )").codes, ("u4",))
+        self.assertEqual(parsePetrography("S()").components, ())
+
+    def testEmpty(self):
+        """An empty code has no main group"""
+        p = parsePetrography("")
+        self.assertEqual(p.main, "")
+        self.assertEqual(p.codes, ())
+
+    def testCacheHit(self):
+        """Repeated codes are parsed once"""
+        first = parsePetrography("S(u4, h)")
+        second = parsePetrography("S(u4, h)")
+        self.assertIs(first, second)
+        info = parsePetrography.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+""" This module contains the tests of connecting drilling profiles
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import random
+import unittest
+from types import SimpleNamespace
+
+import qgisStubs
+qgisStubs.install()
+
+# pylint: disable=wrong-import-position,wrong-import-order,protected-access
+from geoCore.profile import Profile
+from geoCore.profileBuilder import ProfileBuilder
+from geoCore.profileColumns import LayerRow
+
+def _referenceConnect(pLeft, pRight):
+    """The connectors as determined before the lookup tables were
+    introduced, i.e. with backward scans over the boxes"""
+    connectors = []
+    boxesLeft = _boxes(pLeft)
+    boxesRight = _boxes(pRight)
+    lgLeft = None
+    yLeft = pLeft.y
+    yRight = pRight.y
+
+    l = 0
+    r = 0
+    while l < len(boxesLeft):
+        if lgLeft != boxesLeft[l].group:
+            c = {'x1': pLeft.x, 'y1': yLeft, 'xOffset': boxesLeft[l].width}
+            found = False
+            while (r < len(boxesRight)) and not found:
+                if boxesLeft[l].group == boxesRight[r].group:
+                    c.update(x2=pRight.x, y2=yRight)
+                    found = True
+                    connectors.append(c)
+                yRight = yRight - boxesRight[r].height
+                r = r + 1
+
+        lgLeft = boxesLeft[l].group
+        yLeft = yLeft - boxesLeft[l].height
+
+        if len(boxesLeft) != len(boxesRight) and r == len(boxesRight):
+            c = {'x2': pRight.x, 'y2': pRight.y - pRight.height()}
+            found = False
+            ll = len(boxesLeft) - 1
+            while ll >= l and not found:
+                if boxesLeft[ll].group == boxesRight[r - 1].group:
+                    c.update(x1=pLeft.x, y1=pLeft.y - sum(b.height for b in boxesLeft[:ll + 1]),
+                        xOffset=boxesLeft[ll].width)
+                    found = True
+                    connectors.append(c)
+                ll = ll - 1
+
+        if l == len(boxesLeft) - 1:
+            c = {'x1': pLeft.x, 'y1': pLeft.y - pLeft.height(), 'xOffset': boxesLeft[l].width}
+            found = False
+            rr = len(boxesRight) - 1
+            while (rr >= r - 1) and not found:
+                if boxesLeft[l].group == boxesRight[rr].group:
+                    c.update(x2=pRight.x, y2=pRight.y - sum(b.height for b in boxesRight[:rr + 1]))
+                    found = True
+                    connectors.append(c)
+                rr = rr - 1
+
+        l = l + 1
+
+    return [(c['x1'], c['y1'], c['xOffset'], c['x2'], c['y2']) for c in connectors]
+
+def _boxes(profile):
+    """Get the group, height and width of the profile's layers"""
+    columns = profile.columns
+    return [SimpleNamespace(group=g, height=h, width=w) for g, h, w
+        in zip(columns.group.tolist(), columns.heights().tolist(), columns.width.tolist())]
+
+def _profile(name, x, y, layers):
+    """Make a profile of the given (group, height, width) layers"""
+    p = Profile(name)
+    p.x = x
+    p.y = y
+    depth = 0
+    for i, (group, height, width) in enumerate(layers):
+        p.columns.append(LayerRow(i + 1, group, depth, depth + height, width, "", "", "#ffffff",
+            None))
+        depth = depth + height
+    p.columns.finish()
+    return p
+
+def _randomProfile(rnd, name, minLayers=0):
+    """Make a profile of random layers with few groups, so groups repeat"""
+    layers = [(rnd.randint(1, 4), rnd.randint(1, 8) / 2, rnd.choice((1.0, 1.5, 2.0)))
+        for _ in range(rnd.randint(minLayers, 10))]
+    return _profile(name, rnd.randint(0, 100), rnd.randint(-5, 5), layers)
+
+class ConnectProfilesTest(unittest.TestCase):
+    """Test ProfileBuilder._connectTwoProfiles"""
+
+    def setUp(self):
+        """Create a builder with the plugin's configuration"""
+        self.builder = ProfileBuilder("boreholes", lambda *args: None)
+
+    def _connect(self, pLeft, pRight):
+        """Get the connectors as tuples"""
+        connectors = self.builder._connectTwoProfiles(pLeft, pRight,
+            self.builder._getProfileIndex(pLeft), self.builder._getProfileIndex(pRight))
+        return [(c.x1, c.y1, c.xOffset, c.x2, c.y2) for c in connectors]
+
+    def testSameAsReference(self):
+        """The connectors equal the ones of the backward scans"""
+        rnd = random.Random(4711)
+        for _ in range(5000):
+            pLeft = _randomProfile(rnd, "left")
+            pRight = _randomProfile(rnd, "right", minLayers=1)
+            self.assertEqual(self._connect(pLeft, pRight), _referenceConnect(pLeft, pRight))
+
+    def testSimpleTransect(self):
+        """Equal groups are connected at their tops, the last boxes at the bottom"""
+        pLeft = _profile("left", 0, 0, [(1, 2, 1.0), (2, 3, 1.5)])
+        pRight = _profile("right", 10, 1, [(1, 1, 1.0), (2, 1, 1.5)])
+        self.assertEqual(self._connect(pLeft, pRight),
+            [(0, 0, 1.0, 10, 1), (0, -2, 1.5, 10, 0), (0, -5, 1.5, 10, -1)])
+
+    def testEmptyProfiles(self):
+        """Profiles without layers are not connected"""
+        pFull = _profile("full", 0, 0, [(1, 2, 1.0), (2, 3, 1.5)])
+        pEmpty = _profile("empty", 10, 0, [])
+        self.assertEqual(self._connect(pFull, pEmpty), [])
+        self.assertEqual(self._connect(pEmpty, pFull), [])
+        self.assertEqual(self._connect(pEmpty, pEmpty), [])
+
+    def testTransectWithEmptyProfile(self):
+        """A profile without layers does not stop connecting the others"""
+        profiles = [_profile("a", 0, 0, [(1, 2, 1.0)]), _profile("b", 10, 0, []),
+            _profile("c", 20, 0, [(1, 2, 1.0)])]
+        self.assertEqual(self.builder._connectProfiles(profiles, profiles), [])
+
+if __name__ == '__main__':
+    unittest.main()
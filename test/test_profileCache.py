@@ -0,0 +1,122 @@
+""" This module contains the tests of the cache of the profile columns
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import qgisStubs
+qgisStubs.install()
+
+# pylint: disable=wrong-import-position,wrong-import-order,protected-access
+from geoCore.diagnostics import MISSING_KEY, MISSING_MAIN_GROUP, Diagnostic
+from geoCore.profileCache import ProfileCache
+from geoCore.profileColumns import LayerRow, ProfileColumns
+
+def _columns(layers):
+    """Make the columns of the given (layer, group, height) layers"""
+    columns = ProfileColumns()
+    depth = 0.0
+    for layer, group, height in layers:
+        columns.append(LayerRow(layer, group, depth, depth + height, 1.0, "S", "info", "#ffffff",
+            None))
+        depth = depth + height
+    columns.finish()
+    return columns
+
+def _layers(columns):
+    """Get the (layer, group, height) layers of the columns"""
+    return list(zip(columns.layers, columns.group.tolist(), columns.heights().tolist()))
+
+class ProfileCacheTest(unittest.TestCase):
+    """Test ProfileCache"""
+
+    def setUp(self):
+        """Use a cache file in a temporary directory"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.fileName = os.path.join(directory, "test.gcc")
+
+    def _reopen(self, cache):
+        """Unmap the cache and read its file again"""
+        cache._close()
+        return ProfileCache(self.fileName)
+
+    def testRoundTrip(self):
+        """The columns and problems are read from the file"""
+        cache = ProfileCache(self.fileName)
+        cache.add("1", _columns([(1, 2, 1.5), ("2a", "Mu", 3.0)]),
+            [Diagnostic(MISSING_MAIN_GROUP, "(u4)", 1)])
+        self.assertTrue(cache.save())
+        cache = self._reopen(cache)
+        self.assertEqual(_layers(cache.columns("1")), [(1, 2, 1.5), ("2a", "Mu", 3.0)])
+        self.assertEqual(cache.problems("1"), [Diagnostic(MISSING_MAIN_GROUP, "(u4)", 1)])
+        self.assertIsNone(cache.columns("2"))
+
+    def testReplacedProfile(self):
+        """The rows of a replaced profile are dropped from the file"""
+        cache = ProfileCache(self.fileName)
+        cache.add("1", _columns([(1, 1, 1.0), (2, 1, 1.0), (3, 1, 1.0)]))
+        cache.add("2", _columns([(1, 2, 2.0)]))
+        cache.save()
+        cache.add("1", _columns([(1, 3, 4.0)]))
+        cache.add("3", _columns([(1, 4, 5.0), (2, 4, 6.0)]))
+        cache.save()
+        cache = self._reopen(cache)
+        self.assertEqual(len(cache._rows), 4)
+        self.assertEqual(_layers(cache.columns("1")), [(1, 3, 4.0)])
+        self.assertEqual(_layers(cache.columns("2")), [(1, 2, 2.0)])
+        self.assertEqual(_layers(cache.columns("3")), [(1, 4, 5.0), (2, 4, 6.0)])
+
+    def testKeyType(self):
+        """The keys of the problems keep their type"""
+        problems = [Diagnostic(MISSING_KEY, 5, 0), Diagnostic(MISSING_KEY, "5", 0),
+            Diagnostic(MISSING_KEY, 2.5, 0), Diagnostic(MISSING_KEY, None, 0)]
+        cache = ProfileCache(self.fileName)
+        cache.add("1", _columns([(1, 1, 1.0)]), problems)
+        cache.save()
+        cache = self._reopen(cache)
+        actual = cache.problems("1")
+        self.assertEqual(actual, problems)
+        self.assertEqual([type(p.key) for p in actual], [int, str, float, type(None)])
+
+    def testTakePending(self):
+        """Profiles built in a worker process are saved by the parent"""
+        worker = ProfileCache(self.fileName + ".worker")
+        worker.add("1", _columns([(1, "Mu", 2.0)]), [Diagnostic(MISSING_KEY, 7, 0)])
+        profiles = pickle.loads(pickle.dumps(worker.takePending()))
+        self.assertEqual(worker.takePending(), [])
+        self.assertTrue(worker.save())
+        self.assertFalse(os.path.exists(self.fileName + ".worker"))
+
+        cache = ProfileCache(self.fileName)
+        for profileId, columns, problems in profiles:
+            cache.add(profileId, columns, problems)
+        cache.save()
+        cache = self._reopen(cache)
+        self.assertEqual(_layers(cache.columns("1")), [(1, "Mu", 2.0)])
+        self.assertEqual(cache.problems("1"), [Diagnostic(MISSING_KEY, 7, 0)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+""" This module contains the tests of ProfilePainter
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import random
+import unittest
+
+import qgisStubs
+qgisStubs.install()
+
+# pylint: disable=wrong-import-position,wrong-import-order,protected-access,unused-argument
+from geoCore.profile import Profile
+from geoCore.profilePainter import ProfilePainter
+
+def referenceYFac(heights, vh):
+    """The factor as determined before the heights were sorted"""
+    facsShrink = [vh / h for h in heights if h != 0 and h > vh]
+    facsStretch = [vh / h for h in heights if h != 0 and h <= vh]
+    if len(facsShrink) > 0:
+        return max(facsShrink)
+    if len(facsStretch) > 0:
+        return min(facsStretch)
+    return 1.0
+
+class Parts:
+    """An otbp consisting of parts of the given heights"""
+
+    def __init__(self, heights):
+        self.heights = heights
+
+    def partsHeights(self):
+        """Return the height of each part"""
+        return self.heights
+
+class DetermineYFacTest(unittest.TestCase):
+    """Test ProfilePainter._determineYFac"""
+
+    def setUp(self):
+        """Create a painter without scene"""
+        self.painter = ProfilePainter(None, 1000, 700)
+
+    def testSameAsReference(self):
+        """The factor equals the one of the unsorted heights"""
+        rnd = random.Random(4711)
+        for _ in range(5000):
+            heights = [rnd.choice((0, rnd.uniform(-5, 30), rnd.randint(1, 20)))
+                for _ in range(rnd.randint(0, 8))]
+            vh = rnd.choice((rnd.uniform(0.1, 25), float(rnd.randint(1, 20))))
+            self.assertEqual(self.painter._determineYFac(Parts(heights), vh),
+                referenceYFac(heights, vh))
+
+    def testDegenerateView(self):
+        """Without a positive view height the otbp is not scaled"""
+        parts = Parts([2.0, 10.0])
+        self.assertEqual(self.painter._determineYFac(parts, 0.0), 1.0)
+        self.assertEqual(self.painter._determineYFac(parts, -3.0), 1.0)
+
+    def testNoParts(self):
+        """An otbp without parts is not scaled"""
+        self.assertEqual(self.painter._determineYFac(Parts([]), 10.0), 1.0)
+        self.assertEqual(self.painter._determineYFac(Parts([0, 0]), 10.0), 1.0)
+
+class FakeProfile(Profile):
+    """A profile recording its descriptions instead of painting them"""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.description = None
+
+    def paint(self, scene):
+        """Add a single item"""
+        self._addItem(self.name)
+
+    def paintDescription(self, scene):
+        """Add the description's item"""
+        self.description = self._addItem("description")
+
+    def relayout(self):
+        """Nothing to place"""
+
+    def removeItems(self, scene):
+        """Remove the items including the description"""
+        super().removeItems(scene)
+        self.description = None
+
+class FakeScene:
+    """A scene keeping its items in a list"""
+
+    def __init__(self):
+        self.removed = []
+
+    def removeItem(self, item):
+        """Remember the removed item"""
+        self.removed.append(item)
+
+class PaintDescriptionTest(unittest.TestCase):
+    """Test adding and removing the description of painted profiles"""
+
+    def setUp(self):
+        """Create a painter painting at once"""
+        self.painter = ProfilePainter(FakeScene(), 1000, 700)
+        self.painter.applyScale(1.0, 1.0)
+
+    def testAddDescription(self):
+        """A profile of a transect gets its description when drawn alone"""
+        profile = FakeProfile("p")
+        self.painter.paint([profile, FakeProfile("q")], False)
+        self.assertIsNone(profile.description)
+        self.painter.paint([profile], True)
+        self.assertEqual(profile.description, "description")
+
+    def testRemoveDescription(self):
+        """A profile drawn alone loses its description in a transect"""
+        profile = FakeProfile("p")
+        self.painter.paint([profile], True)
+        self.painter.paint([profile, FakeProfile("q")], False)
+        self.assertIsNone(profile.description)
+        self.assertIn("description", self.painter.scene.removed)
+        self.assertTrue(profile.isPainted())
+
+    def testKeepItems(self):
+        """The items are kept if the description does not change"""
+        profile = FakeProfile("p")
+        self.painter.paint([profile], True)
+        self.painter.paint([profile], True)
+        self.assertEqual(self.painter.scene.removed, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,282 @@
+""" This module contains the tests of the section line and its spatial index
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+
+import math
+import unittest
+from unittest import mock
+
+import qgisStubs
+qgisStubs.install()
+
+# pylint: disable=wrong-import-position,wrong-import-order,protected-access,unused-argument
+from geoCore import drillingPosition, sectionLine
+from geoCore.sectionLine import BoreholeIndex, SectionLine
+
+SETTINGS = {"xCoord": "x", "yCoord": "y", "zCoord": "z"}
+FIELDS = ("id", "x", "y", "z")
+
+class FakeRectangle:
+    """A rectangle like QgsRectangle"""
+
+    def __init__(self, xMin, yMin, xMax, yMax):
+        self.bounds = (xMin, yMin, xMax, yMax)
+
+    def contains(self, x, y):
+        """Is the point within the rectangle (including the border)"""
+        xMin, yMin, xMax, yMax = self.bounds
+        return xMin <= x <= xMax and yMin <= y <= yMax
+
+class FakeSpatialIndex:
+    """A spatial index of points in a grid of square cells"""
+
+    def __init__(self, features, cellSize=100.0):
+        self.cellSize = cellSize
+        self.queries = 0
+        self._cells = {}
+        for f in features:
+            x, y = f.point
+            self._cells.setdefault(self._cell(x, y), []).append((f.id(), x, y))
+
+    def _cell(self, x, y):
+        """Get the cell of a point"""
+        return math.floor(x / self.cellSize), math.floor(y / self.cellSize)
+
+    def intersects(self, rectangle):
+        """Get the feature IDs of the points within the rectangle"""
+        self.queries = self.queries + 1
+        xMin, yMin, xMax, yMax = rectangle.bounds
+        (c1, r1), (c2, r2) = self._cell(xMin, yMin), self._cell(xMax, yMax)
+        return [fid for c in range(c1, c2 + 1) for r in range(r1, r2 + 1)
+            for fid, x, y in self._cells.get((c, r), ()) if rectangle.contains(x, y)]
+
+class FakeRequest:
+    """A request of features, optionally filtered by their IDs"""
+
+    NoGeometry = 1
+
+    def __init__(self):
+        self.fids = None
+
+    def setNoAttributes(self):
+        """Ignored, the fake always has the attributes"""
+
+    def setFilterFids(self, fids):
+        """Restrict the request to the given feature IDs"""
+        self.fids = fids
+
+    def flags(self):
+        """The flags of the request"""
+        return 0
+
+    def setFlags(self, flags):
+        """Ignored, the fake always has the geometry"""
+
+    def setSubsetOfAttributes(self, names, fields):
+        """Ignored, the fake always has all attributes"""
+
+class FakePoint:
+    """A vertex of a geometry"""
+
+    def __init__(self, x, y):
+        self._x = x
+        self._y = y
+
+    def x(self):
+        """The x-coordinate"""
+        return self._x
+
+    def y(self):
+        """The y-coordinate"""
+        return self._y
+
+class FakeGeometry:
+    """A line geometry"""
+
+    def __init__(self, vertices):
+        self._vertices = vertices
+
+    def vertices(self):
+        """The vertices of the line"""
+        return (FakePoint(x, y) for x, y in self._vertices)
+
+class FakeFeature:
+    """A drilling position whose geometry is the point of its coordinates"""
+
+    def __init__(self, fid, name, x, y):
+        self._fid = fid
+        self._attributes = [name, x, y, 0.0]
+        self.point = (x, y)
+
+    def id(self):
+        """The feature ID"""
+        return self._fid
+
+    def attributes(self):
+        """The attribute values"""
+        return self._attributes
+
+class FakeFields(list):
+    """The fields of the layer of drilling positions"""
+
+    def lookupField(self, name):
+        """The index of the field of the given name"""
+        return self.index(name) if name in self else -1
+
+class FakeSignal:
+    """A signal nobody emits"""
+
+    def connect(self, slot):
+        """Ignore the slot"""
+
+class FakeLayer:
+    """A layer of drilling positions. It records the requested feature IDs."""
+
+    featureAdded = featureDeleted = geometryChanged = FakeSignal()
+    dataChanged = willBeDeleted = FakeSignal()
+
+    def __init__(self, points, layerId="boreholes"):
+        """points are (name, x, y)"""
+        self._id = layerId
+        self.features = [FakeFeature(fid, name, x, y) for fid, (name, x, y) in enumerate(points)]
+        self.requestedFids = None
+
+    def id(self):
+        """The layer ID"""
+        return self._id
+
+    def name(self):
+        """The layer's name"""
+        return self._id
+
+    def fields(self):
+        """The fields of the layer"""
+        return FakeFields(FIELDS)
+
+    def getFeatures(self, request):
+        """Get the features (filtered by their IDs)"""
+        if request.fids is None:
+            return iter(self.features)
+        self.requestedFids = set(request.fids)
+        return (self.features[fid] for fid in request.fids)
+
+def patchQgis(addCleanup):
+    """Use the fakes of QGIS and start with no spatial indices. The patches
+    are undone by the functions passed to addCleanup."""
+    for module, name, fake in ((sectionLine, "QgsRectangle", FakeRectangle),
+            (sectionLine, "QgsSpatialIndex", FakeSpatialIndex),
+            (sectionLine, "QgsFeatureRequest", FakeRequest),
+            (drillingPosition, "QgsFeatureRequest", FakeRequest)):
+        patcher = mock.patch.object(module, name, fake)
+        patcher.start()
+        addCleanup(patcher.stop)
+    patcher = mock.patch.object(BoreholeIndex, "_indices", {})
+    patcher.start()
+    addCleanup(patcher.stop)
+
+class SectionLineTest(unittest.TestCase):
+    """Test SectionLine.positions"""
+
+    def setUp(self):
+        """Use the fakes of QGIS"""
+        patchQgis(self.addCleanup)
+
+    def _positions(self, vertices, buffer, points):
+        """Get the names and chainages of the points found along the line"""
+        layer = FakeLayer(points)
+        positions = SectionLine(FakeGeometry(vertices), buffer).positions(layer, SETTINGS)
+        return [(p.id, p.chainage) for p in positions]
+
+    def testCorridor(self):
+        """Points within the buffer (including its border) are found"""
+        points = [("in", 50.0, 5.0), ("below", 30.0, -9.5), ("border", 70.0, 10.0),
+            ("out", 50.0, 15.0), ("far", 50.0, -500.0)]
+        self.assertEqual(self._positions([(0.0, 0.0), (100.0, 0.0)], 10.0, points),
+            [("below", 30.0), ("in", 50.0), ("border", 70.0)])
+
+    def testBeyondEnds(self):
+        """Points beyond the ends are found within the buffer around the end
+        points only, not in the corners of the rectangles"""
+        points = [("before", -5.0, 0.0), ("after", 106.0, -3.0), ("corner", -8.0, 8.0),
+            ("farAfter", 115.0, 0.0)]
+        self.assertEqual(self._positions([(0.0, 0.0), (100.0, 0.0)], 10.0, points),
+            [("before", 0.0), ("after", 100.0)])
+
+    def testMultiSegment(self):
+        """The chainage continues along the following segments"""
+        vertices = [(0.0, 0.0), (100.0, 0.0), (100.0, 100.0), (200.0, 100.0)]
+        points = [("first", 50.0, 5.0), ("second", 95.0, 50.0), ("third", 150.0, 108.0),
+            ("inside", 60.0, 60.0)]
+        self.assertEqual(self._positions(vertices, 10.0, points),
+            [("first", 50.0), ("second", 150.0), ("third", 250.0)])
+
+    def testNearestSegment(self):
+        """A point near two segments gets the chainage of the nearer one"""
+        vertices = [(0.0, 0.0), (100.0, 0.0), (100.0, 10.0), (0.0, 10.0)]
+        self.assertEqual(self._positions(vertices, 5.0, [("near", 40.0, 7.0)]),
+            [("near", 170.0)])
+
+    def testProjectionOrder(self):
+        """The positions are ordered by their chainage, not by their order
+        in the layer or by their coordinates"""
+        vertices = [(100.0, 0.0), (0.0, 0.0), (0.0, 100.0)]
+        points = [("c", 2.0, 60.0), ("a", 80.0, -1.0), ("b", 10.0, 3.0), ("d", -4.0, 90.0)]
+        self.assertEqual([i for i, _ in self._positions(vertices, 5.0, points)],
+            ["a", "b", "c", "d"])
+
+    def testOnlyCandidatesAreRead(self):
+        """Only the positions within the rectangles are read from the layer"""
+        layer = FakeLayer([("near", 500.0, 2.0), ("far", 500.0, 400.0), ("end", 990.0, -1.0)])
+        line = SectionLine(FakeGeometry([(0.0, 0.0), (1000.0, 0.0)]), 10.0)
+        self.assertEqual([p.id for p in line.positions(layer, SETTINGS)], ["near", "end"])
+        self.assertEqual(layer.requestedFids, {0, 2})
+        self.assertEqual(len(line._rectangles()), 25)
+
+    def testNoCandidates(self):
+        """No positions are read if none is near the line"""
+        layer = FakeLayer([("far", 500.0, 400.0)])
+        line = SectionLine(FakeGeometry([(0.0, 0.0), (1000.0, 0.0)]), 10.0)
+        self.assertEqual(line.positions(layer, SETTINGS), [])
+        self.assertIsNone(layer.requestedFids)
+
+class BoreholeIndexTest(unittest.TestCase):
+    """Test BoreholeIndex"""
+
+    def setUp(self):
+        """Use the fakes of QGIS"""
+        patchQgis(self.addCleanup)
+
+    def testOneIndexPerLayer(self):
+        """The index is built once per layer and rebuilt after changes"""
+        layer = FakeLayer([("a", 5.0, 5.0)])
+        index = BoreholeIndex.forLayer(layer)
+        self.assertIs(BoreholeIndex.forLayer(layer), index)
+        rectangle = FakeRectangle(0.0, 0.0, 10.0, 10.0)
+        self.assertEqual(index.candidates([rectangle]), {0})
+        spatialIndex = index._index
+        index.candidates([rectangle])
+        self.assertIs(index._index, spatialIndex)
+        layer.features.append(FakeFeature(1, "b", 6.0, 6.0))
+        index.invalidate()
+        self.assertEqual(index.candidates([rectangle]), {0, 1})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+""" This module contains the tests of the transect's geometry
+
+    geoCore - a QGIS plugin for drawing drilling profiles
+    Copyright (C) 2019 - 2021  Gerrit Bette, T-Systems on site services GmbH
+
+    This file is part of geoCore.
+
+    geoCore is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    geoCore is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with geoCore.  If not, see <https://www.gnu.org/licenses/>.
+"""
+
+import math
+import random
+import unittest
+from unittest import mock
+
+import qgisStubs
+qgisStubs.install()
+
+# pylint: disable=wrong-import-position,wrong-import-order
+from geoCore import transect
+from geoCore.drillingPosition import DrillingPosition
+from geoCore.transect import chainage, projectOntoLine, sortPositions
+
+def referenceChainage(positions):
+    """The distances as computed before, i.e. point to point in a loop"""
+    distances = []
+    if len(positions) > 0:
+        x = positions[0].x
+        y = positions[0].y
+        xp = 0
+        for p in positions:
+            xp = xp + math.sqrt((p.x - x)**2 + (p.y - y)**2)
+            distances.append(xp)
+            x = p.x
+            y = p.y
+    return distances
+
+def referenceProjection(x, y, vertices):
+    """Get the distance of a point to the polyline by checking each segment"""
+    nearest = math.inf
+    for (x1, y1), (x2, y2) in zip(vertices[:-1], vertices[1:]):
+        dx, dy = x2 - x1, y2 - y1
+        square = dx * dx + dy * dy
+        t = 0.0 if square == 0 else min(1.0, max(0.0, ((x - x1) * dx + (y - y1) * dy) / square))
+        nearest = min(nearest, math.hypot(x - x1 - t * dx, y - y1 - t * dy))
+    return nearest
+
+def pointAt(vertices, chainageOnLine):
+    """Get the point of the polyline at the given distance along the line"""
+    for (x1, y1), (x2, y2) in zip(vertices[:-1], vertices[1:]):
+        length = math.hypot(x2 - x1, y2 - y1)
+        if chainageOnLine <= length and length > 0:
+            t = chainageOnLine / length
+            return x1 + t * (x2 - x1), y1 + t * (y2 - y1)
+        chainageOnLine = chainageOnLine - length
+    return vertices[-1]
+
+def randomPositions(rnd, count):
+    """Make drilling positions with coordinates like UTM"""
+    return [DrillingPosition(i, rnd.uniform(3e5, 4e5), rnd.uniform(5e6, 6e6), 1.0)
+        for i in range(count)]
+
+class ChainageTest(unittest.TestCase):
+    """Test chainage and sortPositions"""
+
+    def testSameAsReference(self):
+        """The distances equal the ones of the point to point loop"""
+        rnd = random.Random(4711)
+        for direction in transect.SORT_KEYS:
+            positions = sortPositions(randomPositions(rnd, 1000), direction)
+            for actual, expected in zip(chainage(positions).tolist(), referenceChainage(positions)):
+                self.assertAlmostEqual(actual, expected, delta=1e-9 * max(1.0, expected))
+
+    def testEmpty(self):
+        """No positions have no distances"""
+        self.assertEqual(chainage([]).tolist(), [])
+
+    def testSinglePosition(self):
+        """A single position is at 0"""
+        self.assertEqual(chainage([DrillingPosition(1, 5.0, 7.0, 1.0)]).tolist(), [0.0])
+
+    def testSamePosition(self):
+        """Positions at the same coordinates are at the same distance"""
+        positions = [DrillingPosition(i, 3.0, 4.0, 1.0) for i in range(3)]
+        positions.append(DrillingPosition(3, 0.0, 0.0, 1.0))
+        self.assertEqual(chainage(positions).tolist(), [0.0, 0.0, 0.0, 5.0])
+
+    def testProjectedPositions(self):
+        """Positions projected onto a section line keep their chainage"""
+        positions = [DrillingPosition(1, 0.0, 0.0, 1.0, 2.5), DrillingPosition(2, 9.0, 9.0, 1.0, 4.0)]
+        self.assertEqual(chainage(positions).tolist(), [2.5, 4.0])
+
+    def testSortPositions(self):
+        """The positions are sorted in the given direction"""
+        positions = [DrillingPosition(1, 0.0, 1.0, 0.0), DrillingPosition(2, 2.0, 0.0, 0.0),
+            DrillingPosition(3, 1.0, 2.0, 0.0)]
+        self.assertEqual([p.id for p in sortPositions(positions, "ns")], [3, 1, 2])
+        self.assertEqual([p.id for p in sortPositions(positions, "sn")], [2, 1, 3])
+        self.assertEqual([p.id for p in sortPositions(positions, "we")], [1, 3, 2])
+        self.assertEqual([p.id for p in sortPositions(positions, "ew")], [2, 3, 1])
+
+class ProjectionTest(unittest.TestCase):
+    """Test projectOntoLine"""
+
+    def _checkProjection(self, xs, ys, vertices):
+        """Compare the projection with the nearest point found segment by
+        segment. The chainage must lead to a point at that distance, as
+        several points of the line may be nearest."""
+        chainages, distances = projectOntoLine(xs, ys, vertices)
+        for x, y, c, d in zip(xs, ys, chainages.tolist(), distances.tolist()):
+            expected = referenceProjection(x, y, vertices)
+            self.assertAlmostEqual(d, expected, delta=1e-9 * max(1.0, expected))
+            px, py = pointAt(vertices, c)
+            self.assertAlmostEqual(math.hypot(x - px, y - py), expected,
+                delta=1e-7 * max(1.0, expected))
+
+    def testSameAsReference(self):
+        """The nearest points equal the ones found segment by segment"""
+        rnd = random.Random(4711)
+        for _ in range(50):
+            vertices = [(rnd.uniform(0, 100), rnd.uniform(0, 100)) for _ in range(rnd.randint(2, 8))]
+            xs = [rnd.uniform(-20, 120) for _ in range(100)]
+            ys = [rnd.uniform(-20, 120) for _ in range(100)]
+            self._checkProjection(xs, ys, vertices)
+
+    def testBlocks(self):
+        """Points are projected the same in blocks"""
+        rnd = random.Random(815)
+        vertices = [(0.0, 0.0), (10.0, 0.0), (10.0, 10.0), (20.0, 5.0)]
+        xs = [rnd.uniform(-5, 25) for _ in range(100)]
+        ys = [rnd.uniform(-5, 15) for _ in range(100)]
+        expected = projectOntoLine(xs, ys, vertices)
+        with mock.patch.object(transect, "PROJECTION_BLOCK_SIZE", 7):
+            actual = projectOntoLine(xs, ys, vertices)
+        self.assertEqual(actual[0].tolist(), expected[0].tolist())
+        self.assertEqual(actual[1].tolist(), expected[1].tolist())
+
+    def testDegenerateSegment(self):
+        """Repeated vertices do not break the projection"""
+        vertices = [(0.0, 0.0), (0.0, 0.0), (10.0, 0.0), (10.0, 0.0)]
+        chainages, distances = projectOntoLine([5.0, -3.0, 14.0], [2.0, 4.0, -3.0], vertices)
+        self.assertEqual(chainages.tolist(), [5.0, 0.0, 10.0])
+        self.assertEqual(distances.tolist(), [2.0, 5.0, 5.0])
+
+    def testNoPoints(self):
+        """No points have no chainage"""
+        chainages, distances = projectOntoLine([], [], [(0.0, 0.0), (1.0, 1.0)])
+        self.assertEqual(len(chainages), 0)
+        self.assertEqual(len(distances), 0)
+
+if __name__ == '__main__':
+    unittest.main()